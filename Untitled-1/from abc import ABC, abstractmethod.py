@@ -1,12 +1,27 @@
-from abc import ABC, abstractmethod
-from datetime import datetime, timedelta
+from abc import ABC, ABCMeta, abstractmethod
+from array import array
+from datetime import date, datetime, timedelta
+import copy
+import copyreg
+import hashlib
+import json
+import multiprocessing
+import os
 import random
+import shutil
 import string
-from typing import Dict, List, Type, Union
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type, Union
+
+import numpy as np
 
 # 基础数据模型
 class TestData(ABC):
     """测试数据基类"""
+    # 数据模型均使用 __slots__，不为每个实例分配 __dict__
+    __slots__ = ()
+    
     @abstractmethod
     def to_dict(self) -> Dict:
         """将数据转换为字典格式"""
@@ -14,6 +29,8 @@ class TestData(ABC):
 
 class UserData(TestData):
     """用户测试数据模型"""
+    __slots__ = ("user_id", "username", "email", "is_active", "created_at")
+    
     def __init__(self, user_id: int, username: str, email: str, is_active: bool, created_at: datetime):
         self.user_id = user_id
         self.username = username
@@ -32,6 +49,8 @@ class UserData(TestData):
 
 class ProductData(TestData):
     """产品测试数据模型"""
+    __slots__ = ("product_id", "name", "price", "category", "in_stock")
+    
     def __init__(self, product_id: int, name: str, price: float, category: str, in_stock: bool):
         self.product_id = product_id
         self.name = name
@@ -50,10 +69,13 @@ class ProductData(TestData):
 
 class OrderData(TestData):
     """订单测试数据模型"""
+    __slots__ = ("order_id", "user_id", "products", "total", "status")
+    
     def __init__(self, order_id: int, user_id: int, products: List[int], total: float, status: str):
         self.order_id = order_id
         self.user_id = user_id
-        self.products = products
+        # 商品 ID 以 64 位整数数组紧凑存储
+        self.products = array('q', products)
         self.total = total
         self.status = status
     
@@ -61,14 +83,586 @@ class OrderData(TestData):
         return {
             "order_id": self.order_id,
             "user_id": self.user_id,
-            "products": self.products,
+            "products": self.products.tolist(),
             "total": self.total,
             "status": self.status
         }
 
+# 列式数据块
+class RaggedArray:
+    """变长列（如订单的商品列表），以扁平值数组加偏移数组（CSR）存储"""
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        self.values = values
+        self.offsets = offsets
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+    
+    def slice(self, start: int, stop: int) -> "RaggedArray":
+        """截取 [start, stop) 行，偏移数组重新从 0 开始"""
+        offsets = self.offsets[start:stop + 1]
+        return RaggedArray(self.values[offsets[0]:offsets[-1]], offsets - offsets[0])
+    
+    def tolist(self) -> List[List]:
+        values = self.values.tolist()
+        offsets = self.offsets.tolist()
+        return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+def _record_fields(record: TestData) -> List[str]:
+    """数据模型对象的字段名：优先取 __slots__，兼容带 __dict__ 的自定义模型"""
+    fields = list(getattr(type(record), '__slots__', ()))
+    if hasattr(record, '__dict__'):
+        fields += list(vars(record))
+    return fields
+
+class RowView:
+    """
+    列式数据块中一行的只读视图：不构造数据模型对象，访问属性时才从对应列取值。
+    """
+    __slots__ = ("_block", "_index")
+    
+    def __init__(self, block: "ColumnBlock", index: int):
+        self._block = block
+        self._index = index
+    
+    def __getattr__(self, name: str) -> Any:
+        columns = self._block.columns
+        if name not in columns:
+            raise AttributeError(name)
+        return columns[name][self._index].tolist()
+    
+    def materialize(self) -> TestData:
+        """物化为数据模型对象"""
+        return self._block[self._index]
+    
+    def to_dict(self) -> Dict:
+        return self.materialize().to_dict()
+
+class ColumnBlock:
+    """
+    列式数据块（struct-of-arrays）：每个字段一个 NumPy 数组，按需（惰性）物化为数据模型对象，
+    或通过 view() 得到不复制数据的行视图。列名与数据模型构造函数的参数名一一对应。
+    """
+    def __init__(self, model: Type[TestData], columns: Dict[str, Any]):
+        self.model = model
+        self.columns = columns
+    
+    @property
+    def fields(self) -> List[str]:
+        return list(self.columns)
+    
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+    
+    def __getitem__(self, index: int) -> TestData:
+        """物化单行数据"""
+        if index < 0:
+            index += len(self)
+        return self.model(**{name: col[index].tolist() for name, col in self.columns.items()})
+    
+    def __iter__(self) -> Iterator[TestData]:
+        for i in range(len(self)):
+            yield self[i]
+    
+    def view(self, index: int) -> RowView:
+        """单行的惰性视图"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return RowView(self, index)
+    
+    def views(self) -> Iterator[RowView]:
+        """逐行产出惰性视图"""
+        for i in range(len(self)):
+            yield RowView(self, i)
+    
+    @property
+    def nbytes(self) -> int:
+        """各列数组占用的字节数"""
+        return sum(col.values.nbytes + col.offsets.nbytes if isinstance(col, RaggedArray) else col.nbytes
+                   for col in self.columns.values())
+    
+    def slice(self, start: int, stop: int) -> "ColumnBlock":
+        """截取 [start, stop) 行，数值列为视图，不复制数据"""
+        return ColumnBlock(self.model, {
+            name: col.slice(start, stop) if isinstance(col, RaggedArray) else col[start:stop]
+            for name, col in self.columns.items()
+        })
+    
+    def to_objects(self) -> List[TestData]:
+        """一次性物化全部行（逐列 tolist 后再组装，比逐行取值快）"""
+        names = self.fields
+        values = [col.tolist() for col in self.columns.values()]
+        return [self.model(**dict(zip(names, row))) for row in zip(*values)]
+    
+    @classmethod
+    def from_objects(cls, model: Type[TestData], records: List[TestData]) -> "ColumnBlock":
+        """由数据模型对象列表构建列式数据块（用于没有向量化实现的工厂）"""
+        if not records:
+            return cls(model, {})
+        columns = {}
+        for name in _record_fields(records[0]):
+            values = [getattr(r, name) for r in records]
+            if isinstance(values[0], (list, array)):
+                offsets = np.zeros(len(values) + 1, dtype=np.int64)
+                np.cumsum([len(v) for v in values], out=offsets[1:])
+                columns[name] = RaggedArray(np.array([x for v in values for x in v]), offsets)
+            else:
+                columns[name] = np.array(values)
+        return cls(model, columns)
+
+def _constant_column(value: Any, count: int) -> np.ndarray:
+    """将调用方指定的固定值扩展为整列；传入长度为 count 的数组时直接作为该列"""
+    if isinstance(value, np.ndarray):
+        return value
+    if isinstance(value, datetime):
+        value = np.datetime64(value, "us")
+    return np.full(count, value)
+
+def _random_created_at(rng: np.random.Generator, count: int, now: Optional[datetime] = None) -> np.ndarray:
+    """生成最近一年内的创建时间列（与逐行生成的 datetime.now() - timedelta(days=...) 等价）"""
+    now = np.datetime64(now or datetime.now(), "us")
+    return now - rng.integers(0, 366, count).astype("timedelta64[D]")
+
+# ID 分配器
+class IdAllocator(ABC):
+    """
+    ID 分配器接口：把从 0 开始的自增序号双射为 ID，因此分配出的 ID 永不重复。
+    单个分配和批量预留都只需 O(1) 的加锁计数，线程安全。
+    """
+    def __init__(self, capacity: Optional[int] = None):
+        """
+        :param capacity: 可分配的 ID 总数，None 表示不限
+        """
+        self.capacity = capacity
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    @abstractmethod
+    def id_at(self, index: np.ndarray) -> np.ndarray:
+        """第 index 个序号对应的 ID（向量化）"""
+        pass
+    
+    @property
+    def allocated(self) -> int:
+        """已分配的 ID 数量"""
+        return self._next
+    
+    def claim(self, count: int) -> int:
+        """占用 count 个连续序号，返回起始序号"""
+        with self._lock:
+            start = self._next
+            if self.capacity is not None and start + count > self.capacity:
+                raise RuntimeError(f"ID 已分配完，容量: {self.capacity}")
+            self._next = start + count
+            return start
+    
+    def allocate(self) -> int:
+        """分配单个 ID"""
+        return int(self.id_at(np.array([self.claim(1)], dtype=np.int64))[0])
+    
+    def reserve(self, count: int) -> np.ndarray:
+        """批量预留 count 个 ID"""
+        start = self.claim(count)
+        return self.id_at(np.arange(start, start + count, dtype=np.int64))
+    
+    def advance_to(self, index: int):
+        """跳过 index 之前的序号（如续接已有数据集），不会回退"""
+        with self._lock:
+            self._next = max(self._next, index)
+    
+    def shard(self, shard_index: int, shard_count: int) -> "ShardedIdAllocator":
+        """按工作进程切分序号空间，各分片互不重叠"""
+        return ShardedIdAllocator(self, shard_index, shard_count)
+    
+    def __getstate__(self):
+        # 锁不可序列化，跨进程传递时重建
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+class SequentialIdAllocator(IdAllocator):
+    """顺序 ID：start, start + 1, ..."""
+    def __init__(self, start: int = 1, capacity: Optional[int] = None):
+        super().__init__(capacity)
+        self.start = start
+    
+    def id_at(self, index: np.ndarray) -> np.ndarray:
+        return self.start + index
+    
+    def allocate(self) -> int:
+        return self.start + self.claim(1)
+
+class PermutationIdAllocator(IdAllocator):
+    """
+    置换 ID：在 [low, high) 内随机打散但不重复。
+    序号经 Feistel 网络加密后落在不小于容量的最小 2 的幂区间内（左右两半位数可以不等，
+    每轮交换后两半的位数互换，偶数轮后复原），超出范围的结果继续加密（cycle walking），
+    整体仍是 [0, high - low) 上的双射；区间不超过容量的 2 倍，期望每个 ID 不到 2 轮计算。
+    """
+    ROUNDS = 4
+    MULTIPLIER = 0x9E3779B97F4A7C15
+    
+    def __init__(self, low: int, high: int, seed: int = 0):
+        super().__init__(high - low)
+        self.low = low
+        bits = max(1, (high - low - 1).bit_length())
+        self._right_bits = bits // 2
+        self._left_bits = bits - self._right_bits
+        self._keys = np.random.default_rng(seed).integers(0, 1 << 32, self.ROUNDS, dtype=np.uint64)
+        self._key_list = self._keys.tolist()
+    
+    def _feistel(self, x: np.ndarray) -> np.ndarray:
+        left_bits, right_bits = self._left_bits, self._right_bits
+        left, right = x >> np.uint64(right_bits), x & np.uint64((1 << right_bits) - 1)
+        for key in self._keys:
+            # 轮函数：乘法散列后截到左半的位数（uint64 乘法自然按 2^64 取模），原地计算减少临时数组
+            f = right * np.uint64(self.MULTIPLIER)
+            f += key
+            f ^= f >> np.uint64(29)
+            f &= np.uint64((1 << left_bits) - 1)
+            f ^= left
+            left, right = right, f
+            left_bits, right_bits = right_bits, left_bits
+        return (left << np.uint64(right_bits)) | right
+    
+    def id_at(self, index: np.ndarray) -> np.ndarray:
+        x = self._feistel(np.asarray(index, dtype=np.uint64))
+        # 只对仍超出范围的元素继续加密，每轮处理的元素数按比例递减
+        pending = np.flatnonzero(x >= np.uint64(self.capacity))
+        while len(pending):
+            walked = self._feistel(x[pending])
+            x[pending] = walked
+            pending = pending[walked >= np.uint64(self.capacity)]
+        return x.astype(np.int64) + self.low
+    
+    def _feistel_one(self, x: int) -> int:
+        """与 _feistel 相同的计算，使用 Python 整数"""
+        left_bits, right_bits = self._left_bits, self._right_bits
+        left, right = x >> right_bits, x & ((1 << right_bits) - 1)
+        for key in self._key_list:
+            f = (right * self.MULTIPLIER + key) & 0xFFFFFFFFFFFFFFFF
+            f = (f ^ (f >> 29)) & ((1 << left_bits) - 1)
+            left, right = right, left ^ f
+            left_bits, right_bits = right_bits, left_bits
+        return (left << right_bits) | right
+    
+    def allocate(self) -> int:
+        # 逐个分配时避免 NumPy 小数组的固定开销
+        x = self._feistel_one(self.claim(1))
+        while x >= self.capacity:
+            x = self._feistel_one(x)
+        return x + self.low
+
+class ShardedIdAllocator(IdAllocator):
+    """
+    分片 ID：第 shard_index 个分片依次取底层序号 shard_index, shard_index + shard_count, ...
+    各分片独立计数、互不重叠，适合每个工作进程各持一个分片；不要再与底层分配器混用。
+    """
+    def __init__(self, base: IdAllocator, shard_index: int, shard_count: int):
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(f"分片下标越界: {shard_index}/{shard_count}")
+        capacity = None
+        if base.capacity is not None:
+            capacity = max(0, (base.capacity - shard_index + shard_count - 1) // shard_count)
+        super().__init__(capacity)
+        self.base = base
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+    
+    def id_at(self, index: np.ndarray) -> np.ndarray:
+        return self.base.id_at(self.shard_index + self.shard_count * np.asarray(index, dtype=np.int64))
+
+# 不重复字符串
+def _format_numbers(prefix: str, numbers: np.ndarray, digits: int, suffix: str = "") -> np.ndarray:
+    """
+    向量化生成 prefix + 定宽数字 + suffix 形式的字符串列。
+    直接按 UCS4 码点矩阵拼装（即 NumPy U 类型的内存布局），不逐个格式化，也不经过字节串转换。
+    """
+    head = np.array([ord(c) for c in prefix], dtype=np.uint32)
+    tail = np.array([ord(c) for c in suffix], dtype=np.uint32)
+    width = len(head) + digits + len(tail)
+    # 按位置逐行写入（每行连续），最后整体转置为每个字符串连续
+    buffer = np.empty((width, len(numbers)), dtype=np.uint32)
+    buffer[:len(head)] = head[:, None]
+    buffer[len(head) + digits:] = tail[:, None]
+    remaining = np.asarray(numbers).astype(np.uint32 if digits <= 9 else np.uint64)
+    for position in range(len(head) + digits - 1, len(head) - 1, -1):
+        remaining, buffer[position] = np.divmod(remaining, 10)
+    buffer[len(head):len(head) + digits] += 48
+    return np.ascontiguousarray(buffer.T).view(f"U{width}").ravel()
+
+class UniqueStringGenerator:
+    """
+    不重复字符串生成器：形如 词1 + 分隔符 + 词2 + ... + 分隔符 + 定宽数字。
+    序号按混合进制拆成各词表下标（变化最快）和数字部分，序号与字符串一一对应，
+    因此只要序号不重复，生成的字符串就不重复，无需保存已生成的取值，1 亿条也只占一个计数器。
+    序号来自 ID 分配器，默认使用置换分配器，结果看起来随机。
+    """
+    def __init__(self, words: Sequence[Sequence[str]], digits: int = 8, separator: str = "_",
+                 allocator: Optional[IdAllocator] = None, seed: int = 0, suffix: str = ""):
+        """
+        :param words: 各段词表，如 [["user", "client"]]
+        :param digits: 数字部分位数，容量为 各词表长度之积 x 10^digits
+        :param separator: 各段之间的分隔符
+        :param allocator: 序号分配器，序号须落在 [0, 容量) 内；默认按 seed 打散的置换分配器
+        :param seed: 默认置换分配器的种子
+        :param suffix: 默认追加在末尾的固定后缀
+        """
+        self.words = [list(w) for w in words]
+        self.digits = digits
+        self.separator = separator
+        self.suffix = suffix
+        self.combinations = 1
+        for w in self.words:
+            self.combinations *= len(w)
+        self.capacity = self.combinations * 10 ** digits
+        self.allocator = allocator or PermutationIdAllocator(0, self.capacity, seed=seed)
+        # 每种词组合对应的前缀，按组合序号排列
+        prefixes = [""]
+        for w in self.words:
+            prefixes = [p + word + separator for word in w for p in prefixes]
+        self._prefixes = prefixes
+        self._prefix_array = np.array(prefixes)
+    
+    def value_at(self, index: np.ndarray, suffix: Optional[str] = None) -> np.ndarray:
+        """
+        按序号批量还原字符串。
+
+        :param index: 序号数组
+        :param suffix: 追加在末尾的固定后缀（如邮箱域名），不影响唯一性；默认使用构造时的 suffix
+        :return: 字符串数组
+        """
+        suffix = self.suffix if suffix is None else suffix
+        index = np.asarray(index, dtype=np.int64)
+        if len(index) and (index.min() < 0 or index.max() >= self.capacity):
+            raise ValueError(f"序号超出容量: {self.capacity}")
+        number, combination = np.divmod(index, self.combinations)
+        # 按组合序号一次取出各行前缀，再拼上定宽编号（及后缀）
+        return np.char.add(self._prefix_array[combination],
+                           _format_numbers("", number, self.digits, suffix))
+    
+    def format_one(self, index: int, suffix: Optional[str] = None) -> str:
+        """按序号还原单个字符串"""
+        suffix = self.suffix if suffix is None else suffix
+        return f"{self._prefixes[index % self.combinations]}{index // self.combinations:0{self.digits}d}{suffix}"
+    
+    def next(self, suffix: Optional[str] = None) -> str:
+        """生成一个不重复字符串"""
+        return self.format_one(self.allocator.allocate(), suffix)
+    
+    def batch(self, count: int, suffix: Optional[str] = None) -> np.ndarray:
+        """批量生成 count 个不重复字符串"""
+        return self.value_at(self.allocator.reserve(count), suffix)
+
+# 概率分布
+class AliasTable:
+    """
+    Walker/Vose 别名表：O(k) 预处理后，每次按权重抽样只需一个均匀随机数，O(1)。
+    """
+    def __init__(self, weights: Sequence[float]):
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(weights) == 0 or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("权重需非空、非负且总和大于 0")
+        k = len(weights)
+        scaled = weights * k / weights.sum()
+        prob = np.ones(k)
+        alias = np.arange(k)
+        small = [i for i in range(k) if scaled[i] < 1.0]
+        large = [i for i in range(k) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        self.prob = prob
+        self.alias = alias
+        # 逐个抽样时使用 Python 列表，避免 NumPy 标量开销
+        self._prob_list = prob.tolist()
+        self._alias_list = alias.tolist()
+    
+    def __len__(self) -> int:
+        return len(self.prob)
+    
+    def sample_one(self) -> int:
+        """抽样一个下标（全局 random 模块）"""
+        u = random.random() * len(self._prob_list)
+        i = int(u)
+        return i if u - i < self._prob_list[i] else self._alias_list[i]
+    
+    def sample_indices(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """向量化抽样 count 个下标"""
+        u = rng.random(count) * len(self.prob)
+        i = u.astype(np.int64)
+        return np.where(u - i < self.prob[i], i, self.alias[i])
+
+class Distribution(ABC):
+    """取值分布接口：sample 逐个抽样（全局 random 模块），sample_batch 向量化抽样"""
+    @abstractmethod
+    def sample(self) -> Any:
+        pass
+    
+    @abstractmethod
+    def sample_batch(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        pass
+
+class WeightedChoice(Distribution):
+    """按权重从有限取值中抽样"""
+    def __init__(self, values: Sequence[Any], weights: Sequence[float]):
+        if len(values) != len(weights):
+            raise ValueError("取值与权重数量不一致")
+        self.values = np.asarray(values)
+        self._values_list = self.values.tolist()
+        self.table = AliasTable(weights)
+    
+    def sample(self) -> Any:
+        return self._values_list[self.table.sample_one()]
+    
+    def sample_batch(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        return self.values[self.table.sample_indices(rng, count)]
+
+class ZipfDistribution(WeightedChoice):
+    """Zipf 分布：第 r 个取值（从 1 计）的权重为 1 / r^s，取值为整数 n 时即下标 0..n-1"""
+    def __init__(self, values: Union[int, Sequence[Any]], s: float = 1.0):
+        if isinstance(values, int):
+            values = np.arange(values)
+        ranks = np.arange(1, len(values) + 1, dtype=np.float64)
+        super().__init__(values, ranks ** -s)
+
+class NormalDistribution(Distribution):
+    """正态分布，可截断到 [low, high] 并按 precision 取整（precision=0 时为整数）"""
+    def __init__(self, mean: float, std: float, low: Optional[float] = None, high: Optional[float] = None,
+                 precision: Optional[int] = None):
+        self.mean = mean
+        self.std = std
+        self.low = low
+        self.high = high
+        self.precision = precision
+    
+    def _finish(self, value):
+        if self.low is not None or self.high is not None:
+            value = np.clip(value, self.low, self.high)
+        if self.precision == 0:
+            return np.rint(value).astype(np.int64)
+        if self.precision is not None:
+            return np.round(value, self.precision)
+        return value
+    
+    def sample(self) -> Any:
+        return self._finish(np.float64(random.gauss(self.mean, self.std))).item()
+    
+    def sample_batch(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        return self._finish(rng.normal(self.mean, self.std, count))
+
+class TimeOfDayDistribution(Distribution):
+    """
+    带日内时段分布的时间戳：日期在最近 days_back 天内均匀分布，
+    小时按 24 个小时权重抽样（别名表），小时内的秒数均匀分布。
+    """
+    def __init__(self, hour_weights: Sequence[float], days_back: int = 365, now: Optional[datetime] = None):
+        """
+        :param hour_weights: 0-23 点的相对权重
+        :param days_back: 日期范围（天）
+        :param now: 参考时刻，默认每次抽样时取当前时间；晚于参考时刻的结果截断为参考时刻
+        """
+        if len(hour_weights) != 24:
+            raise ValueError("hour_weights 需要 24 个权重")
+        self.table = AliasTable(hour_weights)
+        self.days_back = days_back
+        self.now = now
+    
+    def sample(self) -> datetime:
+        now = self.now or datetime.now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        value = midnight - timedelta(days=random.randint(0, self.days_back),
+                                     hours=-self.table.sample_one(), seconds=-random.randrange(3600))
+        return min(value, now)
+    
+    def sample_batch(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        now = np.datetime64(self.now or datetime.now(), "us")
+        midnight = now.astype("datetime64[D]").astype("datetime64[us]")
+        days = rng.integers(0, self.days_back + 1, count).astype("timedelta64[D]")
+        seconds = (self.table.sample_indices(rng, count) * 3600 + rng.integers(0, 3600, count)).astype("timedelta64[s]")
+        return np.minimum(midnight - days + seconds, now)
+
+# 关联实体池
+class EntityPool:
+    """
+    预先生成（并已持久化）的实体池，订单等从中抽样关联 ID，保证外键总能关联上。
+    以数组下标索引，单次抽样 O(1)；skew > 0 时偏向池中靠前的实体（热门用户/商品），
+    也可以直接给出下标上的分布（如 ZipfDistribution(len(ids))）。
+    """
+    def __init__(self, ids: np.ndarray, prices: Optional[np.ndarray] = None, skew: float = 0.0,
+                 distribution: Optional[Distribution] = None):
+        """
+        :param ids: 实体 ID 数组
+        :param prices: 与 ids 对齐的价格数组（可选），用于直接计算订单总额
+        :param skew: 倾斜度，0 为均匀抽样，越大越集中于靠前的实体
+        :param distribution: 下标 0..len(ids)-1 上的分布，设置后优先于 skew
+        """
+        if len(ids) == 0:
+            raise ValueError("实体池不能为空")
+        self.ids = np.asarray(ids)
+        self.prices = None if prices is None else np.asarray(prices, dtype=np.float64)
+        self.skew = skew
+        self.distribution = distribution
+    
+    @classmethod
+    def from_block(cls, block: ColumnBlock, id_field: str, price_field: Optional[str] = None, skew: float = 0.0) -> "EntityPool":
+        """由列式数据块构建实体池（不复制数组）"""
+        return cls(block.columns[id_field], block.columns[price_field] if price_field else None, skew)
+    
+    @classmethod
+    def from_objects(cls, records: List[TestData], id_field: str, price_field: Optional[str] = None, skew: float = 0.0) -> "EntityPool":
+        """由数据模型对象列表构建实体池"""
+        ids = np.array([getattr(r, id_field) for r in records])
+        prices = np.array([getattr(r, price_field) for r in records]) if price_field else None
+        return cls(ids, prices, skew)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def _index(self, u):
+        # 对均匀随机数做幂变换：u ** (1 + skew) 偏向 0，仍是常数时间
+        if self.skew:
+            u = u ** (1.0 + self.skew)
+        return (u * len(self.ids)).astype(np.int64) if isinstance(u, np.ndarray) else int(u * len(self.ids))
+    
+    def sample_indices(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """向量化抽样 count 个下标"""
+        if self.distribution is not None:
+            return self.distribution.sample_batch(rng, count)
+        return self._index(rng.random(count))
+    
+    def sample_one(self) -> int:
+        """抽样单个下标（使用全局 random 模块，与逐行生成一致）"""
+        if self.distribution is not None:
+            return self.distribution.sample()
+        return self._index(random.random())
+
 # 工厂接口
 class TestDataFactory(ABC):
     """测试数据工厂接口"""
+    model: Type[TestData] = TestData
+    id_field: Optional[str] = None
+    # 字段名到取值分布的映射，覆盖该字段的默认随机规则
+    distributions: Dict[str, Distribution] = {}
+    # 需要全局唯一的字符串字段及其生成器
+    unique_generators: Dict[str, UniqueStringGenerator] = {}
+    # 需要全局唯一的数值字段（主键除外）及其分配器，分配出的 ID 即字段值
+    unique_allocators: Dict[str, IdAllocator] = {}
+    # 可变字段的状态迁移：字段名 -> {当前值: [可迁移到的值]}，增量生成时使用
+    TRANSITIONS: Dict[str, Dict[Any, List[Any]]] = {}
+    
     @abstractmethod
     def create(self, **kwargs) -> TestData:
         """创建测试数据实例"""
@@ -78,100 +672,1341 @@ class TestDataFactory(ABC):
     def create_batch(self, count: int, **kwargs) -> List[TestData]:
         """批量创建测试数据"""
         pass
+    
+    def sequence_allocators(self) -> Dict[str, IdAllocator]:
+        """按序号分配取值的字段及其分配器：主键、唯一字符串字段与唯一数值字段"""
+        allocators = {field: generator.allocator for field, generator in self.unique_generators.items()}
+        allocators.update(self.unique_allocators)
+        if self.id_field is not None and getattr(self, "id_allocator", None) is not None:
+            allocators[self.id_field] = self.id_allocator
+        return allocators
+    
+    def related_allocators(self) -> Dict[str, Tuple[IdAllocator, int]]:
+        """
+        列式生成时直接占用的关联实体 ID（不生成关联实体本身）：create_columns 的参数名 -> (分配器, 每行占用的 ID 数)。
+        每行占用固定数量的 ID，生成 count 行恰好推进 count * 每行 ID 数，多进程分片与夹具缓存据此在父进程预留区间。
+        """
+        return {}
+    
+    def _draw(self, name: str, kwargs: Dict[str, Any], default):
+        """逐行取值：调用方指定的值 > 字段分布 > 默认随机规则"""
+        if name in kwargs:
+            return kwargs[name]
+        if name in self.distributions:
+            return self.distributions[name].sample()
+        return default()
+    
+    def _draw_column(self, name: str, kwargs: Dict[str, Any], rng: np.random.Generator, count: int, default) -> np.ndarray:
+        """整列取值，优先级同 _draw"""
+        if name in kwargs:
+            return _constant_column(kwargs[name], count)
+        if name in self.distributions:
+            return self.distributions[name].sample_batch(rng, count)
+        return default()
+    
+    def create_columns(self, count: int, seed: Union[int, np.random.Generator, None] = None, **kwargs) -> ColumnBlock:
+        """
+        列式批量创建测试数据，每个字段一次性生成为 NumPy 数组。
+        默认实现退化为 create_batch 后再转换为列，子类应提供向量化实现。
+
+        :param count: 数据条数
+        :param seed: 随机种子或 numpy Generator，为 None 时使用随机熵
+        :return: ColumnBlock 列式数据块
+        """
+        return ColumnBlock.from_objects(self.model, self.create_batch(count, **kwargs))
+    
+    def iter_batch(self, count: int, chunk_size: int = 10000, columnar: bool = False,
+                   seed: Union[int, np.random.Generator, None] = None, **kwargs) -> Iterator[Union[List[TestData], ColumnBlock]]:
+        """
+        流式批量创建测试数据，按固定大小分块产出，内存占用只与 chunk_size 有关。
+
+        :param count: 数据总条数
+        :param chunk_size: 每块条数（最后一块可能不足）
+        :param columnar: 为 True 时每块为 ColumnBlock，否则为对象列表
+        :param seed: 列式模式下的随机种子，各块共享同一个随机数发生器
+        :return: 数据块迭代器
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size 必须大于 0")
+        rng = np.random.default_rng(seed) if columnar else None
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            if columnar:
+                yield self.create_columns(size, seed=rng, **kwargs)
+            else:
+                yield self.create_batch(size, **kwargs)
 
 # 具体工厂实现
 class UserDataFactory(TestDataFactory):
     """用户测试数据工厂"""
+    model = UserData
+    id_field = "user_id"
+    USERNAME_PREFIXES = ["user", "client", "customer", "member"]
+    TRANSITIONS = {"is_active": {True: [False]}}
+    
+    EMAIL_DOMAIN = "@example.com"
+    
+    def __init__(self, id_allocator: Optional[IdAllocator] = None, distributions: Optional[Dict[str, Distribution]] = None,
+                 username_generator: Optional[UniqueStringGenerator] = None):
+        """
+        :param id_allocator: 主键分配器
+        :param distributions: 字段取值分布，如 {"created_at": TimeOfDayDistribution(...)}
+        :param username_generator: 用户名生成器，默认 前缀_8 位数字，容量 4 亿；邮箱由用户名派生，同样不重复
+        """
+        self.id_allocator = id_allocator or SequentialIdAllocator(start=1000)
+        self.distributions = distributions or {}
+        self.username_generator = username_generator or UniqueStringGenerator([self.USERNAME_PREFIXES], digits=8)
+        self.unique_generators = {"username": self.username_generator}
+    
     def create(self, **kwargs) -> UserData:
         # 提供默认值或使用传入的参数
-        user_id = kwargs.get('user_id', random.randint(1000, 9999))
-        username = kwargs.get('username', self._generate_username())
-        email = kwargs.get('email', f"{username}@example.com")
-        is_active = kwargs.get('is_active', random.choice([True, False]))
-        created_at = kwargs.get('created_at', datetime.now() - timedelta(days=random.randint(0, 365)))
+        user_id = kwargs['user_id'] if 'user_id' in kwargs else self.id_allocator.allocate()
+        username = kwargs['username'] if 'username' in kwargs else self._generate_username()
+        email = kwargs.get('email', f"{username}{self.EMAIL_DOMAIN}")
+        is_active = self._draw('is_active', kwargs, lambda: random.choice([True, False]))
+        created_at = self._draw('created_at', kwargs, lambda: datetime.now() - timedelta(days=random.randint(0, 365)))
         
         return UserData(user_id, username, email, is_active, created_at)
     
     def create_batch(self, count: int, **kwargs) -> List[UserData]:
         return [self.create(**kwargs) for _ in range(count)]
     
+    def create_columns(self, count: int, seed: Union[int, np.random.Generator, None] = None,
+                       now: Optional[datetime] = None, **kwargs) -> ColumnBlock:
+        """:param now: 随机创建时间的参考时刻，固定后结果可复现"""
+        rng = np.random.default_rng(seed)
+        user_id = _constant_column(kwargs['user_id'], count) if 'user_id' in kwargs else self.id_allocator.reserve(count)
+        if 'username' in kwargs:
+            username = _constant_column(kwargs['username'], count)
+            email = np.char.add(username, self.EMAIL_DOMAIN)
+        else:
+            username = self.username_generator.batch(count)
+            # 邮箱由用户名列派生，同样不重复
+            email = np.char.add(username, self.EMAIL_DOMAIN)
+        if 'email' in kwargs:
+            email = _constant_column(kwargs['email'], count)
+        is_active = self._draw_column('is_active', kwargs, rng, count, lambda: rng.random(count) < 0.5)
+        created_at = self._draw_column('created_at', kwargs, rng, count, lambda: _random_created_at(rng, count, now))
+        
+        return ColumnBlock(UserData, {
+            "user_id": user_id,
+            "username": username,
+            "email": email,
+            "is_active": is_active,
+            "created_at": created_at
+        })
+    
     def _generate_username(self) -> str:
-        """生成随机用户名"""
-        prefix = random.choice(["user", "client", "customer", "member"])
-        suffix = ''.join(random.choices(string.digits, k=4))
-        return f"{prefix}_{suffix}"
+        """生成不重复的用户名"""
+        return self.username_generator.next()
 
 class ProductDataFactory(TestDataFactory):
     """产品测试数据工厂"""
+    model = ProductData
+    id_field = "product_id"
+    CATEGORIES = ["Electronics", "Clothing", "Books", "Home"]
+    NAME_ADJECTIVES = ["Premium", "Smart", "Eco", "Luxury", "Wireless", "Portable"]
+    NAME_NOUNS = ["Phone", "Laptop", "Watch", "Headphones", "Charger", "Speaker"]
+    
+    def __init__(self, id_allocator: Optional[IdAllocator] = None, distributions: Optional[Dict[str, Distribution]] = None,
+                 name_generator: Optional[UniqueStringGenerator] = None):
+        """
+        :param id_allocator: 主键分配器
+        :param distributions: 字段取值分布，如 {"category": ZipfDistribution(CATEGORIES, s=1.2)}
+        :param name_generator: 商品名生成器，默认 形容词 名词 7 位编号，容量 3.6 亿
+        """
+        self.id_allocator = id_allocator or SequentialIdAllocator(start=10000)
+        self.distributions = distributions or {}
+        self.name_generator = name_generator or UniqueStringGenerator([self.NAME_ADJECTIVES, self.NAME_NOUNS],
+                                                                      digits=7, separator=" ")
+        self.unique_generators = {"name": self.name_generator}
+    
     def create(self, **kwargs) -> ProductData:
-        product_id = kwargs.get('product_id', random.randint(10000, 99999))
-        name = kwargs.get('name', self._generate_product_name())
-        price = kwargs.get('price', round(random.uniform(5.0, 500.0), 2))
-        category = kwargs.get('category', random.choice(["Electronics", "Clothing", "Books", "Home"]))
-        in_stock = kwargs.get('in_stock', random.choice([True, False]))
+        product_id = kwargs['product_id'] if 'product_id' in kwargs else self.id_allocator.allocate()
+        name = kwargs['name'] if 'name' in kwargs else self._generate_product_name()
+        price = self._draw('price', kwargs, lambda: round(random.uniform(5.0, 500.0), 2))
+        category = self._draw('category', kwargs, lambda: random.choice(self.CATEGORIES))
+        in_stock = self._draw('in_stock', kwargs, lambda: random.choice([True, False]))
         
         return ProductData(product_id, name, price, category, in_stock)
     
     def create_batch(self, count: int, **kwargs) -> List[ProductData]:
         return [self.create(**kwargs) for _ in range(count)]
     
+    def create_columns(self, count: int, seed: Union[int, np.random.Generator, None] = None, **kwargs) -> ColumnBlock:
+        rng = np.random.default_rng(seed)
+        product_id = _constant_column(kwargs['product_id'], count) if 'product_id' in kwargs else self.id_allocator.reserve(count)
+        name = _constant_column(kwargs['name'], count) if 'name' in kwargs else self.name_generator.batch(count)
+        price = self._draw_column('price', kwargs, rng, count, lambda: np.round(rng.uniform(5.0, 500.0, count), 2))
+        category = self._draw_column('category', kwargs, rng, count,
+                                     lambda: np.array(self.CATEGORIES)[rng.integers(0, len(self.CATEGORIES), count)])
+        in_stock = self._draw_column('in_stock', kwargs, rng, count, lambda: rng.random(count) < 0.5)
+        
+        return ColumnBlock(ProductData, {
+            "product_id": product_id,
+            "name": name,
+            "price": price,
+            "category": category,
+            "in_stock": in_stock
+        })
+    
     def _generate_product_name(self) -> str:
-        """生成随机产品名"""
-        adjectives = ["Premium", "Smart", "Eco", "Luxury", "Wireless", "Portable"]
-        nouns = ["Phone", "Laptop", "Watch", "Headphones", "Charger", "Speaker"]
-        return f"{random.choice(adjectives)} {random.choice(nouns)}"
+        """生成不重复的产品名"""
+        return self.name_generator.next()
 
 class OrderDataFactory(TestDataFactory):
     """订单测试数据工厂"""
-    def __init__(self, user_factory: UserDataFactory, product_factory: ProductDataFactory):
+    model = OrderData
+    id_field = "order_id"
+    STATUSES = ["Pending", "Shipped", "Delivered", "Cancelled"]
+    # 每个订单的商品数上限
+    MAX_ITEMS = 5
+    TRANSITIONS = {"status": {"Pending": ["Shipped", "Cancelled"], "Shipped": ["Delivered"]}}
+    
+    def __init__(self, user_factory: UserDataFactory, product_factory: ProductDataFactory,
+                 id_allocator: Optional[IdAllocator] = None,
+                 user_pool: Optional[EntityPool] = None, product_pool: Optional[EntityPool] = None,
+                 distributions: Optional[Dict[str, Distribution]] = None):
+        """
+        :param user_pool: 用户实体池，设置后订单的 user_id 从池中抽样
+        :param product_pool: 商品实体池，设置后订单商品从池中抽样，池带价格时直接累加出总额
+        :param distributions: 字段取值分布，如 {"status": WeightedChoice(STATUSES, [3, 2, 4, 1])}
+        """
         self.user_factory = user_factory
         self.product_factory = product_factory
+        self.id_allocator = id_allocator or SequentialIdAllocator(start=100000)
+        self.user_pool = user_pool
+        self.product_pool = product_pool
+        self.distributions = distributions or {}
+    
+    def attach_pools(self, users: Union[ColumnBlock, List[UserData]], products: Union[ColumnBlock, List[ProductData]],
+                     skew: float = 0.0, product_zipf: Optional[float] = None):
+        """
+        以已生成（并已持久化）的用户、商品构建实体池，此后订单只引用池中的实体。
+
+        :param users: 用户数据块或用户对象列表
+        :param products: 商品数据块或商品对象列表
+        :param skew: 抽样倾斜度，0 为均匀
+        :param product_zipf: 商品热度的 Zipf 指数，设置后按池中顺序的 Zipf 分布抽样商品
+        """
+        user_builder = EntityPool.from_block if isinstance(users, ColumnBlock) else EntityPool.from_objects
+        product_builder = EntityPool.from_block if isinstance(products, ColumnBlock) else EntityPool.from_objects
+        self.user_pool = user_builder(users, "user_id", skew=skew)
+        self.product_pool = product_builder(products, "product_id", "price", skew=skew)
+        if product_zipf is not None:
+            self.product_pool.distribution = ZipfDistribution(len(self.product_pool), s=product_zipf)
     
     def create(self, **kwargs) -> OrderData:
-        order_id = kwargs.get('order_id', random.randint(100000, 999999))
+        order_id = kwargs['order_id'] if 'order_id' in kwargs else self.id_allocator.allocate()
+        
+        # 关联数据：优先使用传入的实体，其次从实体池抽样，最后才现场创建
+        if 'user' in kwargs:
+            user_id = kwargs['user'].user_id
+        elif self.user_pool is not None:
+            user_id = self.user_pool.ids[self.user_pool.sample_one()].item()
+        else:
+            user_id = self.user_factory.create().user_id
         
-        # 创建关联数据
-        user = kwargs.get('user', self.user_factory.create())
-        products = kwargs.get('products', [self.product_factory.create() for _ in range(random.randint(1, 5))])
+        if 'products' in kwargs:
+            product_ids = [p.product_id for p in kwargs['products']]
+            prices = [p.price for p in kwargs['products']]
+        elif self.product_pool is not None:
+            indices = [self.product_pool.sample_one() for _ in range(random.randint(1, self.MAX_ITEMS))]
+            product_ids = self.product_pool.ids[indices].tolist()
+            if self.product_pool.prices is not None:
+                prices = self.product_pool.prices[indices].tolist()
+            else:
+                prices = [round(random.uniform(5.0, 500.0), 2) for _ in indices]
+        else:
+            products = [self.product_factory.create() for _ in range(random.randint(1, self.MAX_ITEMS))]
+            product_ids = [p.product_id for p in products]
+            prices = [p.price for p in products]
         
         # 计算订单总额
-        total = sum(p.price for p in products)
+        total = sum(prices)
         
-        status = kwargs.get('status', random.choice(["Pending", "Shipped", "Delivered", "Cancelled"]))
+        status = self._draw('status', kwargs, lambda: random.choice(self.STATUSES))
         
         return OrderData(
             order_id=order_id,
-            user_id=user.user_id,
-            products=[p.product_id for p in products],
+            user_id=user_id,
+            products=product_ids,
             total=total,
             status=status
         )
     
     def create_batch(self, count: int, **kwargs) -> List[OrderData]:
         return [self.create(**kwargs) for _ in range(count)]
+    
+    def related_allocators(self) -> Dict[str, Tuple[IdAllocator, int]]:
+        """没有实体池时，每个订单占用一个用户 ID 和 MAX_ITEMS 个商品 ID（只用前若干个，其余跳过）"""
+        allocators = {}
+        if self.user_pool is None:
+            allocators["user_id"] = (self.user_factory.id_allocator, 1)
+        if self.product_pool is None:
+            allocators["product_ids"] = (self.product_factory.id_allocator, self.MAX_ITEMS)
+        return allocators
+    
+    def create_columns(self, count: int, seed: Union[int, np.random.Generator, None] = None, **kwargs) -> ColumnBlock:
+        """
+        没有实体池时与 create 一样引用新的用户、商品，但只从它们的分配器取 ID，不生成用户、商品本身；
+        商品价格按商品工厂的价格规则抽取。
+
+        :param user_id: 用户 ID 列（长度 count），默认从用户工厂的分配器预留
+        :param product_ids: 每行 MAX_ITEMS 个的商品 ID（长度 count * MAX_ITEMS），默认从商品工厂的分配器预留
+        """
+        rng = np.random.default_rng(seed)
+        order_id = _constant_column(kwargs['order_id'], count) if 'order_id' in kwargs else self.id_allocator.reserve(count)
+        if 'user' in kwargs:
+            user_id = _constant_column(kwargs['user'].user_id, count)
+        elif 'user_id' in kwargs:
+            user_id = _constant_column(kwargs['user_id'], count)
+        elif self.user_pool is not None:
+            user_id = self.user_pool.ids[self.user_pool.sample_indices(rng, count)]
+        else:
+            user_id = self.user_factory.id_allocator.reserve(count)
+        
+        if 'products' in kwargs:
+            fixed = kwargs['products']
+            offsets = np.arange(count + 1, dtype=np.int64) * len(fixed)
+            product_ids = np.tile(np.array([p.product_id for p in fixed], dtype=np.int64), count)
+            total = np.full(count, float(sum(p.price for p in fixed)))
+        else:
+            # 关联商品只需要 ID 和价格，不再为每个订单构造完整的商品对象
+            sizes = rng.integers(1, self.MAX_ITEMS + 1, count)
+            offsets = np.zeros(count + 1, dtype=np.int64)
+            np.cumsum(sizes, out=offsets[1:])
+            if self.product_pool is not None:
+                indices = self.product_pool.sample_indices(rng, offsets[-1])
+                product_ids = self.product_pool.ids[indices]
+                if self.product_pool.prices is not None:
+                    prices = self.product_pool.prices[indices]
+                else:
+                    prices = np.round(rng.uniform(5.0, 500.0, offsets[-1]), 2)
+            else:
+                slots = kwargs['product_ids'] if 'product_ids' in kwargs else \
+                    self.product_factory.id_allocator.reserve(count * self.MAX_ITEMS)
+                # 每行取自己那段 ID 的前 sizes[i] 个
+                product_ids = np.asarray(slots).reshape(count, self.MAX_ITEMS)[np.arange(self.MAX_ITEMS) < sizes[:, None]]
+                prices = self.product_factory._draw_column(
+                    'price', {}, rng, len(product_ids), lambda: np.round(rng.uniform(5.0, 500.0, len(product_ids)), 2))
+            total = np.add.reduceat(prices, offsets[:-1]) if count else np.zeros(0)
+        
+        status = self._draw_column('status', kwargs, rng, count,
+                                   lambda: np.array(self.STATUSES)[rng.integers(0, len(self.STATUSES), count)])
+        
+        return ColumnBlock(OrderData, {
+            "order_id": order_id,
+            "user_id": user_id,
+            "products": RaggedArray(product_ids, offsets),
+            "total": total,
+            "status": status
+        })
 
 # 工厂选择器
+class _PluginFactory:
+    """插件工厂的延迟构造器：首次构建时才通过类索引导入模块"""
+    def __init__(self, index, module: str, name: str):
+        self.index = index
+        self.module = module
+        self.name = name
+    
+    def __call__(self, *dependencies) -> TestDataFactory:
+        return self.index.load(self.module, self.name)(*dependencies)
+
 class TestDataFactorySelector:
-    """根据类型选择对应的工厂"""
-    def __init__(self):
-        self.factories = {
-            "user": UserDataFactory(),
-            "product": ProductDataFactory(),
-            "order": None  # 需要特殊处理
-        }
-        
-        # 初始化订单工厂需要依赖其他工厂
-        self.factories["order"] = OrderDataFactory(
-            self.factories["user"],
-            self.factories["product"]
-        )
+    """
+    根据类型选择对应的工厂。
+    工厂在首次 get_factory 时才构建，依赖的工厂先行构建并按顺序传给构造器（如订单工厂依赖用户、商品工厂）。
+    """
+    def __init__(self, plugin_index=None):
+        """
+        :param plugin_index: 插件类索引（auxiliary_layer/dynamic_scanner.py 中的 ClassIndex），设置后自动发现插件工厂
+        """
+        self.factories: Dict[str, TestDataFactory] = {}
+        self.builders: Dict[str, Any] = {}
+        self.dependencies: Dict[str, tuple] = {}
+        self.register_builder("user", UserDataFactory)
+        self.register_builder("product", ProductDataFactory)
+        self.register_builder("order", OrderDataFactory, depends_on=("user", "product"))
+        if plugin_index is not None:
+            self.discover(plugin_index)
     
     def get_factory(self, data_type: str) -> TestDataFactory:
-        """获取指定类型的工厂"""
-        factory = self.factories.get(data_type.lower())
-        if not factory:
+        """获取指定类型的工厂，未构建时连同其依赖一起构建"""
+        data_type = data_type.lower()
+        factory = self.factories.get(data_type)
+        if factory is None:
+            factory = self._build(data_type, ())
+        return factory
+    
+    def _build(self, data_type: str, path: tuple) -> TestDataFactory:
+        """按依赖关系深度优先构建工厂，path 为当前依赖链，用于发现循环依赖"""
+        if data_type in self.factories:
+            return self.factories[data_type]
+        if data_type not in self.builders:
             raise ValueError(f"Unsupported data type: {data_type}")
+        if data_type in path:
+            raise ValueError(f"工厂存在循环依赖: {' -> '.join(path + (data_type,))}")
+        dependencies = [self._build(name, path + (data_type,)) for name in self.dependencies[data_type]]
+        factory = self.builders[data_type](*dependencies)
+        self.factories[data_type] = factory
         return factory
+    
+    def iter_batch(self, data_type: str, count: int, chunk_size: int = 10000, **kwargs) -> Iterator[Union[List[TestData], ColumnBlock]]:
+        """按类型流式批量创建测试数据，参数同 TestDataFactory.iter_batch"""
+        return self.get_factory(data_type).iter_batch(count, chunk_size=chunk_size, **kwargs)
+    
+    def register(self, data_type: str, factory: TestDataFactory):
+        """注册（或替换）指定类型的工厂"""
+        self.factories[data_type.lower()] = factory
+    
+    def register_builder(self, data_type: str, builder, depends_on: tuple = ()):
+        """
+        注册工厂的构造方式，首次使用时才构建。
+
+        :param data_type: 数据类型
+        :param builder: 工厂类或可调用对象，以依赖的工厂为位置参数；多进程 spawn 模式下需可序列化
+        :param depends_on: 依赖的数据类型，按顺序传给 builder
+        """
+        data_type = data_type.lower()
+        self.builders[data_type] = builder
+        self.dependencies[data_type] = tuple(d.lower() for d in depends_on)
+        self.factories.pop(data_type, None)
+    
+    def discover(self, plugin_index) -> List[str]:
+        """
+        从类索引中发现插件工厂（只读索引，不导入模块）。
+        插件类需（直接或间接）继承 TestDataFactory，可用类属性 data_type 指定类型名（默认取类名去掉
+        DataFactory/Factory 后缀的小写）、depends_on 声明依赖的数据类型。
+
+        :param plugin_index: 类索引，需提供 find(base_names) 与 load(module, name)
+        :return: 发现的数据类型列表
+        """
+        base_names = {"TestDataFactory"}
+        pending = [TestDataFactory]
+        while pending:
+            cls = pending.pop()
+            for subclass in cls.__subclasses__():
+                base_names.add(subclass.__name__)
+                pending.append(subclass)
+        discovered = []
+        for entry in plugin_index.find(base_names):
+            attributes = entry["attributes"]
+            if "data_type" in attributes:
+                data_type = attributes["data_type"]
+            else:
+                name = entry["name"]
+                for suffix in ("DataFactory", "Factory"):
+                    if name.endswith(suffix) and name != suffix:
+                        name = name[:-len(suffix)]
+                        break
+                data_type = name.lower()
+            if data_type not in self.builders or isinstance(self.builders[data_type], _PluginFactory):
+                self.register_builder(data_type, _PluginFactory(plugin_index, entry["module"], entry["name"]),
+                                      depends_on=tuple(attributes.get("depends_on", ())))
+                discovered.append(data_type)
+        return discovered
+
+# 声明式实体编译
+class SchemaData(TestData):
+    """由实体声明编译出的数据模型基类，字段即 __slots__"""
+    __slots__ = ()
+    
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values[name])
+    
+    def to_dict(self) -> Dict:
+        result = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            result[name] = value.isoformat() if isinstance(value, datetime) else value
+        return result
+
+class _SchemaModelType(ABCMeta):
+    """编译出的数据模型的元类，序列化时按 (类名, 字段) 记录，见 _schema_model"""
+
+_SCHEMA_MODELS: Dict[Tuple[str, Tuple[str, ...]], Type[SchemaData]] = {}
+
+def _schema_model(class_name: str, fields: Tuple[str, ...]) -> Type[SchemaData]:
+    """
+    取得编译出的数据模型类，同名且字段相同的声明共用一个类。
+    模型类不挂到模块命名空间上，不会覆盖模块中的同名类；多进程生成时数据块按 (类名, 字段)
+    序列化，在另一端由本函数取回同一个类（或在工作进程中重建）。
+
+    :param class_name: 类名
+    :param fields: 字段名，即 __slots__
+    :return: SchemaData 的子类
+    """
+    key = (class_name, fields)
+    if key not in _SCHEMA_MODELS:
+        model = _SchemaModelType(class_name, (SchemaData,), {"__slots__": fields, "__module__": __name__})
+        _SCHEMA_MODELS.setdefault(key, model)
+    return _SCHEMA_MODELS[key]
+
+copyreg.pickle(_SchemaModelType, lambda model: (_schema_model, (model.__name__, model.__slots__)))
+
+class CompiledDataFactory(TestDataFactory):
+    """
+    由实体声明编译出的数据工厂。
+    编译时每个字段已解析为一个列生成函数，生成时每批只依次调用这些函数，不再逐行解析参数。
+    生成函数是闭包，序列化时只保存实体声明、分配进度与绑定的实体池，反序列化时重新编译
+    （多进程 spawn 模式下工作进程即按此重建工厂）。
+    """
+    def __init__(self, entity: str, model: Type[SchemaData], plan: List[tuple], id_field: Optional[str],
+                 id_allocator: Optional[IdAllocator], pools: Dict[str, EntityPool],
+                 refs: Dict[str, tuple], selector: TestDataFactorySelector,
+                 definition: Optional[Dict[str, Any]] = None,
+                 unique_generators: Optional[Dict[str, UniqueStringGenerator]] = None,
+                 unique_allocators: Optional[Dict[str, IdAllocator]] = None):
+        """
+        :param plan: [(字段名, 列生成函数)]，按声明顺序执行
+        :param pools: 外键字段绑定的实体池，与生成函数共享
+        :param refs: 外键字段到 (父实体, 父实体字段) 的映射
+        :param selector: 用于查找父实体工厂的工厂选择器
+        :param definition: 编译所用的实体声明
+        :param unique_generators: 唯一字符串字段的生成器
+        :param unique_allocators: 唯一数值字段的分配器
+        """
+        self.entity = entity
+        self.model = model
+        self.plan = plan
+        self.id_field = id_field
+        self.id_allocator = id_allocator
+        self.pools = pools
+        self.refs = refs
+        self.selector = selector
+        self.definition = definition
+        self.unique_generators = unique_generators or {}
+        self.unique_allocators = unique_allocators or {}
+    
+    def __getstate__(self):
+        return {
+            "definition": self.definition,
+            "selector": self.selector,
+            "pools": self.pools,
+            "allocated": {field: allocator.allocated for field, allocator in self.sequence_allocators().items()}
+        }
+    
+    def __setstate__(self, state):
+        rebuilt = SchemaCompiler(state["selector"]).compile(state["definition"])
+        self.__dict__.update(rebuilt.__dict__)
+        # 生成函数与 rebuilt.pools 共享同一个字典，原地更新
+        self.pools.update(state["pools"])
+        for field, allocator in self.sequence_allocators().items():
+            allocator.advance_to(state["allocated"][field])
+    
+    def bind(self, field: str, source: Union[EntityPool, ColumnBlock, List[TestData]], skew: float = 0.0):
+        """
+        为外键字段绑定父实体池（如已持久化的父表数据）；未绑定时从父工厂已分配的 ID 中抽样。
+
+        :param field: 外键字段名
+        :param source: 实体池、父实体数据块或对象列表
+        :param skew: 抽样倾斜度
+        """
+        if field not in self.refs:
+            raise ValueError(f"{self.entity}.{field} 不是外键字段")
+        parent_type, parent_field = self.refs[field]
+        parent_field = parent_field or self.selector.get_factory(parent_type).id_field
+        if isinstance(source, ColumnBlock):
+            source = EntityPool.from_block(source, parent_field, skew=skew)
+        elif not isinstance(source, EntityPool):
+            source = EntityPool.from_objects(source, parent_field, skew=skew)
+        self.pools[field] = source
+    
+    def create(self, **kwargs) -> SchemaData:
+        return self.create_columns(1, **kwargs)[0]
+    
+    def create_batch(self, count: int, **kwargs) -> List[SchemaData]:
+        return self.create_columns(count, **kwargs).to_objects()
+    
+    def create_columns(self, count: int, seed: Union[int, np.random.Generator, None] = None,
+                       now: Optional[datetime] = None, **kwargs) -> ColumnBlock:
+        rng = np.random.default_rng(seed)
+        columns = {}
+        context = {"now": now or datetime.now(), "columns": columns}
+        for name, generate in self.plan:
+            columns[name] = _constant_column(kwargs[name], count) if name in kwargs else generate(rng, count, context)
+        return ColumnBlock(self.model, columns)
+
+class SchemaCompiler:
+    """
+    实体声明编译器：把 YAML/JSON 中的实体声明编译为 CompiledDataFactory 并注册到工厂选择器。
+    声明可直接传入 user_layer/case_parser.py 的 CaseParser（或其 parse() 结果），格式示例：
+
+        - entity: customer
+          fields:
+            customer_id: {type: id, start: 1}
+            code: {type: string, prefix: "C", digits: 8, unique: true}
+            level: {type: choice, values: [gold, silver, bronze], weights: [1, 3, 6]}
+            age: {type: int, min: 18, max: 80, distribution: normal, mean: 35, std: 10}
+            balance: {type: float, min: 0, max: 10000, precision: 2}
+            active: {type: bool, probability: 0.8}
+            created_at: {type: datetime, days_back: 365}
+            owner_id: {type: ref, entity: user}
+            email: {type: format, template: "{code}@example.com"}
+
+    支持的字段类型：id、int、float、bool、choice、string、datetime、ref（外键）、format、constant；
+    choice 可用 weights 或 distribution: zipf（指数 s），datetime 可用 hour_weights 指定日内 24 小时的权重；
+    string 可用 words 指定词表组合（各段词表 + 编号）；
+    unique 仅适用于 id、int、string，由 ID 分配器保证不重复。
+    """
+    UNIQUE_TYPES = ("id", "int", "string")
+    
+    def __init__(self, selector: TestDataFactorySelector):
+        self.selector = selector
+    
+    def register(self, source: Any) -> List[str]:
+        """
+        编译并注册实体声明。
+
+        :param source: CaseParser 实例、声明列表或单个声明字典
+        :return: 注册的实体名列表
+        """
+        definitions = source.parse() if hasattr(source, "parse") else source
+        if isinstance(definitions, dict):
+            definitions = [definitions]
+        names = []
+        for definition in definitions:
+            factory = self.compile(definition)
+            self.selector.register(factory.entity, factory)
+            names.append(factory.entity)
+        return names
+    
+    def compile(self, definition: Dict[str, Any]) -> CompiledDataFactory:
+        """
+        编译单个实体声明。
+
+        :param definition: 实体声明字典
+        :return: CompiledDataFactory
+        :raises ValueError: 声明格式错误或字段类型不支持
+        """
+        entity = definition.get("entity")
+        fields = definition.get("fields")
+        if not entity or not isinstance(fields, dict) or not fields:
+            raise ValueError(f"实体声明需包含 entity 和 fields: {definition}")
+        id_field = definition.get("id_field")
+        id_allocator = None
+        pools: Dict[str, EntityPool] = {}
+        refs = {}
+        plan = []
+        unique_generators: Dict[str, UniqueStringGenerator] = {}
+        unique_allocators: Dict[str, IdAllocator] = {}
+        for name, spec in fields.items():
+            if isinstance(spec, str):
+                spec = {"type": spec}
+            field_type = spec.get("type")
+            compile_field = getattr(self, f"_compile_{field_type}", None)
+            if compile_field is None:
+                raise ValueError(f"{entity}.{name}: 不支持的字段类型 {field_type}")
+            if spec.get("unique") and field_type not in self.UNIQUE_TYPES:
+                raise ValueError(f"{entity}.{name}: {field_type} 类型不支持 unique")
+            generate, allocator = compile_field(entity, name, spec, pools)
+            if isinstance(allocator, UniqueStringGenerator):
+                unique_generators[name] = allocator
+                allocator = allocator.allocator
+            elif allocator is not None and field_type != "id":
+                unique_allocators[name] = allocator
+            if field_type == "ref":
+                refs[name] = (spec["entity"], spec.get("field"))
+            if field_type == "id" and id_field is None:
+                id_field = name
+            if name == id_field:
+                id_allocator = allocator
+            plan.append((name, generate))
+        
+        class_name = "".join(part.title() for part in entity.split("_")) + "Data"
+        model = _schema_model(class_name, tuple(fields))
+        return CompiledDataFactory(entity.lower(), model, plan, id_field, id_allocator, pools, refs, self.selector,
+                                   definition, unique_generators, unique_allocators)
+    
+    def _compile_id(self, entity, name, spec, pools):
+        start = spec.get("start", 1)
+        if spec.get("shuffle"):
+            allocator = PermutationIdAllocator(start, spec["max"] + 1, seed=spec.get("seed", 0))
+        else:
+            allocator = SequentialIdAllocator(start)
+        return (lambda rng, count, context: allocator.reserve(count)), allocator
+    
+    def _compile_int(self, entity, name, spec, pools):
+        low, high = spec.get("min", 0), spec.get("max", 2 ** 31 - 1)
+        if spec.get("unique"):
+            allocator = PermutationIdAllocator(low, high + 1, seed=spec.get("seed", 0))
+            return (lambda rng, count, context: allocator.reserve(count)), allocator
+        if spec.get("distribution", "uniform") == "normal":
+            normal = NormalDistribution(spec.get("mean", (low + high) / 2), spec.get("std", (high - low) / 6), low, high, 0)
+            return (lambda rng, count, context: normal.sample_batch(rng, count)), None
+        return (lambda rng, count, context: rng.integers(low, high + 1, count)), None
+    
+    def _compile_float(self, entity, name, spec, pools):
+        low, high = spec.get("min", 0.0), spec.get("max", 1.0)
+        precision = spec.get("precision", 2)
+        if spec.get("distribution", "uniform") == "normal":
+            normal = NormalDistribution(spec.get("mean", (low + high) / 2), spec.get("std", (high - low) / 6),
+                                        low, high, precision)
+            return (lambda rng, count, context: normal.sample_batch(rng, count)), None
+        return (lambda rng, count, context: np.round(rng.uniform(low, high, count), precision)), None
+    
+    def _compile_bool(self, entity, name, spec, pools):
+        probability = spec.get("probability", 0.5)
+        return (lambda rng, count, context: rng.random(count) < probability), None
+    
+    def _compile_choice(self, entity, name, spec, pools):
+        values = np.array(spec["values"])
+        # 别名表只在编译时构建一次
+        if spec.get("distribution") == "zipf":
+            distribution = ZipfDistribution(spec["values"], s=spec.get("s", 1.0))
+            return (lambda rng, count, context: distribution.sample_batch(rng, count)), None
+        if "weights" in spec:
+            distribution = WeightedChoice(spec["values"], spec["weights"])
+            return (lambda rng, count, context: distribution.sample_batch(rng, count)), None
+        return (lambda rng, count, context: values[rng.integers(0, len(values), count)]), None
+    
+    def _compile_string(self, entity, name, spec, pools):
+        prefix, suffix, digits = spec.get("prefix", ""), spec.get("suffix", ""), spec.get("digits", 6)
+        if "words" in spec:
+            # 词表组合 + 编号，如 words: [[Red, Blue], [Cup, Pen]] -> "Red_Pen_000042"
+            generator = UniqueStringGenerator(spec["words"], digits, spec.get("separator", "_"), seed=spec.get("seed", 0),
+                                              suffix=suffix)
+        elif spec.get("unique"):
+            # 只有前缀时即单个词的词表，前缀后不加分隔符
+            generator = UniqueStringGenerator([[prefix]], digits, "", seed=spec.get("seed", 0), suffix=suffix)
+        if spec.get("unique"):
+            # 返回生成器，登记为唯一字段，多进程生成时由父进程按分片预留取值
+            return (lambda rng, count, context: generator.batch(count)), generator
+        if "words" in spec:
+            return (lambda rng, count, context: generator.value_at(rng.integers(0, generator.capacity, count))), None
+        return (lambda rng, count, context:
+                _format_numbers(prefix, rng.integers(0, 10 ** digits, count), digits, suffix)), None
+    
+    def _compile_datetime(self, entity, name, spec, pools):
+        days_back = spec.get("days_back", 365)
+        if "hour_weights" in spec:
+            hour_table = AliasTable(spec["hour_weights"])
+            def generate(rng, count, context):
+                now = np.datetime64(context["now"], "us")
+                midnight = now.astype("datetime64[D]").astype("datetime64[us]")
+                days = rng.integers(0, days_back + 1, count).astype("timedelta64[D]")
+                seconds = (hour_table.sample_indices(rng, count) * 3600 + rng.integers(0, 3600, count)).astype("timedelta64[s]")
+                return np.minimum(midnight - days + seconds, now)
+            return generate, None
+        def generate(rng, count, context):
+            now = np.datetime64(context["now"], "us")
+            return now - rng.integers(0, days_back + 1, count).astype("timedelta64[D]")
+        return generate, None
+    
+    def _compile_ref(self, entity, name, spec, pools):
+        parent_type = spec["entity"]
+        skew = spec.get("skew", 0.0)
+        def generate(rng, count, context):
+            if name in pools:
+                pool = pools[name]
+                return pool.ids[pool.sample_indices(rng, count)]
+            # 未绑定实体池时，从父工厂已分配出的 ID 中抽样，保证外键指向已生成的数据
+            allocator = self.selector.get_factory(parent_type).id_allocator
+            if allocator is None or allocator.allocated == 0:
+                raise ValueError(f"{entity}.{name}: 父实体 {parent_type} 尚未生成数据，请先生成或绑定实体池")
+            u = rng.random(count)
+            if skew:
+                u = u ** (1.0 + skew)
+            return allocator.id_at((u * allocator.allocated).astype(np.int64))
+        return generate, None
+    
+    def _compile_format(self, entity, name, spec, pools):
+        parts = list(string.Formatter().parse(spec["template"]))
+        def generate(rng, count, context):
+            result = np.full(count, "")
+            for literal, field, _, _ in parts:
+                if literal:
+                    result = np.char.add(result, literal)
+                if field:
+                    result = np.char.add(result, context["columns"][field].astype(str))
+            return result
+        return generate, None
+    
+    def _compile_constant(self, entity, name, spec, pools):
+        value = spec["value"]
+        return (lambda rng, count, context: _constant_column(value, count)), None
+
+# 多进程分片生成
+_worker_selector: Optional[TestDataFactorySelector] = None
+
+def _init_worker(selector: TestDataFactorySelector):
+    """工作进程初始化：每个进程只构建一次工厂"""
+    global _worker_selector
+    _worker_selector = selector
+
+def _generate_shard(task) -> ColumnBlock:
+    """在工作进程中生成一个分片，随机状态完全由分片种子决定"""
+    data_type, size, seed_seq, kwargs = task
+    # 没有向量化实现的工厂会退化到全局 random 模块，一并设定种子
+    random.seed(int(seed_seq.generate_state(1)[0]))
+    factory = _worker_selector.get_factory(data_type)
+    return factory.create_columns(size, seed=np.random.default_rng(seed_seq), **kwargs)
+
+class ParallelDataGenerator:
+    """
+    多进程分片数据生成器。
+    按固定的 shard_size 切分总条数，第 i 个分片的种子由 (seed, i) 派生，
+    因此输出只取决于 seed 和 shard_size，与工作进程数无关，可逐位复现。
+    """
+    def __init__(self, selector: Optional[TestDataFactorySelector] = None, workers: Optional[int] = None,
+                 shard_size: int = 100000, start_method: Optional[str] = None):
+        """
+        :param selector: 工厂选择器，默认新建
+        :param workers: 工作进程数，默认 CPU 核数；为 1 时在当前进程内生成
+        :param shard_size: 每个分片的条数
+        :param start_method: multiprocessing 启动方式（fork/spawn/forkserver），默认平台缺省值
+        """
+        if shard_size <= 0:
+            raise ValueError("shard_size 必须大于 0")
+        self.selector = selector or TestDataFactorySelector()
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.start_method = start_method
+    
+    def shard_seeds(self, seed: int, shard_count: int) -> List[np.random.SeedSequence]:
+        """派生各分片的独立种子"""
+        return [np.random.SeedSequence(seed, spawn_key=(i,)) for i in range(shard_count)]
+    
+    def generate(self, data_type: str, count: int, seed: int = 0, **kwargs) -> Iterator[ColumnBlock]:
+        """
+        并行生成测试数据，按分片顺序产出 ColumnBlock。
+
+        :param data_type: 数据类型（user/product/order）
+        :param count: 数据总条数
+        :param seed: 根种子
+        :param kwargs: 传给 create_columns 的参数；未指定 now 时统一使用本次调用的时刻
+        :return: 分片数据块迭代器
+        """
+        kwargs.setdefault('now', datetime.now())
+        factory = self.selector.get_factory(data_type)
+        allocator = getattr(factory, 'id_allocator', None)
+        sizes = [min(self.shard_size, count - start) for start in range(0, count, self.shard_size)]
+        tasks = []
+        for size, seed_seq in zip(sizes, self.shard_seeds(seed, len(sizes))):
+            shard_kwargs = kwargs
+            if allocator is not None and factory.id_field not in kwargs:
+                # 主键在父进程按分片顺序预留，各进程的分配器副本不会产生重复 ID
+                shard_kwargs = dict(kwargs, **{factory.id_field: allocator.reserve(size)})
+            for field, generator in factory.unique_generators.items():
+                # 唯一字符串、数值字段同理
+                if field not in kwargs:
+                    shard_kwargs = dict(shard_kwargs, **{field: generator.batch(size)})
+            for field, unique_allocator in factory.unique_allocators.items():
+                if field not in kwargs:
+                    shard_kwargs = dict(shard_kwargs, **{field: unique_allocator.reserve(size)})
+            for field, (related, per_row) in factory.related_allocators().items():
+                # 关联实体的 ID 同样在父进程预留（如订单引用的用户、商品 ID）
+                if field not in kwargs:
+                    shard_kwargs = dict(shard_kwargs, **{field: related.reserve(size * per_row)})
+            tasks.append((data_type, size, seed_seq, shard_kwargs))
+        if self.workers == 1 or len(tasks) <= 1:
+            _init_worker(self.selector)
+            for task in tasks:
+                yield _generate_shard(task)
+            return
+        context = multiprocessing.get_context(self.start_method)
+        with context.Pool(min(self.workers, len(tasks)), initializer=_init_worker, initargs=(self.selector,)) as pool:
+            # imap 按提交顺序返回结果，同时保持所有进程忙碌
+            yield from pool.imap(_generate_shard, tasks)
+
+# 夹具缓存
+def _key_value(value: Any) -> Any:
+    """
+    把缓存键中的参数转换为 JSON 可表示的形式：数组按 dtype、形状与全部字节的摘要表示，不经过会省略元素的 repr；
+    无法可靠表示的参数直接报错，不生成可能冲突的键。
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, np.generic):
+        return _key_value(value.item())
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return {"objects": _key_value(value.tolist()), "shape": list(value.shape)}
+        digest = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return {"ndarray": value.dtype.str, "shape": list(value.shape), "sha256": digest}
+    if isinstance(value, (list, tuple)):
+        return [_key_value(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _key_value(v) for k, v in value.items()}
+    if isinstance(value, TestData):
+        return {"model": type(value).__qualname__, "fields": _key_value(value.to_dict())}
+    raise TypeError(f"参数无法作为缓存键: {type(value).__name__}")
+
+class FixtureCache:
+    """
+    测试数据夹具缓存：按 (数据类型, 工厂类, 条数, 种子, 参考时刻, 各分配器（含关联实体的分配器）的起始序号, 参数)
+    的内容哈希寻址，数组参数按全部内容计入；
+    相同的键总是对应相同的数据。首次生成后每列存为一个 .npy 文件，之后以内存映射方式只读加载，
+    不复制、不解析、不重新生成；命中时同样把工厂的分配器推进到缓存数据之后，后续生成不会与之重复。
+    磁盘占用超过 max_bytes 时按最近使用时间（LRU）淘汰。
+    """
+    META_FILE = "meta.json"
+    # 未指定参考时刻时固定使用的时刻，保证随机创建时间可复现
+    DEFAULT_NOW = datetime(2024, 1, 1)
+    
+    def __init__(self, cache_dir: str, selector: Optional[TestDataFactorySelector] = None,
+                 max_bytes: int = 2 * 1024 ** 3, now: Optional[datetime] = None):
+        """
+        :param cache_dir: 缓存目录
+        :param selector: 未命中时用于生成数据的工厂选择器，默认新建
+        :param max_bytes: 缓存目录的容量上限（字节）
+        :param now: 随机时间字段的参考时刻，默认 DEFAULT_NOW
+        """
+        self.cache_dir = cache_dir
+        self.selector = selector or TestDataFactorySelector()
+        self.max_bytes = max_bytes
+        self.now = now or self.DEFAULT_NOW
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def _allocators(factory: TestDataFactory) -> Dict[str, Tuple[IdAllocator, int]]:
+        """生成时推进的分配器及每行占用的序号数：主键、唯一字段与关联实体的 ID"""
+        allocators = {field: (allocator, 1) for field, allocator in factory.sequence_allocators().items()}
+        allocators.update(factory.related_allocators())
+        return allocators
+    
+    def _allocated(self, factory: TestDataFactory, count: int, kwargs: Dict[str, Any]) -> Dict[str, List[int]]:
+        """各分配器本次将占用的序号区间 [起始, 结束)；调用方指定了取值的字段不占用序号"""
+        return {field: [allocator.allocated, allocator.allocated + count * per_row]
+                for field, (allocator, per_row) in self._allocators(factory).items() if field not in kwargs}
+    
+    def key(self, data_type: str, count: int, seed: int, **kwargs) -> str:
+        """
+        计算缓存键（取决于工厂及其关联工厂分配器当前的位置）。
+
+        :raises TypeError: 参数无法可靠地计入缓存键
+        """
+        factory = self.selector.get_factory(data_type)
+        kwargs.setdefault("now", self.now)
+        return self._hash(data_type, factory, count, seed, self._allocated(factory, count, kwargs), kwargs)
+    
+    @staticmethod
+    def _hash(data_type: str, factory: TestDataFactory, count: int, seed: int, allocated: Dict[str, List[int]],
+              kwargs: Dict[str, Any]) -> str:
+        content = json.dumps({
+            "data_type": data_type.lower(),
+            "factory": f"{type(factory).__module__}.{type(factory).__qualname__}",
+            "count": count,
+            "seed": seed,
+            "allocated": allocated,
+            "kwargs": _key_value(kwargs)
+        }, sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    def get(self, data_type: str, count: int, seed: int, **kwargs) -> Optional[ColumnBlock]:
+        """
+        读取缓存，未命中返回 None；命中时把工厂的分配器推进到缓存数据占用的序号之后。
+
+        :return: 列为只读内存映射数组的 ColumnBlock
+        """
+        return self._load(self.key(data_type, count, seed, **kwargs), data_type)
+    
+    def _load(self, key: str, data_type: str) -> Optional[ColumnBlock]:
+        entry = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry, self.META_FILE)
+        if not os.path.isfile(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        # 更新访问时间，作为 LRU 淘汰依据
+        os.utime(meta_path)
+        factory = self.selector.get_factory(data_type)
+        allocators = self._allocators(factory)
+        for field, (_, end) in meta["allocated"].items():
+            allocators[field][0].advance_to(end)
+        columns = {}
+        for name, ragged in meta["columns"]:
+            if ragged:
+                columns[name] = RaggedArray(np.load(os.path.join(entry, f"{name}.values.npy"), mmap_mode="r"),
+                                            np.load(os.path.join(entry, f"{name}.offsets.npy"), mmap_mode="r"))
+            else:
+                columns[name] = np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+        return ColumnBlock(factory.model, columns)
+    
+    def put(self, data_type: str, count: int, seed: int, block: ColumnBlock, key: Optional[str] = None,
+            **kwargs) -> str:
+        """
+        写入缓存：先写临时目录再原子重命名，多个进程并发写同一键时只保留先完成的一份。
+
+        :param key: 生成 block 之前计算的缓存键；默认按分配器已推进 count 条倒推，即 block 须是该工厂刚生成的数据
+        :return: 缓存条目目录
+        """
+        factory = self.selector.get_factory(data_type)
+        kwargs.setdefault("now", self.now)
+        allocated = {field: [2 * start - end, start]
+                     for field, (start, end) in self._allocated(factory, count, kwargs).items()}
+        if key is None:
+            # 分配器已为 block 推进过，按生成前的位置计算键
+            key = self._hash(data_type, factory, count, seed, allocated, kwargs)
+        entry = os.path.join(self.cache_dir, key)
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            for name, col in block.columns.items():
+                if isinstance(col, RaggedArray):
+                    np.save(os.path.join(staging, f"{name}.values.npy"), col.values)
+                    np.save(os.path.join(staging, f"{name}.offsets.npy"), col.offsets)
+                else:
+                    np.save(os.path.join(staging, f"{name}.npy"), col)
+            meta = {"data_type": data_type, "count": count, "seed": seed, "allocated": allocated,
+                    "columns": [[name, isinstance(col, RaggedArray)] for name, col in block.columns.items()]}
+            with open(os.path.join(staging, self.META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.rename(staging, entry)
+        except OSError:
+            if not os.path.isdir(entry):
+                raise
+        finally:
+            if os.path.isdir(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+        return entry
+    
+    def get_or_create(self, data_type: str, count: int, seed: int = 0, **kwargs) -> ColumnBlock:
+        """
+        读取缓存，未命中时生成、写入后再以内存映射方式返回。
+
+        :param data_type: 数据类型
+        :param count: 数据条数
+        :param seed: 随机种子
+        :param kwargs: 传给 create_columns 的参数；未指定 now 时使用缓存的参考时刻
+        :return: ColumnBlock
+        """
+        kwargs.setdefault("now", self.now)
+        key = self.key(data_type, count, seed, **kwargs)
+        block = self._load(key, data_type)
+        if block is None:
+            generated = self.selector.get_factory(data_type).create_columns(count, seed=seed, **kwargs)
+            self.put(data_type, count, seed, generated, key=key, **kwargs)
+            block = self._load(key, data_type)
+        return block
+    
+    def _entries(self) -> List[tuple]:
+        """全部缓存条目：(最近访问时间, 字节数, 目录)"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry, self.META_FILE)
+            if name.startswith(".") or not os.path.isfile(meta_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.path.getmtime(meta_path), size, entry))
+        return entries
+    
+    def size(self) -> int:
+        """缓存占用的字节数"""
+        return sum(size for _, size, _ in self._entries())
+    
+    def evict(self) -> int:
+        """
+        按 LRU 淘汰条目直到不超过容量上限（已映射的文件在 POSIX 下删除后仍可继续读取）。
+
+        :return: 淘汰的条目数
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            evicted += 1
+        return evicted
+    
+    def clear(self):
+        """清空缓存"""
+        for _, _, entry in self._entries():
+            shutil.rmtree(entry, ignore_errors=True)
+
+# 增量数据
+class DatasetManifest:
+    """
+    数据集清单（JSON）：记录每个实体的种子、行数、主键/唯一字段占用的序号区间、版本与变更历史。
+    可变字段的当前取值以每行 1 字节的编码存于清单旁的 .state 文件，每个版本一个文件；
+    新版本的状态文件先写临时文件，提交时改名，清单保存后才删除旧版本，中途失败时清单与状态保持旧版本。
+    """
+    def __init__(self, path: str):
+        """:param path: 清单文件路径，不存在时新建空清单"""
+        self.path = path
+        self.entities: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entities = json.load(f)["entities"]
+    
+    def state_path(self, data_type: str, field: str, version: Optional[int] = None) -> str:
+        """可变字段状态文件路径，默认为已提交的版本"""
+        if version is None:
+            version = self.entities[data_type]["version"]
+        return f"{os.path.splitext(self.path)[0]}.{data_type}.{field}.v{version}.state"
+    
+    def stage(self, data_type: str, fields: Sequence[str], version: Optional[int] = None) -> Dict[str, str]:
+        """
+        为新版本准备状态文件：复制已提交版本的状态到临时文件，之后的修改只写临时文件。
+
+        :param data_type: 数据类型
+        :param fields: 可变字段
+        :param version: 已提交的版本，None 表示实体尚不存在（从空状态开始）
+        :return: {字段: 临时文件路径}
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        staged = {}
+        try:
+            for field in fields:
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".state.tmp")
+                os.close(fd)
+                staged[field] = tmp_path
+                if version is not None:
+                    shutil.copyfile(self.state_path(data_type, field, version), tmp_path)
+        except BaseException:
+            self.discard(staged)
+            raise
+        return staged
+    
+    @staticmethod
+    def discard(staged: Dict[str, str]):
+        """删除未提交的临时状态文件"""
+        for tmp_path in staged.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def commit(self, data_type: str, entity: Dict[str, Any], staged: Dict[str, str]):
+        """
+        提交实体的新版本：临时状态文件改名为新版本的状态文件，原子写入清单，再删除旧版本的状态文件。
+
+        :param data_type: 数据类型
+        :param entity: 新版本的实体记录
+        :param staged: stage 返回的临时文件
+        """
+        previous = self.entities.get(data_type)
+        for field, tmp_path in staged.items():
+            os.replace(tmp_path, self.state_path(data_type, field, entity["version"]))
+        self.entities[data_type] = entity
+        self.save()
+        if previous is not None and previous["version"] != entity["version"]:
+            for field in previous["state"]:
+                old_path = self.state_path(data_type, field, previous["version"])
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+    
+    def save(self):
+        """原子写入清单"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"entities": self.entities}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+class ChangeBatch:
+    """
+    变更流中的一批变更，均可按主键 upsert 应用（如 DBHelper.bulk_load(..., upsert_key=key)）。
+    op 为 insert（新增行，包含全部字段）或 update（只包含主键与变化的字段）。
+    """
+    def __init__(self, data_type: str, op: str, key: str, columns: Dict[str, Any], version: int):
+        self.data_type = data_type
+        self.op = op
+        self.key = key
+        self.columns = columns
+        self.version = version
+    
+    @property
+    def fields(self) -> List[str]:
+        return list(self.columns)
+    
+    def __len__(self) -> int:
+        return len(self.columns[self.key])
+
+class DeltaGenerator:
+    """
+    增量数据生成器：基于数据集清单，只生成新增的行和发生变化的行（如订单状态迁移、用户停用），
+    耗时与变更量成正比，而与数据集规模无关（提交时另需顺序复制每行 1 字节的状态文件）。
+    同一清单版本、同一种子生成的增量可复现。
+    变更流完整消费后才提交新版本；中途停止消费或消费方出错时，清单与状态文件保持原版本，可以重新生成。
+    """
+    def __init__(self, manifest: DatasetManifest, selector: Optional[TestDataFactorySelector] = None):
+        """
+        :param manifest: 数据集清单
+        :param selector: 工厂选择器，默认新建
+        """
+        self.manifest = manifest
+        self.selector = selector or TestDataFactorySelector()
+    
+    def generate_base(self, data_type: str, count: int, seed: int = 0, chunk_size: int = 100000,
+                      now: Optional[datetime] = None, **kwargs) -> Iterator[ColumnBlock]:
+        """
+        生成基础数据集并写入清单（版本 0）。
+
+        :param data_type: 数据类型
+        :param count: 行数
+        :param seed: 随机种子
+        :param chunk_size: 每块行数
+        :param now: 随机创建时间的参考时刻，默认当前时间
+        :return: 数据块迭代器，完整消费后才写入清单
+        """
+        data_type = data_type.lower()
+        if data_type in self.manifest.entities:
+            raise ValueError(f"数据集中已存在实体: {data_type}")
+        factory = self.selector.get_factory(data_type)
+        now = now or datetime.now()
+        entity = {
+            "factory": type(factory).__qualname__,
+            "seed": seed,
+            "now": now.isoformat(),
+            "rows": 0,
+            "version": 0,
+            "ranges": {field: [] for field in self._range_fields(factory)},
+            "state": {field: {"domain": []} for field in factory.TRANSITIONS},
+            "history": [{"version": 0, "seed": seed, "appended": count, "mutated": {}}]
+        }
+        staged = self.manifest.stage(data_type, entity["state"])
+        try:
+            yield from self._append(factory, entity, count, np.random.default_rng(seed), chunk_size,
+                                    dict(kwargs, now=now), staged)
+            self.manifest.commit(data_type, entity, staged)
+        finally:
+            self.manifest.discard(staged)
+    
+    def generate_delta(self, data_type: str, append: int = 0, mutate: Optional[Dict[str, int]] = None,
+                       seed: Optional[int] = None, chunk_size: int = 100000, now: Optional[datetime] = None,
+                       **kwargs) -> Iterator[ChangeBatch]:
+        """
+        生成一个新版本的增量变更流：先是已有行的状态迁移（update），再是新增行（insert）。
+
+        :param data_type: 数据类型
+        :param append: 新增行数，主键与唯一字段从清单记录的区间之后继续分配
+        :param mutate: 各可变字段要迁移的行数，如 {"status": 1000}；处于终态的行不会被选中
+        :param seed: 本次增量的种子，默认由基础种子和版本号派生
+        :param chunk_size: 新增行每块的行数
+        :param now: 新增行创建时间的参考时刻，默认当前时间
+        :return: 变更批次迭代器，完整消费后清单与状态文件才更新到新版本
+        """
+        data_type = data_type.lower()
+        if data_type not in self.manifest.entities:
+            raise ValueError(f"数据集中不存在实体: {data_type}")
+        # 在副本上修改，提交时才替换清单中的记录
+        entity = copy.deepcopy(self.manifest.entities[data_type])
+        factory = self.selector.get_factory(data_type)
+        mutate = mutate or {}
+        for field in mutate:
+            if field not in factory.TRANSITIONS:
+                raise ValueError(f"字段不支持状态迁移: {field}")
+        version = entity["version"] + 1
+        if seed is None:
+            seed = int(np.random.SeedSequence(entity["seed"], spawn_key=(version,)).generate_state(1)[0])
+        rng = np.random.default_rng(seed)
+        staged = self.manifest.stage(data_type, entity["state"], entity["version"])
+        try:
+            for field, count in mutate.items():
+                batch = self._mutate(data_type, factory, entity, field, count, rng, version, staged[field])
+                if len(batch):
+                    yield batch
+            for block in self._append(factory, entity, append, rng, chunk_size,
+                                      dict(kwargs, now=now or datetime.now()), staged):
+                yield ChangeBatch(data_type, "insert", factory.id_field, block.columns, version)
+            entity["version"] = version
+            entity["history"].append({"version": version, "seed": seed, "appended": append, "mutated": mutate})
+            self.manifest.commit(data_type, entity, staged)
+        finally:
+            self.manifest.discard(staged)
+    
+    def ids(self, data_type: str) -> np.ndarray:
+        """按清单还原实体的全部主键，可用于构建实体池"""
+        data_type = data_type.lower()
+        factory = self.selector.get_factory(data_type)
+        segments = self.manifest.entities[data_type]["ranges"][factory.id_field]
+        index = [np.arange(start, end, dtype=np.int64) for start, end in segments]
+        return factory.id_allocator.id_at(np.concatenate(index) if index else np.zeros(0, dtype=np.int64))
+    
+    @staticmethod
+    def _range_fields(factory: TestDataFactory) -> Dict[str, IdAllocator]:
+        """需要记录序号区间的字段：主键与唯一字段"""
+        return factory.sequence_allocators()
+    
+    def _append(self, factory, entity, count, rng, chunk_size, kwargs, staged) -> Iterator[ColumnBlock]:
+        """续接清单记录的序号生成新增行，可变字段状态追加到临时状态文件"""
+        allocators = self._range_fields(factory)
+        for field, allocator in allocators.items():
+            segments = entity["ranges"][field]
+            if segments:
+                allocator.advance_to(segments[-1][1])
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            before = {field: allocator.allocated for field, allocator in allocators.items()}
+            block = factory.create_columns(size, seed=rng, **kwargs)
+            for field, allocator in allocators.items():
+                segments = entity["ranges"][field]
+                if segments and segments[-1][1] == before[field]:
+                    segments[-1][1] = allocator.allocated
+                else:
+                    segments.append([before[field], allocator.allocated])
+            for field, state in entity["state"].items():
+                with open(staged[field], "ab") as f:
+                    f.write(self._encode(state, block.columns[field]).tobytes())
+            entity["rows"] += size
+            yield block
+    
+    @staticmethod
+    def _encode(state: Dict[str, Any], column: np.ndarray) -> np.ndarray:
+        """字段值编码为取值域下标，新出现的值追加到取值域"""
+        domain = state["domain"]
+        unique, inverse = np.unique(column, return_inverse=True)
+        codes = []
+        for value in unique.tolist():
+            if value not in domain:
+                domain.append(value)
+            codes.append(domain.index(value))
+        if len(domain) > 256:
+            raise ValueError("可变字段的取值超过 256 种")
+        return np.asarray(codes, dtype=np.uint8)[inverse.ravel()]
+    
+    def _mutate(self, data_type, factory, entity, field, count, rng, version, state_path) -> ChangeBatch:
+        """随机选取可迁移的行，按迁移表改变临时状态文件中的状态，只读写被选中的行"""
+        state = entity["state"][field]
+        transitions = factory.TRANSITIONS[field]
+        for targets in transitions.values():
+            for value in targets:
+                if value not in state["domain"]:
+                    state["domain"].append(value)
+        domain = state["domain"]
+        # 迁移表：当前取值编码 -> 可迁移到的取值编码
+        options = [[domain.index(t) for t in transitions.get(value, [])] for value in domain]
+        widths = np.array([len(o) for o in options])
+        table = np.zeros((len(domain), max(widths.max(), 1)), dtype=np.uint8)
+        for code, targets in enumerate(options):
+            table[code, :len(targets)] = targets
+        rows = entity["rows"]
+        if rows:
+            codes = np.memmap(state_path, dtype=np.uint8, mode="r+", shape=(rows,))
+        else:
+            codes = np.zeros(0, dtype=np.uint8)
+        chosen = np.zeros(0, dtype=np.int64)
+        # 终态行会被剔除，多抽几轮补足
+        for _ in range(8):
+            if len(chosen) >= count or not rows:
+                break
+            candidates = rng.integers(0, rows, 2 * (count - len(chosen)))
+            candidates = candidates[widths[codes[candidates]] > 0]
+            chosen = np.union1d(chosen, candidates)
+        chosen = np.sort(rng.permutation(chosen)[:count])
+        current = codes[chosen]
+        updated = table[current, (rng.random(len(chosen)) * widths[current]).astype(np.int64)]
+        codes[chosen] = updated
+        if isinstance(codes, np.memmap):
+            codes.flush()
+        # 行号 -> 主键：按各序号区间的累计长度定位
+        segments = np.array(entity["ranges"][factory.id_field], dtype=np.int64).reshape(-1, 2)
+        ends = np.cumsum(segments[:, 1] - segments[:, 0])
+        segment = np.searchsorted(ends, chosen, side="right")
+        offset = chosen - (ends - (segments[:, 1] - segments[:, 0]))[segment]
+        key = factory.id_allocator.id_at(segments[segment, 0] + offset)
+        return ChangeBatch(data_type, "update", factory.id_field,
+                           {factory.id_field: key, field: np.array(domain)[updated]}, version)
 
 # 使用示例
 if __name__ == "__main__":
@@ -194,6 +2029,58 @@ if __name__ == "__main__":
     order = order_factory.create()
     print("\n订单数据:", order.to_dict())
     
+    # 流式分块创建，内存占用与总条数无关
+    for chunk in factory_selector.iter_batch("order", 25000, chunk_size=10000, columnar=True, seed=7):
+        print("订单数据块:", len(chunk), "条")
+    
+    # 列式批量创建（向量化生成，按需物化为对象）
+    block = order_factory.create_columns(100000, seed=42)
+    print("\n列式订单数据:", len(block), "条，首条:", block[0].to_dict())
+    
+    # 订单从已生成的用户、商品实体池中抽样关联，外键总能关联上
+    users = user_factory.create_columns(1000, seed=1)
+    catalog = product_factory.create_columns(200, seed=2)
+    order_factory.attach_pools(users, catalog, skew=1.0, product_zipf=1.1)
+    order_factory.distributions["status"] = WeightedChoice(OrderDataFactory.STATUSES, [2, 3, 4, 1])
+    pooled = order_factory.create_columns(100000, seed=3)
+    print("\n池化订单数据:", pooled[0].to_dict())
+    
+    # 用户名、邮箱、商品名全局不重复，批量生成同样不重复
+    names = product_factory.name_generator.batch(100000)
+    print("\n不重复商品名:", names[:3].tolist(), "重复数:", len(names) - len(np.unique(names)))
+    
+    # 多进程分片生成，结果与进程数无关
+    generator = ParallelDataGenerator(factory_selector, shard_size=50000)
+    shards = list(generator.generate("user", 200000, seed=42))
+    print("\n并行生成用户数据:", sum(len(b) for b in shards), "条，分片数:", len(shards))
+    
+    # 夹具缓存：首次生成并落盘，之后以内存映射方式直接加载
+    cache = FixtureCache(os.path.join(tempfile.gettempdir(), "test_data_fixtures"), max_bytes=512 * 1024 ** 2)
+    cached = cache.get_or_create("product", 100000, seed=42)
+    print("\n缓存商品数据:", len(cached), "条，首条:", cached[0].to_dict())
+    
+    # 声明式实体：实际使用时传入 CaseParser("entities.yaml")
+    SchemaCompiler(factory_selector).register([{
+        "entity": "review",
+        "fields": {
+            "review_id": {"type": "id", "start": 1},
+            "product_id": {"type": "ref", "entity": "product"},
+            "rating": {"type": "choice", "values": [1, 2, 3, 4, 5], "weights": [1, 1, 2, 4, 6]},
+            "code": {"type": "string", "prefix": "RV", "digits": 8, "unique": True},
+            "created_at": {"type": "datetime", "days_back": 30}
+        }
+    }])
+    reviews = factory_selector.get_factory("review").create_columns(100000, seed=5)
+    print("\n声明式实体数据:", reviews[0].to_dict())
+    
+    # 增量数据：基础数据集只生成一次，之后每次只生成新增行与状态变化的行，按主键 upsert 应用
+    manifest = DatasetManifest(os.path.join(tempfile.mkdtemp(), "dataset.json"))
+    delta_generator = DeltaGenerator(manifest)
+    base_rows = sum(len(b) for b in delta_generator.generate_base("order", 200000, seed=9))
+    changes = list(delta_generator.generate_delta("order", append=1000, mutate={"status": 5000}))
+    print("\n增量订单变更:", base_rows, "行基础数据，",
+          [(c.op, len(c)) for c in changes], "版本:", manifest.entities["order"]["version"])
+    
     # 创建带特定参数的测试数据
     specific_user = user_factory.create(
         username="test_user",
@@ -1,7 +1,11 @@
+import ast
+import hashlib
 import importlib
+import importlib.util
+import json
 import os
 import sys
-from typing import List, Type
+from typing import Any, Dict, Iterable, List, Optional, Type
 
 def scan_and_import_modules(directory: str, base_class: type = None) -> List[Type]:
     """
@@ -38,6 +42,160 @@ def scan_and_import_modules(directory: str, base_class: type = None) -> List[Typ
     sys.path.pop(0)
     return classes
 
+def _json_value(value: Any) -> Any:
+    """
+    把字面量转换为可写入 JSON 的值：元组转为列表，集合转为排序后的列表，
+    其余无法用 JSON 表示的值（bytes、复数、非字符串键、inf/nan 等）抛出 TypeError。
+
+    :param value: ast.literal_eval 的结果
+    :return: 可 JSON 序列化的值
+    """
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        if value != value or value in (float("inf"), float("-inf")):
+            raise TypeError("非有限浮点数")
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_json_value(v) for v in value)
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {k: _json_value(v) for k, v in value.items()}
+    raise TypeError(f"无法写入索引的字面量类型: {type(value).__name__}")
+
+class ClassIndex:
+    """
+    不导入模块的类索引。
+    用 AST 解析目录下的 Python 文件，记录每个类的基类名和类级别的字面量属性
+    （转换为 JSON 值：元组、集合存为列表，无法表示的属性忽略），
+    结果按文件的修改时间和大小缓存到 JSON 文件，未变化的文件不再解析；
+    只有调用 load 时才真正导入对应模块。
+    """
+
+    def __init__(self, directory: str, cache_path: Optional[str] = None):
+        """
+        :param directory: 要扫描的目录路径
+        :param cache_path: 索引缓存文件路径，默认为目录下的 .class_index.json
+        """
+        self.directory = os.path.abspath(directory)
+        self.cache_path = cache_path or os.path.join(self.directory, ".class_index.json")
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        重新扫描目录，只解析新增或变化的文件。
+
+        :return: 本次解析的文件数
+        """
+        cached = {}
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, encoding="utf-8") as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = {}
+        files = {}
+        parsed = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.py') or entry.name.startswith('__'):
+                continue
+            stat = entry.stat()
+            previous = cached.get(entry.name)
+            if previous and previous["mtime"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+                files[entry.name] = previous
+                continue
+            files[entry.name] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "classes": self._parse(entry.path)}
+            parsed += 1
+        self.files = files
+        if parsed or files.keys() != cached.keys():
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(files, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        return parsed
+
+    @staticmethod
+    def _parse(path: str) -> List[Dict[str, Any]]:
+        """解析单个文件中的顶层类：类名、基类名、字面量类属性"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError, ValueError) as e:
+            print(f"解析模块 {path} 时出错: {e}")
+            return []
+        classes = []
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            bases = [base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", None) for base in node.bases]
+            attributes = {}
+            for item in node.body:
+                if isinstance(item, ast.Assign) and len(item.targets) == 1 and isinstance(item.targets[0], ast.Name):
+                    target, value = item.targets[0].id, item.value
+                elif isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name) and item.value is not None:
+                    target, value = item.target.id, item.value
+                else:
+                    continue
+                try:
+                    attributes[target] = _json_value(ast.literal_eval(value))
+                except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                    continue
+            classes.append({"name": node.name, "bases": [b for b in bases if b], "attributes": attributes})
+        return classes
+
+    def find(self, base_names: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        查找继承自指定基类（按类名匹配，包括目录内的间接继承）的类。
+
+        :param base_names: 基类名集合
+        :return: 类条目列表，每项包含 module、name、bases、attributes
+        """
+        known = set(base_names)
+        entries = [dict(cls, module=filename[:-3]) for filename, info in sorted(self.files.items()) for cls in info["classes"]]
+        found = []
+        # 逐轮扩展已知基类，直到没有新的子类
+        while True:
+            matched = [e for e in entries if e["name"] not in known and known.intersection(e["bases"])]
+            if not matched:
+                break
+            known.update(e["name"] for e in matched)
+            found.extend(matched)
+        return found
+
+    def load(self, module: str, name: str) -> type:
+        """
+        导入模块并返回其中的类，模块只导入一次，在 sys.modules 中以 module_key 登记。
+
+        :param module: 模块名（文件名去掉 .py）
+        :param name: 类名
+        :return: 类对象
+        """
+        key = self.module_key(module)
+        loaded = sys.modules.get(key)
+        if loaded is None:
+            spec = importlib.util.spec_from_file_location(key, os.path.join(self.directory, f"{module}.py"))
+            loaded = importlib.util.module_from_spec(spec)
+            sys.modules[key] = loaded
+            try:
+                spec.loader.exec_module(loaded)
+            except Exception:
+                del sys.modules[key]
+                raise
+        return getattr(loaded, name)
+
+    def module_key(self, module: str) -> str:
+        """
+        模块在 sys.modules 中的键：带上目录摘要，避免覆盖同名的已安装模块或其他目录中的同名插件。
+
+        :param module: 模块名（文件名去掉 .py）
+        :return: sys.modules 中的键
+        """
+        digest = hashlib.sha1(self.directory.encode("utf-8")).hexdigest()[:12]
+        return f"_class_index_{digest}_{module}"
+
+
 # 示例用法
 if __name__ == "__main__":
     # 假设要扫描当前目录下所有继承自 BaseClass 的类
@@ -46,3 +204,8 @@ if __name__ == "__main__":
 
     found_classes = scan_and_import_modules(os.path.dirname(__file__), BaseClass)
     print("找到的类：", [cls.__name__ for cls in found_classes])
+
+    # 只解析不导入，找到的类在需要时再加载
+    import tempfile
+    index = ClassIndex(os.path.dirname(__file__), cache_path=os.path.join(tempfile.gettempdir(), "class_index.json"))
+    print("索引中的类：", [cls["name"] for info in index.files.values() for cls in info["classes"]])
\ No newline at end of file
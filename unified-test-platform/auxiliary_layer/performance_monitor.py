@@ -1,30 +1,74 @@
 import time
 import psutil
+from typing import List
 
-def monitor_performance(interval: float = 1.0, duration: float = 10.0) -> list:
+def monitor_performance(interval: float = 1.0, duration: float = 10.0, pids: List[int] = None) -> list:
     """
-    监控系统的 CPU 和内存使用率。
+    监控系统的 CPU 和内存使用率，可同时监控指定进程。
 
     :param interval: 采样间隔（秒）
     :param duration: 监控总时长（秒）
-    :return: 性能数据列表，每项为字典，包含时间戳、CPU 和内存使用率
+    :param pids: 需要单独监控的进程 ID 列表，进程句柄在整个监控期间复用
+    :return: 性能数据列表，每项为字典，包含时间戳、CPU 和内存使用率；指定 pids 时另含 "processes"，
+             按 PID 给出 CPU 使用率、RSS、读写字节数、文件描述符数和上下文切换次数，已退出的进程不再出现
     """
+    processes = {}
+    for pid in pids or []:
+        try:
+            processes[pid] = psutil.Process(pid)
+            # 首次调用只建立基准，之后返回两次调用间的 CPU 使用率
+            processes[pid].cpu_percent(None)
+        except psutil.Error as e:
+            print(f"无法监控进程 {pid}: {e}")
     performance_data = []
     start_time = time.time()
     while time.time() - start_time < duration:
         cpu_percent = psutil.cpu_percent(interval=None)
         mem_percent = psutil.virtual_memory().percent
         timestamp = time.time()
-        performance_data.append({
+        entry = {
             "timestamp": timestamp,
             "cpu_percent": cpu_percent,
             "mem_percent": mem_percent
-        })
+        }
+        if pids is not None:
+            entry["processes"] = _sample_processes(processes)
+        performance_data.append(entry)
         time.sleep(interval)
     return performance_data
 
+def _sample_processes(processes: dict) -> dict:
+    """
+    采样各进程一次，已退出的进程从 processes 中移除。
+
+    :param processes: PID 到 psutil.Process 的字典
+    :return: PID 到指标字典的映射
+    """
+    samples = {}
+    for pid, process in list(processes.items()):
+        try:
+            with process.oneshot():
+                try:
+                    io = process.io_counters()
+                    read_bytes, write_bytes = io.read_bytes, io.write_bytes
+                except (psutil.AccessDenied, AttributeError):
+                    read_bytes = write_bytes = 0
+                samples[pid] = {
+                    "cpu_percent": process.cpu_percent(None),
+                    "rss_bytes": process.memory_info().rss,
+                    "read_bytes": read_bytes,
+                    "write_bytes": write_bytes,
+                    "num_fds": process.num_fds() if hasattr(process, "num_fds") else process.num_handles(),
+                    "ctx_switches": sum(process.num_ctx_switches())
+                }
+        except psutil.Error:
+            del processes[pid]
+    return samples
+
 # 示例用法
 if __name__ == "__main__":
-    data = monitor_performance(interval=1.0, duration=5.0)
+    import os
+    data = monitor_performance(interval=1.0, duration=5.0, pids=[os.getpid()])
     for entry in data:
-        print(f"时间戳: {entry['timestamp']:.2f}, CPU: {entry['cpu_percent']}%, 内存: {entry['mem_percent']}%")
+        print(f"时间戳: {entry['timestamp']:.2f}, CPU: {entry['cpu_percent']}%, 内存: {entry['mem_percent']}%, "
+              f"本进程 RSS: {entry['processes'][os.getpid()]['rss_bytes'] / 2 ** 20:.1f} MB")
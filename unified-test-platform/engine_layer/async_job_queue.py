@@ -0,0 +1,200 @@
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from engine_layer.job_queue import JobFuture, PRIORITY_NORMAL, _Lane, as_completed
+
+class AsyncJobQueue:
+    """
+    基于 asyncio 的作业队列，适合 HTTP 调用、Jenkins 轮询等 I/O 密集作业：所有作业在一个事件循环上并发执行，
+    数千个并发作业不需要数千个线程。接口与 JobQueue 一致（add_job、submit_many、wait_all、stop），可在任意线程调用，
+    作业同样返回 JobFuture。
+
+    - 协程函数作业直接在事件循环中执行，同时执行的数量不超过 concurrency；
+    - 普通函数作业（如 http_helper 中的同步请求）交给固定大小的线程池执行，同时执行的数量不超过 executor_workers，
+      排队中的同步作业不占用协程作业的并发名额。
+    作业按优先级排队，事件循环在独立线程中运行。
+    """
+
+    def __init__(self, concurrency: int = 1000, executor_workers: int = 32, priorities: int = 3):
+        """
+        :param concurrency: 同时执行的协程作业数上限
+        :param executor_workers: 执行同步作业的线程数
+        :param priorities: 优先级数量
+        """
+        self.concurrency = concurrency
+        self.executor_workers = executor_workers
+        self.loop = None
+        self.executor = None
+        self._thread = None
+        self._running = False
+        self._unfinished = 0
+        self._lock = threading.Lock()
+        self._all_done = threading.Condition(self._lock)
+        self._dispatch_scheduled = False
+        # 每类作业一个队列及并发上限：async 为协程作业，sync 为交给线程池的同步作业
+        self.lanes = {"async": _Lane(priorities, self._lock), "sync": _Lane(priorities, self._lock)}
+        self._limits = {"async": concurrency, "sync": executor_workers}
+        self._active = {"async": 0, "sync": 0}
+
+    def add_job(self, func: Callable, *args, priority: int = PRIORITY_NORMAL, **kwargs) -> JobFuture:
+        """
+        添加一个作业到队列。
+
+        :param func: 协程函数或普通函数
+        :param args: 函数的位置参数
+        :param priority: 优先级，PRIORITY_HIGH / PRIORITY_NORMAL / PRIORITY_LOW
+        :param kwargs: 函数的关键字参数
+        :return: 作业的 Future
+        :raises ValueError: 优先级无效
+        """
+        lane = self.lanes["async" if inspect.iscoroutinefunction(func) else "sync"]
+        queue = lane.queue(priority)
+        future = JobFuture()
+        with self._lock:
+            queue.append((future, func, args, kwargs, time.monotonic()))
+            lane.pending += 1
+            self._unfinished += 1
+            self._schedule_dispatch()
+        return future
+
+    def submit_many(self, func: Callable, args_list: Iterable, priority: int = PRIORITY_NORMAL) -> List[JobFuture]:
+        """
+        批量添加同一函数的作业，只加一次锁、只唤醒一次事件循环。
+
+        :param func: 协程函数或普通函数
+        :param args_list: 每个作业的参数，元组按位置参数展开，其他值作为单个参数
+        :param priority: 优先级
+        :return: 与参数顺序一致的 Future 列表
+        :raises ValueError: 优先级无效
+        """
+        lane = self.lanes["async" if inspect.iscoroutinefunction(func) else "sync"]
+        queue = lane.queue(priority)
+        now = time.monotonic()
+        jobs = [(JobFuture(), func, args if isinstance(args, tuple) else (args,), {}, now) for args in args_list]
+        with self._lock:
+            queue.extend(jobs)
+            lane.pending += len(jobs)
+            self._unfinished += len(jobs)
+            self._schedule_dispatch()
+        return [job[0] for job in jobs]
+
+    @staticmethod
+    def as_completed(futures: Iterable[JobFuture], timeout: Optional[float] = None) -> Iterator[JobFuture]:
+        """按完成顺序产出 Future，同 JobQueue.as_completed"""
+        return as_completed(futures, timeout)
+
+    def _schedule_dispatch(self):
+        """请求事件循环分发作业，一轮分发之前的多次请求只唤醒一次（调用方持有锁）"""
+        if self.loop is not None and not self._dispatch_scheduled:
+            self._dispatch_scheduled = True
+            self.loop.call_soon_threadsafe(self._dispatch)
+
+    def _dispatch(self):
+        """在事件循环中按并发上限取出作业并创建任务"""
+        started = []
+        with self._lock:
+            self._dispatch_scheduled = False
+            for name, lane in self.lanes.items():
+                count = min(lane.pending, self._limits[name] - self._active[name])
+                if count > 0:
+                    jobs = lane.pop(count)
+                    self._active[name] += len(jobs)
+                    started.extend((name, job) for job in jobs)
+        for name, job in started:
+            self.loop.create_task(self._run(name, *job[:4]))
+
+    async def _run(self, name: str, future: JobFuture, func: Callable, args: tuple, kwargs: dict):
+        # 已取消的作业直接跳过
+        if future.set_running_or_notify_cancel():
+            try:
+                if name == "async":
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await self.loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+                    # 普通函数返回协程（如 lambda 包装）时在事件循环中继续等待
+                    if inspect.isawaitable(result):
+                        result = await result
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+        with self._lock:
+            self._active[name] -= 1
+            self._unfinished -= 1
+            if not self._unfinished:
+                self._all_done.notify_all()
+            if self.lanes[name].pending:
+                self._schedule_dispatch()
+
+    def start(self):
+        """
+        启动事件循环线程和同步作业线程池，开始处理作业队列。
+        """
+        if not self._running:
+            self._running = True
+            self.executor = ThreadPoolExecutor(self.executor_workers, thread_name_prefix="async-job-queue")
+            self.loop = asyncio.new_event_loop()
+            self.loop.set_default_executor(self.executor)
+            self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self._thread.start()
+            with self._lock:
+                self._schedule_dispatch()
+            print(f"异步作业队列已启动，协程并发上限: {self.concurrency}，同步作业线程数: {self.executor_workers}")
+
+    def stop(self, cancel_pending: bool = False):
+        """
+        停止队列：等待已入队的作业执行完后关闭事件循环和线程池。
+
+        :param cancel_pending: 为 True 时取消尚未开始的作业，只等待正在执行的作业
+        """
+        if not self._running:
+            return
+        cancelled = []
+        with self._lock:
+            self._running = False
+            if cancel_pending:
+                for lane in self.lanes.values():
+                    cancelled.extend(lane.pop(lane.pending))
+                self._unfinished -= len(cancelled)
+        for job in cancelled:
+            job[0].cancel()
+        self.wait_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.executor.shutdown()
+        self.loop = None
+        self.executor = None
+        self._thread = None
+        print("异步作业队列已停止")
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        """
+        阻塞直到所有作业处理完成。
+
+        :param timeout: 超时时间（秒），默认一直等待
+        :return: 是否全部完成
+        """
+        with self._lock:
+            return self._all_done.wait_for(lambda: not self._unfinished, timeout)
+
+# 示例用法（在项目根目录执行：python -m engine_layer.async_job_queue）
+if __name__ == "__main__":
+    async def poll_build(build_id):
+        # 模拟一次 Jenkins 构建轮询
+        await asyncio.sleep(1)
+        return build_id
+
+    ajq = AsyncJobQueue(concurrency=5000, executor_workers=16)
+    ajq.start()
+    start = time.time()
+    polls = ajq.submit_many(poll_build, range(5000))
+    blocking = ajq.submit_many(time.sleep, [0.1] * 32)
+    ajq.wait_all()
+    print(f"5000 个协程作业和 32 个同步作业完成，耗时 {time.time() - start:.2f} 秒，"
+          f"结果之和: {sum(f.result() for f in polls)}")
+    ajq.stop()
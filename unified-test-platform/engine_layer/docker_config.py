@@ -17,7 +17,8 @@ def create_container(
     ports: dict = None,
     volumes: dict = None,
     environment: dict = None,
-    detach: bool = True
+    detach: bool = True,
+    perf_agent=None
 ):
     """
     创建并启动一个 Docker 容器。
@@ -30,6 +31,7 @@ def create_container(
     :param volumes: 卷映射，如 {"/host/path": {"bind": "/container/path", "mode": "rw"}}
     :param environment: 环境变量字典
     :param detach: 是否以分离模式启动
+    :param perf_agent: PerfAgent 实例，给出时将容器加入按进程采样（采样对象名为 "container-<容器名>"）
     :return: 容器对象
     """
     container = client.containers.run(
@@ -41,16 +43,21 @@ def create_container(
         environment=environment,
         detach=detach
     )
+    if perf_agent is not None and detach:
+        perf_agent.watch_container(container)
     return container
 
-def remove_container(client: docker.DockerClient, container_name: str, force: bool = True):
+def remove_container(client: docker.DockerClient, container_name: str, force: bool = True, perf_agent=None):
     """
     停止并删除指定名称的容器。
 
     :param client: DockerClient 实例
     :param container_name: 容器名称
     :param force: 是否强制删除
+    :param perf_agent: 创建容器时传入的 PerfAgent 实例，给出时同时停止对该容器的采样
     """
+    if perf_agent is not None:
+        perf_agent.unwatch(f"container-{container_name}")
     try:
         container = client.containers.get(container_name)
         container.remove(force=force)
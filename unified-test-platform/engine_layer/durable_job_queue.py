@@ -0,0 +1,341 @@
+import os
+import pickle
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from framework_layer.core.db_helper import DBHelper
+from engine_layer.job_queue import JobFuture, JobQueue, PRIORITY_NORMAL
+
+# 作业状态
+STATE_QUEUED = 0
+STATE_LEASED = 1
+STATE_DONE = 2
+STATE_FAILED = 3
+
+def _invoke(func: Callable, args: tuple, kwargs: dict) -> Any:
+    """执行反序列化后的作业（模块级函数，进程池后端可直接 pickle）"""
+    return func(*args, **kwargs)
+
+class SqliteJobStore:
+    """
+    基于 SQLite（WAL 模式）的持久化作业存储。
+    作业以 pickle 字节保存；出队即租约：租出的作业在 visibility_timeout 内对其他消费者不可见，
+    到期未确认则重新投递（至少一次），投递次数达到 max_attempts 后标记为失败。
+    入队、出队、确认都按批在单个事务中完成。
+    """
+
+    def __init__(self, db_path: str, visibility_timeout: float = 60.0, max_attempts: int = 3):
+        """
+        :param db_path: 数据库文件路径
+        :param visibility_timeout: 租约时长（秒）
+        :param max_attempts: 最大投递次数
+        """
+        self.db = DBHelper(db_path, check_same_thread=False)
+        self.db.set_pragmas(journal_mode="WAL", synchronous="NORMAL", busy_timeout=5000)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                priority INTEGER NOT NULL,
+                state INTEGER NOT NULL,
+                visible_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                payload BLOB NOT NULL,
+                result BLOB,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, priority, id)")
+
+    def _transaction(self, work: Callable[[Any], Any]) -> Any:
+        """在 BEGIN IMMEDIATE 事务中执行，多个进程共用数据库时出队不会重复"""
+        with self._lock:
+            conn = self.db.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+                conn.commit()
+                return result
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def enqueue(self, jobs: Iterable[Tuple[bytes, int]]) -> List[int]:
+        """
+        批量入队。
+
+        :param jobs: (作业字节, 优先级) 序列
+        :return: 作业 ID 列表
+        """
+        now = time.time()
+        rows = [(priority, STATE_QUEUED, now, payload, now, now) for payload, priority in jobs]
+
+        def insert(conn):
+            # 事务内连续插入，ID 从当前自增序列之后依次分配
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'jobs'").fetchone()
+            first = (row[0] if row else 0) + 1
+            conn.executemany("INSERT INTO jobs (priority, state, visible_at, payload, created_at, updated_at) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            return list(range(first, first + len(rows)))
+
+        return self._transaction(insert) if rows else []
+
+    def lease(self, count: int) -> List[Tuple[int, int, bytes]]:
+        """
+        租出至多 count 个作业：先是排队中的，再是租约已过期的；同时把超过最大投递次数的过期作业标记为失败。
+
+        :return: (作业 ID, 优先级, 作业字节) 列表
+        """
+        def take(conn):
+            now = time.time()
+            conn.execute("UPDATE jobs SET state = ?, error = ?, updated_at = ? "
+                         "WHERE state = ? AND visible_at <= ? AND attempts >= ?",
+                         (STATE_FAILED, f"超过最大投递次数: {self.max_attempts}", now, STATE_LEASED, now, self.max_attempts))
+            rows = conn.execute("SELECT id, priority, payload FROM jobs WHERE state = ? ORDER BY priority, id LIMIT ?",
+                                (STATE_QUEUED, count)).fetchall()
+            if len(rows) < count:
+                rows += conn.execute("SELECT id, priority, payload FROM jobs WHERE state = ? AND visible_at <= ? "
+                                     "ORDER BY priority, id LIMIT ?", (STATE_LEASED, now, count - len(rows))).fetchall()
+            conn.executemany("UPDATE jobs SET state = ?, visible_at = ?, attempts = attempts + 1, owner = ?, "
+                             "updated_at = ? WHERE id = ?",
+                             [(STATE_LEASED, now + self.visibility_timeout, self.owner, now, row[0]) for row in rows])
+            return [(row[0], row[1], row[2]) for row in rows]
+
+        return self._transaction(take)
+
+    def extend(self, job_ids: Iterable[int]):
+        """延长本消费者持有的租约（长作业执行期间定期调用）"""
+        until = time.time() + self.visibility_timeout
+        with self._lock:
+            self.db.executemany("UPDATE jobs SET visible_at = ? WHERE id = ? AND state = ? AND owner = ?",
+                                [(until, job_id, STATE_LEASED, self.owner) for job_id in job_ids])
+
+    def ack(self, outcomes: Iterable[Tuple[int, bool, Any]]):
+        """
+        批量确认作业结果。只确认仍由本消费者持有的租约，已被重新投递的作业以新的执行结果为准。
+
+        :param outcomes: (作业 ID, 是否成功, 结果字节或错误信息) 序列
+        """
+        now = time.time()
+        rows = [(STATE_DONE if ok else STATE_FAILED, value if ok else None, None if ok else value, now,
+                 job_id, STATE_LEASED, self.owner) for job_id, ok, value in outcomes]
+        with self._lock:
+            self.db.executemany("UPDATE jobs SET state = ?, result = ?, error = ?, updated_at = ? "
+                                "WHERE id = ? AND state = ? AND owner = ?", rows)
+
+    def requeue_leased(self, owner: Optional[str] = None) -> int:
+        """
+        立即重投已租出的作业（确认其消费者已不存在时使用，不必等待租约过期）。
+
+        :param owner: 只重投该消费者的租约，默认全部
+        :return: 重投的作业数
+        """
+        sql = "UPDATE jobs SET state = ?, visible_at = ? WHERE state = ?"
+        params = (STATE_QUEUED, time.time(), STATE_LEASED)
+        if owner is not None:
+            sql += " AND owner = ?"
+            params += (owner,)
+        return self._transaction(lambda conn: conn.execute(sql, params).rowcount)
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的作业数"""
+        names = {STATE_QUEUED: "queued", STATE_LEASED: "leased", STATE_DONE: "done", STATE_FAILED: "failed"}
+        with self._lock:
+            rows = self.db.query("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")
+        result = {name: 0 for name in names.values()}
+        result.update({names[row["state"]]: row["n"] for row in rows})
+        return result
+
+    def outstanding(self) -> int:
+        """排队中和已租出的作业数"""
+        with self._lock:
+            return self.db.query_one("SELECT COUNT(*) AS n FROM jobs WHERE state IN (?, ?)",
+                                     (STATE_QUEUED, STATE_LEASED))["n"]
+
+    def result(self, job_id: int) -> Tuple[str, Any]:
+        """
+        查询作业结果。
+
+        :return: (状态名, 结果或错误信息)；未完成时结果为 None
+        """
+        with self._lock:
+            row = self.db.query_one("SELECT state, result, error FROM jobs WHERE id = ?", (job_id,))
+        if row is None:
+            raise KeyError(f"作业不存在: {job_id}")
+        if row["state"] == STATE_DONE:
+            return "done", pickle.loads(row["result"]) if row["result"] is not None else None
+        if row["state"] == STATE_FAILED:
+            return "failed", row["error"]
+        return ("queued" if row["state"] == STATE_QUEUED else "leased"), None
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+class DurableJobQueue:
+    """
+    持久化作业队列：作业先写入 SQLite 再执行，进程崩溃后重启即可继续，未确认的作业在租约过期后重新投递。
+    执行仍由 JobQueue 完成（可选线程、进程池或混合后端），接口与 JobQueue 一致，add_job 返回持久化的作业 ID。
+    作业函数及参数需可 pickle（模块级函数）。
+    """
+
+    def __init__(self, db_path: str, worker_num: int = 4, batch_size: int = 100,
+                 visibility_timeout: float = 60.0, max_attempts: int = 3, **job_queue_kwargs):
+        """
+        :param db_path: 数据库文件路径
+        :param worker_num: 工作线程数量
+        :param batch_size: 每次出队、确认的最大作业数
+        :param visibility_timeout: 租约时长（秒），执行中的作业每隔三分之一租约自动续期
+        :param max_attempts: 最大投递次数
+        :param job_queue_kwargs: 传给 JobQueue 的其他参数（如 backend、process_num）
+        """
+        self.store = SqliteJobStore(db_path, visibility_timeout, max_attempts)
+        self.batch_size = batch_size
+        self.queue = JobQueue(worker_num=worker_num, **job_queue_kwargs)
+        # 在途作业上限为两批，一批执行时下一批已经取出，工作线程不必等待出队
+        self._capacity = 2 * max(batch_size, worker_num)
+        self._in_flight = set()
+        self._acks = []
+        self._running = False
+        self._pump_thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._drained = False
+
+    def add_job(self, func: Callable, *args, priority: int = PRIORITY_NORMAL, **kwargs) -> int:
+        """
+        添加一个作业（写入数据库后返回）。
+
+        :return: 作业 ID
+        """
+        return self.submit_many(_invoke, [(func, args, kwargs)], priority)[0]
+
+    def submit_many(self, func: Callable, args_list: Iterable, priority: int = PRIORITY_NORMAL) -> List[int]:
+        """
+        批量添加同一函数的作业，在一个事务中写入。
+
+        :param args_list: 每个作业的参数，元组按位置参数展开，其他值作为单个参数
+        :return: 作业 ID 列表
+        """
+        if func is not _invoke:
+            args_list = [(func, args if isinstance(args, tuple) else (args,), {}) for args in args_list]
+        ids = self.store.enqueue((pickle.dumps(job), priority) for job in args_list)
+        with self._lock:
+            self._drained = False
+            self._wakeup.notify()
+        return ids
+
+    def result(self, job_id: int) -> Tuple[str, Any]:
+        """查询作业结果，同 SqliteJobStore.result"""
+        return self.store.result(job_id)
+
+    def _on_done(self, job_id: int, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            try:
+                outcome = (job_id, True, pickle.dumps(future.result()))
+            except Exception as e:
+                outcome = (job_id, False, f"作业结果无法序列化: {e}")
+        else:
+            outcome = (job_id, False, f"{type(error).__name__}: {error}")
+        with self._lock:
+            self._acks.append(outcome)
+            self._in_flight.discard(job_id)
+            if len(self._acks) >= self.batch_size // 2 or not self._in_flight:
+                self._wakeup.notify()
+
+    def _pump(self):
+        """出队、分发、批量确认与续租：只有这个线程从数据库取作业"""
+        renew_interval = self.store.visibility_timeout / 3
+        last_renew = time.monotonic()
+        while True:
+            with self._lock:
+                acks, self._acks = self._acks, []
+                in_flight = list(self._in_flight)
+                room = self._capacity - len(in_flight)
+                running = self._running
+            if acks:
+                self.store.ack(acks)
+            if time.monotonic() - last_renew >= renew_interval and in_flight:
+                self.store.extend(in_flight)
+                last_renew = time.monotonic()
+            leased = self.store.lease(min(room, self.batch_size)) if running and room > 0 else []
+            for job_id, priority, payload in leased:
+                with self._lock:
+                    self._in_flight.add(job_id)
+                try:
+                    func, args, kwargs = pickle.loads(payload)
+                except Exception as e:
+                    failed = JobFuture()
+                    failed.set_exception(e)
+                    self._on_done(job_id, failed)
+                    continue
+                future = self.queue.add_job(_invoke, func, args, kwargs, priority=priority)
+                future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+            with self._lock:
+                if not running and not self._in_flight and not self._acks:
+                    return
+                if leased or self._acks:
+                    continue
+                if not self._in_flight and self.store.outstanding() == 0:
+                    self._drained = True
+                    self._idle.notify_all()
+                # 没有可取的作业时等待新作业、作业完成或续租时刻；其他进程写入的作业在续租周期内被发现
+                self._wakeup.wait(renew_interval)
+
+    def start(self):
+        """启动执行队列和分发线程"""
+        if not self._running:
+            self._running = True
+            self.queue.start()
+            self._pump_thread = threading.Thread(target=self._pump, daemon=True)
+            self._pump_thread.start()
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        """
+        阻塞直到数据库中没有排队或执行中的作业。
+
+        :param timeout: 超时时间（秒），默认一直等待
+        :return: 是否全部完成
+        """
+        with self._lock:
+            self._drained = False
+            self._wakeup.notify()
+            return self._idle.wait_for(lambda: self._drained, timeout)
+
+    def stop(self):
+        """停止取新作业，等待执行中的作业完成并确认后关闭；未执行的作业留在数据库中，下次启动继续"""
+        with self._lock:
+            self._running = False
+            self._wakeup.notify()
+        if self._pump_thread is not None:
+            self._pump_thread.join()
+            self._pump_thread = None
+        self.queue.stop()
+        self.store.close()
+
+# 示例用法（在项目根目录执行：python -m engine_layer.durable_job_queue）
+if __name__ == "__main__":
+    import tempfile
+
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    djq = DurableJobQueue(db_path, worker_num=4, batch_size=200)
+    start = time.time()
+    ids = djq.submit_many(pow, [(i, 2) for i in range(20000)])
+    print(f"入队 {len(ids)} 个作业，耗时 {time.time() - start:.2f} 秒")
+    djq.start()
+    djq.wait_all()
+    print(f"全部完成，总耗时 {time.time() - start:.2f} 秒，作业状态: {djq.store.counts()}")
+    print("作业结果:", djq.result(ids[3]))
+    djq.stop()
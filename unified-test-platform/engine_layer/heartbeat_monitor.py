@@ -1,5 +1,16 @@
+import heapq
+import itertools
+import random
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional
+
+# 目标状态
+STATE_UNKNOWN = "unknown"
+STATE_UP = "up"
+STATE_DEGRADED = "degraded"
+STATE_DOWN = "down"
 
 class HeartbeatMonitor:
     """
@@ -50,6 +61,246 @@ class HeartbeatMonitor:
             self._thread.join()
             print("心跳监控已停止")
 
+class HeartbeatEvent(NamedTuple):
+    """目标状态变化事件"""
+    target: Hashable
+    old_state: str
+    new_state: str
+    timestamp: float
+    latency: Optional[float]
+    error: Optional[BaseException]
+
+class _Target:
+    """一个被监控的目标"""
+    __slots__ = ("name", "check_func", "interval", "state", "failures", "running", "due", "latency")
+
+    def __init__(self, name: Hashable, check_func: Callable[[], bool], interval: float):
+        self.name = name
+        self.check_func = check_func
+        self.interval = interval
+        self.state = STATE_UNKNOWN
+        self.failures = 0
+        self.running = 0      # 执行中的检查编号，0 表示空闲，负数表示已按超时处理但仍未返回
+        self.due = 0.0        # 下一次检查时间
+        self.latency = None   # 最近一次成功检查的耗时
+
+class HeartbeatScheduler:
+    """
+    多目标心跳调度器：一个调度线程用定时器堆管理所有目标的下次检查时间，检查在固定大小的线程池中并发执行，
+    监控数千个目标也只需要 max_workers 个线程。
+
+    - 每个目标有自己的检查间隔，按计划时间而非检查结束时间排期，并加入随机抖动，避免所有目标同时检查；
+    - 检查超过 check_timeout 未返回视为失败，慢检查不影响其他目标；线程无法被强制中止，挂起的检查会一直占用一个检查线程，
+      但同一目标在上一次检查返回前不会再次提交，每个挂起的目标至多占用一个线程，之后的检查直接计为失败；
+    - 连续失败 failure_threshold 次判定为 down，之前为 degraded，检查耗时超过 slow_threshold 也为 degraded；
+    - down 的目标检查间隔按 backoff_factor 指数退避，最长 max_backoff 秒，恢复后立即回到正常间隔；
+    - 只在状态变化时通知监听器（HeartbeatEvent），不在每次心跳时输出。
+    """
+
+    def __init__(self, max_workers: int = 32, default_interval: float = 5.0, jitter: float = 0.1,
+                 check_timeout: Optional[float] = None, failure_threshold: int = 3,
+                 slow_threshold: Optional[float] = None, backoff_factor: float = 2.0, max_backoff: float = 60.0):
+        """
+        :param max_workers: 执行检查的线程数
+        :param default_interval: 默认检查间隔（秒）
+        :param jitter: 间隔的随机抖动比例，如 0.1 表示 ±10%
+        :param check_timeout: 单次检查超时（秒），默认等于检查间隔
+        :param failure_threshold: 判定为 down 的连续失败次数
+        :param slow_threshold: 检查耗时超过该值（秒）判定为 degraded，默认不判定
+        :param backoff_factor: down 状态下检查间隔的退避倍数
+        :param max_backoff: 退避后的最长检查间隔（秒）
+        """
+        self.max_workers = max_workers
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.check_timeout = check_timeout
+        self.failure_threshold = failure_threshold
+        self.slow_threshold = slow_threshold
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.targets: Dict[Hashable, _Target] = {}
+        self._listeners: List[Callable[[HeartbeatEvent], None]] = []
+        self._heap = []    # (时间, 序号, 是否为超时检查, 目标, 检查编号)，懒删除
+        self._seq = itertools.count(1)
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._running = False
+        self._thread = None
+        self._executor = None
+
+    def add_target(self, name: Hashable, check_func: Callable[[], bool], interval: Optional[float] = None):
+        """
+        添加监控目标，首次检查时间在一个间隔内随机分布。
+
+        :param name: 目标标识
+        :param check_func: 检查函数，返回 True（存活）或 False（异常），抛出异常也视为异常
+        :param interval: 检查间隔（秒），默认 default_interval
+        """
+        target = _Target(name, check_func, interval or self.default_interval)
+        with self._lock:
+            if name in self.targets:
+                raise ValueError(f"监控目标已存在: {name}")
+            self.targets[name] = target
+            self._schedule(target, time.monotonic() + self._random.uniform(0, target.interval))
+
+    def remove_target(self, name: Hashable):
+        """移除监控目标，堆中剩余的条目在到期时丢弃"""
+        with self._lock:
+            self.targets.pop(name, None)
+
+    def add_listener(self, listener: Callable[[HeartbeatEvent], None]):
+        """
+        注册状态变化监听器，在检查线程或调度线程中调用，应尽快返回。
+
+        :param listener: 接收 HeartbeatEvent 的函数
+        """
+        self._listeners.append(listener)
+
+    def state(self, name: Hashable) -> str:
+        """目标当前状态"""
+        return self.targets[name].state
+
+    def summary(self) -> Dict[str, int]:
+        """各状态的目标数"""
+        counts = {STATE_UNKNOWN: 0, STATE_UP: 0, STATE_DEGRADED: 0, STATE_DOWN: 0}
+        with self._lock:
+            for target in self.targets.values():
+                counts[target.state] += 1
+        return counts
+
+    def _schedule(self, target: _Target, when: float):
+        """安排下一次检查；成为最早的条目时唤醒调度线程（调用方持有锁）"""
+        target.due = when
+        heapq.heappush(self._heap, (when, next(self._seq), False, target.name, 0))
+        if self._heap[0][0] == when:
+            self._wakeup.notify()
+
+    def _next_interval(self, target: _Target) -> float:
+        """带抖动的下次检查间隔，down 状态按连续失败次数退避"""
+        interval = target.interval
+        if target.state == STATE_DOWN:
+            exponent = target.failures - self.failure_threshold + 1
+            interval = max(interval, min(interval * self.backoff_factor ** exponent, self.max_backoff))
+        return interval * (1 + self._random.uniform(-self.jitter, self.jitter))
+
+    def _run(self):
+        """调度线程：取出到期的条目，提交检查或处理超时"""
+        while True:
+            due = []
+            with self._lock:
+                while self._running and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._wakeup.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                if not self._running:
+                    return
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    when, _, is_timeout, name, token = heapq.heappop(self._heap)
+                    target = self.targets.get(name)
+                    if target is None:
+                        continue
+                    if is_timeout:
+                        if target.running == token:
+                            target.running = -token
+                            due.append((target, None, TimeoutError(f"心跳检查超时: {name}")))
+                    elif target.due == when:
+                        if target.running > 0:
+                            # 上一次检查尚未超时，顺延一个间隔
+                            self._schedule(target, when + self._next_interval(target))
+                        elif target.running < 0:
+                            # 上一次检查超时后仍未返回，不再重复提交，继续计为失败
+                            due.append((target, None, TimeoutError(f"心跳检查仍未返回: {name}")))
+                        else:
+                            token = next(self._seq)
+                            target.running = token
+                            timeout = self.check_timeout or target.interval
+                            heapq.heappush(self._heap, (now + timeout, next(self._seq), True, name, token))
+                            self._executor.submit(self._check, target, token, when)
+            for target, latency, error in due:
+                self._record(target, None, False, latency, error)
+
+    def _check(self, target: _Target, token: int, planned: float):
+        """在线程池中执行一次检查"""
+        start = time.monotonic()
+        error = None
+        try:
+            alive = bool(target.check_func())
+        except Exception as e:
+            alive, error = False, e
+        self._record(target, token, alive, time.monotonic() - start, error, planned)
+
+    def _record(self, target: _Target, token: Optional[int], alive: bool, latency: Optional[float],
+                error: Optional[BaseException], planned: Optional[float] = None):
+        """
+        记录检查结果，更新状态并安排下一次检查，状态变化时通知监听器。
+
+        :param token: 检查编号，超时判定时为 None
+        :param planned: 本次检查的计划时间，用于按固定节奏排期
+        """
+        with self._lock:
+            reschedule = True
+            if token is not None:
+                if target.running == -token:
+                    # 超时后才返回的结果：超时时已排好下一次检查，这里只更新状态
+                    reschedule = False
+                elif target.running != token:
+                    return
+                target.running = 0
+            old_state = target.state
+            if alive:
+                target.failures = 0
+                target.latency = latency
+                slow = self.slow_threshold is not None and latency > self.slow_threshold
+                target.state = STATE_DEGRADED if slow else STATE_UP
+            else:
+                target.failures += 1
+                target.state = STATE_DOWN if target.failures >= self.failure_threshold else STATE_DEGRADED
+            if reschedule and self.targets.get(target.name) is target:
+                now = time.monotonic()
+                # 按计划时间排期，检查耗时不累积到间隔中；落后时从当前时间重新开始
+                base = planned if planned is not None and target.state != STATE_DOWN else now
+                self._schedule(target, max(base + self._next_interval(target), now))
+            new_state = target.state
+        if new_state != old_state:
+            event = HeartbeatEvent(target.name, old_state, new_state, time.time(), latency, error)
+            for listener in self._listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"心跳监听器异常: {e}")
+
+    def start(self):
+        """
+        启动调度线程和检查线程池。
+        """
+        if not self._running:
+            with self._lock:
+                # 上次停止时被取消或仍未返回的检查不再等待（结果按编号丢弃），这些目标立即重新检查
+                now = time.monotonic()
+                for target in self.targets.values():
+                    if target.running:
+                        target.running = 0
+                        self._schedule(target, now)
+            self._running = True
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="heartbeat")
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print(f"心跳调度已启动，监控目标数: {len(self.targets)}，检查线程数: {self.max_workers}")
+
+    def stop(self):
+        """
+        停止调度，取消尚未开始的检查，不等待执行中（可能已挂起）的检查返回。
+        """
+        with self._lock:
+            self._running = False
+            self._wakeup.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            print("心跳调度已停止")
+
 # 示例用法
 if __name__ == "__main__":
     # 示例检查函数：模拟目标每次都存活
@@ -62,3 +313,23 @@ if __name__ == "__main__":
         time.sleep(10)  # 运行 10 秒
     finally:
         monitor.stop()
+
+    # 3000 个代理共用一个调度线程和 32 个检查线程；编号为 7 的倍数的代理不可达，0 号代理检查很慢
+    def make_check(agent_id):
+        def check():
+            if agent_id == 0:
+                time.sleep(3)
+            return agent_id % 7 != 0
+        return check
+
+    scheduler = HeartbeatScheduler(max_workers=32, default_interval=1.0, check_timeout=0.5, failure_threshold=2)
+    scheduler.add_listener(lambda e: e.new_state == STATE_DOWN and e.target % 500 == 0 and
+                           print(f"[{time.strftime('%H:%M:%S')}] 代理 {e.target}: {e.old_state} -> {e.new_state}"))
+    for agent_id in range(3000):
+        scheduler.add_target(agent_id, make_check(agent_id))
+    scheduler.start()
+    try:
+        time.sleep(5)
+        print("目标状态统计:", scheduler.summary())
+    finally:
+        scheduler.stop()
@@ -1,86 +1,660 @@
+import multiprocessing
+import os
+import pickle
 import threading
-import queue
-from typing import Callable, Any
+import time
+from collections import deque
+from concurrent.futures import CancelledError
+from queue import Empty, Full, SimpleQueue
+from typing import Callable, Any, Iterable, Iterator, List, Optional
+
+# 优先级：数值越小越先执行，同一优先级内先进先出
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+class JobFuture:
+    """
+    作业的结果句柄，接口与 concurrent.futures.Future 一致（result、exception、done、cancel、add_done_callback）。
+    不为每个作业创建条件变量，只在有线程等待时才创建事件，入队和完成的开销都很小。
+    """
+    __slots__ = ("_state", "_result", "_exception", "_callbacks", "_event")
+    _lock = threading.Lock()
+    PENDING, RUNNING, CANCELLED, FINISHED = range(4)
+
+    def __init__(self):
+        self._state = JobFuture.PENDING
+        self._result = None
+        self._exception = None
+        self._callbacks = None
+        self._event = None
+
+    def cancel(self) -> bool:
+        """取消尚未开始执行的作业"""
+        with JobFuture._lock:
+            if self._state == JobFuture.RUNNING or self._state == JobFuture.FINISHED:
+                return False
+            if self._state == JobFuture.CANCELLED:
+                return True
+            self._state = JobFuture.CANCELLED
+            event, callbacks = self._event, self._callbacks
+        self._notify(event, callbacks)
+        return True
+
+    def cancelled(self) -> bool:
+        return self._state == JobFuture.CANCELLED
+
+    def running(self) -> bool:
+        return self._state == JobFuture.RUNNING
+
+    def done(self) -> bool:
+        return self._state >= JobFuture.CANCELLED
+
+    def _wait(self, timeout: Optional[float]):
+        if self._state < JobFuture.CANCELLED:
+            with JobFuture._lock:
+                if self._state < JobFuture.CANCELLED and self._event is None:
+                    self._event = threading.Event()
+                event = self._event
+            if event is not None and not event.wait(timeout):
+                raise TimeoutError("等待作业结果超时")
+        if self._state == JobFuture.CANCELLED:
+            raise CancelledError("作业已取消")
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """等待并返回作业结果，作业抛出的异常在此重新抛出"""
+        self._wait(timeout)
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout: Optional[float] = None) -> Optional[BaseException]:
+        """等待并返回作业抛出的异常，正常完成时返回 None"""
+        self._wait(timeout)
+        return self._exception
+
+    def add_done_callback(self, fn: Callable[["JobFuture"], Any]):
+        """作业完成（或取消）后调用 fn(future)，已完成时立即调用"""
+        with JobFuture._lock:
+            if self._state < JobFuture.CANCELLED:
+                if self._callbacks is None:
+                    self._callbacks = []
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def set_running_or_notify_cancel(self) -> bool:
+        """开始执行前调用，已取消时返回 False"""
+        with JobFuture._lock:
+            if self._state == JobFuture.CANCELLED:
+                return False
+            self._state = JobFuture.RUNNING
+            return True
+
+    def set_result(self, result: Any):
+        with JobFuture._lock:
+            self._result = result
+            self._state = JobFuture.FINISHED
+            event, callbacks = self._event, self._callbacks
+        if event is not None or callbacks is not None:
+            self._notify(event, callbacks)
+
+    def set_exception(self, exception: BaseException):
+        with JobFuture._lock:
+            self._exception = exception
+            self._state = JobFuture.FINISHED
+            event, callbacks = self._event, self._callbacks
+        self._notify(event, callbacks)
+
+    def _notify(self, event: Optional[threading.Event], callbacks: Optional[List[Callable]]):
+        """唤醒等待者并执行回调（不持有锁）"""
+        if event is not None:
+            event.set()
+        for fn in callbacks or ():
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"作业回调异常: {e}")
+
+class PartialSubmitError(Full):
+    """
+    超过队列上限的批量作业分段入队时，等待队列空间超时。
+    已入队的作业照常执行，futures 为它们的 Future（参数列表的前 len(futures) 个）。
+    """
+
+    def __init__(self, message: str, futures: List[JobFuture]):
+        super().__init__(message)
+        self.futures = futures
+
+def as_completed(futures: Iterable[JobFuture], timeout: Optional[float] = None) -> Iterator[JobFuture]:
+    """
+    按完成顺序产出 Future。
+
+    :param futures: Future 集合
+    :param timeout: 总超时时间（秒），超时抛出 TimeoutError
+    :return: Future 迭代器
+    """
+    futures = list(futures)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    finished = SimpleQueue()
+    for future in futures:
+        future.add_done_callback(finished.put)
+    for _ in range(len(futures)):
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            yield finished.get(timeout=remaining)
+        except Empty:
+            raise TimeoutError("等待作业完成超时")
+
+def _run_chunk(payloads: List[bytes]) -> List[bytes]:
+    """
+    在工作进程中执行一批作业。作业与结果都以 pickle 字节传递，
+    单个作业的异常或结果无法序列化只影响该作业本身。
+    """
+    results = []
+    for payload in payloads:
+        try:
+            func, args, kwargs = pickle.loads(payload)
+            outcome = (True, func(*args, **kwargs))
+        except BaseException as e:
+            outcome = (False, e)
+        try:
+            results.append(pickle.dumps(outcome))
+        except Exception as e:
+            results.append(pickle.dumps((False, pickle.PicklingError(f"作业结果无法序列化: {e}"))))
+    return results
+
+def _process_main(conn):
+    """工作进程主循环：接收一批作业字节，执行后回传结果，收到 None 或连接断开时退出"""
+    while True:
+        try:
+            payloads = conn.recv()
+        except (EOFError, OSError):
+            return
+        if payloads is None:
+            return
+        conn.send(_run_chunk(payloads))
+
+class _WorkerProcess:
+    """
+    分发线程独占的工作进程，经管道收发作业。
+    按实际执行的作业数（而不是分发次数）计数，达到 max_jobs 后在下一批之前替换进程。
+    """
+
+    def __init__(self, context, max_jobs: Optional[int]):
+        self.context = context
+        self.max_jobs = max_jobs
+        self.process = None
+        self.conn = None
+        self.jobs = 0
+
+    def remaining(self, count: int) -> int:
+        """下一批最多可发送的作业数：不超过当前进程剩余的配额（进程将被替换时为完整配额）"""
+        if self.max_jobs is None:
+            return count
+        left = self.max_jobs - self.jobs if self.process is not None and self.jobs < self.max_jobs else self.max_jobs
+        return max(1, min(count, left))
+
+    def _start(self):
+        parent, child = self.context.Pipe()
+        self.process = self.context.Process(target=_process_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.conn = parent
+        self.jobs = 0
+
+    def run(self, payloads: List[bytes]) -> List[bytes]:
+        """
+        在工作进程中执行一批作业。
+
+        :raises RuntimeError: 工作进程意外退出（该批作业的结果丢失，下一批使用新进程）
+        """
+        if self.process is None or (self.max_jobs is not None and self.jobs >= self.max_jobs):
+            self.close()
+            self._start()
+        try:
+            self.conn.send(payloads)
+            results = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.close()
+            raise RuntimeError(f"工作进程意外退出: {e!r}")
+        self.jobs += len(payloads)
+        return results
+
+    def close(self):
+        """通知工作进程退出并回收"""
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.process = self.conn = None
+
+class _Lane:
+    """一类执行器（线程或进程）的待执行作业：每个优先级一个双端队列，与 JobQueue 共用一把锁"""
+
+    def __init__(self, priorities: int, lock: threading.Lock):
+        self.queues = [deque() for _ in range(priorities)]
+        self.pending = 0
+        self.not_empty = threading.Condition(lock)
+
+    def queue(self, priority: int) -> deque:
+        """取优先级对应的队列，优先级不在 [0, priorities) 内时报错"""
+        if not isinstance(priority, int) or not 0 <= priority < len(self.queues):
+            raise ValueError(f"优先级应为 0 到 {len(self.queues) - 1} 的整数: {priority!r}")
+        return self.queues[priority]
+
+    def pop(self, count: int) -> list:
+        """按优先级取出至多 count 个作业（调用方持有锁）"""
+        jobs = []
+        for queue in self.queues:
+            while queue and len(jobs) < count:
+                jobs.append(queue.popleft())
+            if len(jobs) == count:
+                break
+        self.pending -= len(jobs)
+        return jobs
 
 class JobQueue:
     """
-    简单的作业队列，支持多线程安全的任务入队和出队，并可自动调度执行。
+    作业队列，支持多线程安全的任务入队和出队，并可自动调度执行。
+    作业按优先级分类排队（每个优先级一个双端队列，入队、出队均为 O(1)），
+    每个作业返回一个 JobFuture，可获取结果或异常。
+
+    执行后端：
+    - thread：作业在工作线程中执行，适合 I/O 密集作业；
+    - process：作业经 pickle 发送到常驻的工作进程执行，不受 GIL 限制，适合 CPU 密集作业；
+      积压较多时一次分发一批作业，减少进程间往返；每个进程执行满 max_jobs_per_process 个作业后自动替换
+      （按作业数计，分批发送时每批不超过当前进程剩余的配额）；
+    - hybrid：两者兼有，add_job 时以 executor="process" 指定走进程池，默认走线程。
+
+    设置 max_size 后队列有界，队满时入队按 full_policy 阻塞（可设 put_timeout）或直接抛出 queue.Full；
+    submit_many 整批入队，失败时没有作业入队；只有 block 方式下批量作业多于 max_size 时才分段入队，
+    中途超时抛出 PartialSubmitError，其中带有已入队作业的 Future；
+    设置 max_workers 后工作线程数在 min_workers 与 max_workers 之间按积压与排队时延自动伸缩。
+    空闲线程阻塞在条件变量上，入队和停止都会直接唤醒，不依赖轮询超时。
     """
+    BACKENDS = ("thread", "process", "hybrid")
 
-    def __init__(self, worker_num: int = 1):
+    def __init__(self, worker_num: int = 1, priorities: int = 3, backend: str = "thread",
+                 process_num: Optional[int] = None, chunk_size: int = 64,
+                 max_jobs_per_process: Optional[int] = None, start_method: Optional[str] = None,
+                 max_size: Optional[int] = None, full_policy: str = "block", put_timeout: Optional[float] = None,
+                 min_workers: Optional[int] = None, max_workers: Optional[int] = None,
+                 idle_timeout: float = 30.0, target_latency: float = 0.05):
         """
         初始化作业队列。
 
         :param worker_num: 工作线程数量
+        :param priorities: 优先级数量，优先级取值为 0 到 priorities - 1
+        :param backend: 执行后端，thread / process / hybrid
+        :param process_num: 工作进程数量，默认 CPU 核数
+        :param chunk_size: 每次分发给工作进程的最大作业数
+        :param max_jobs_per_process: 工作进程执行多少个作业后被替换（防止内存泄漏累积），默认不替换
+        :param start_method: multiprocessing 启动方式（fork/spawn/forkserver），默认平台缺省值
+        :param max_size: 排队作业数上限，默认不限
+        :param full_policy: 队满时的处理方式，block 阻塞等待，reject 立即抛出 queue.Full
+        :param put_timeout: block 方式下最长等待时间（秒），超时抛出 queue.Full，默认一直等待
+        :param min_workers: 自动伸缩时的最少工作线程数，默认等于 worker_num
+        :param max_workers: 自动伸缩时的最多工作线程数，默认不伸缩
+        :param idle_timeout: 多出 min_workers 的线程空闲多久后退出（秒）
+        :param target_latency: 作业平均排队时延超过该值（秒）且没有空闲线程时扩容
         """
-        self.job_queue = queue.Queue()
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的执行后端: {backend}")
+        if full_policy not in ("block", "reject"):
+            raise ValueError(f"不支持的队满处理方式: {full_policy}")
+        self.backend = backend
         self.worker_num = worker_num
+        self.process_num = process_num or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_jobs_per_process = max_jobs_per_process
+        self.start_method = start_method
+        self.max_size = max_size
+        self.full_policy = full_policy
+        self.put_timeout = put_timeout
+        self.min_workers = worker_num if min_workers is None else min_workers
+        self.max_workers = max(worker_num, max_workers or worker_num)
+        self.idle_timeout = idle_timeout
+        self.target_latency = target_latency
         self.workers = []
+        self.processes: List[_WorkerProcess] = []
         self._running = False
+        self._unfinished = 0
+        self._queued = 0
+        self._thread_workers = 0
+        self._idle = 0
+        self._wait_avg = 0.0
+        self._lock = threading.Lock()
+        self._all_done = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._batch_waiters = 0
+        self.lanes = {}
+        if backend != "process":
+            self.lanes["thread"] = _Lane(priorities, self._lock)
+        if backend != "thread":
+            self.lanes["process"] = _Lane(priorities, self._lock)
+        self.default_executor = "process" if backend == "process" else "thread"
 
-    def add_job(self, func: Callable, *args, **kwargs):
+    def _lane(self, executor: Optional[str]) -> _Lane:
+        lane = self.lanes.get(executor or self.default_executor)
+        if lane is None:
+            raise ValueError(f"执行后端 {self.backend} 不支持执行器: {executor}")
+        return lane
+
+    def add_job(self, func: Callable, *args, priority: int = PRIORITY_NORMAL, executor: Optional[str] = None,
+                **kwargs) -> JobFuture:
         """
         添加一个作业到队列。
 
-        :param func: 要执行的函数
+        :param func: 要执行的函数，走进程池时需可 pickle（模块级函数）
         :param args: 函数的位置参数
+        :param priority: 优先级，PRIORITY_HIGH / PRIORITY_NORMAL / PRIORITY_LOW
+        :param executor: 执行器，thread 或 process，默认按执行后端
         :param kwargs: 函数的关键字参数
+        :return: 作业的 Future
+        :raises ValueError: 优先级或执行器无效
         """
-        self.job_queue.put((func, args, kwargs))
+        lane = self._lane(executor)
+        queue = lane.queue(priority)
+        future = JobFuture()
+        deadline = None if self.put_timeout is None else time.monotonic() + self.put_timeout
+        with self._lock:
+            self._wait_for_space(deadline)
+            queue.append((future, func, args, kwargs, time.monotonic()))
+            self._enqueued(lane, 1)
+        return future
+
+    def submit_many(self, func: Callable, args_list: Iterable, priority: int = PRIORITY_NORMAL,
+                    executor: Optional[str] = None) -> List[JobFuture]:
+        """
+        批量添加同一函数的作业，只加一次锁。
+        有界队列中等到能容纳整批作业时才一次入队，抛出 queue.Full 时没有任何作业入队；
+        block 方式下批量作业多于 max_size 时只能分段入队，中途超时抛出 PartialSubmitError。
+
+        :param func: 要执行的函数
+        :param args_list: 每个作业的参数，元组按位置参数展开，其他值作为单个参数
+        :param priority: 优先级
+        :param executor: 执行器，thread 或 process，默认按执行后端
+        :return: 与参数顺序一致的 Future 列表
+        :raises ValueError: 优先级或执行器无效
+        :raises queue.Full: 队列空间不足（reject）或等待超时，没有作业入队
+        :raises PartialSubmitError: 分段入队中途等待超时，已入队的作业照常执行
+        """
+        lane = self._lane(executor)
+        queue = lane.queue(priority)
+        now = time.monotonic()
+        jobs = [(JobFuture(), func, args if isinstance(args, tuple) else (args,), {}, now) for args in args_list]
+        deadline = None if self.put_timeout is None else now + self.put_timeout
+        if self.max_size is None or len(jobs) <= self.max_size:
+            with self._lock:
+                self._wait_for_space(deadline, len(jobs))
+                queue.extend(jobs)
+                self._enqueued(lane, len(jobs))
+            return [job[0] for job in jobs]
+        if self.full_policy == "reject":
+            raise Full(f"批量作业数超过队列上限: {self.max_size}")
+        start = 0
+        # 整批超过队列上限，分段入队，每段不超过剩余空间
+        while start < len(jobs):
+            with self._lock:
+                try:
+                    self._wait_for_space(deadline)
+                except Full as e:
+                    raise PartialSubmitError(f"{e}，已入队 {start} 个作业", [job[0] for job in jobs[:start]]) from None
+                part = jobs[start:start + self.max_size - self._queued]
+                queue.extend(part)
+                self._enqueued(lane, len(part))
+                start += len(part)
+        return [job[0] for job in jobs]
+
+    def _wait_for_space(self, deadline: Optional[float], count: int = 1):
+        """有界队列中剩余空间不足 count 时按 full_policy 等待或拒绝（调用方持有锁）"""
+        if self.max_size is None:
+            return
+        # 等待多个空位的生产者在登记期间，出队时唤醒全部等待者，避免唤醒被它们占用后单个作业的生产者饿死
+        batch = count > 1
+        while self._queued + count > self.max_size:
+            if self.full_policy == "reject":
+                raise Full(f"作业队列已满，上限: {self.max_size}")
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise Full(f"等待队列空间超时，上限: {self.max_size}")
+            self._batch_waiters += batch
+            try:
+                self._not_full.wait(remaining)
+            finally:
+                self._batch_waiters -= batch
+
+    def _enqueued(self, lane: _Lane, count: int):
+        """入队记账并唤醒工作线程，积压且无空闲线程时扩容（调用方持有锁）"""
+        lane.pending += count
+        self._queued += count
+        self._unfinished += count
+        lane.not_empty.notify(count)
+        if (lane is self.lanes.get("thread") and self._running and self._thread_workers < self.max_workers
+                and self._idle < lane.pending
+                and (lane.pending > self._thread_workers or self._wait_avg > self.target_latency)):
+            for _ in range(min(self.max_workers - self._thread_workers, lane.pending - self._idle)):
+                self._spawn_worker()
+
+    def _spawn_worker(self):
+        """新增一个工作线程（调用方持有锁）"""
+        self.workers = [t for t in self.workers if t.is_alive()]
+        self._thread_workers += 1
+        t = threading.Thread(target=self._worker, daemon=True)
+        t.start()
+        self.workers.append(t)
+
+    def stats(self) -> dict:
+        """
+        队列运行状态。
+
+        :return: 排队作业数、未完成作业数、工作线程数、空闲线程数、平均排队时延（秒）
+        """
+        with self._lock:
+            return {
+                "queued": self._queued,
+                "unfinished": self._unfinished,
+                "workers": self._thread_workers,
+                "idle": self._idle,
+                "avg_wait": self._wait_avg
+            }
+
+    @staticmethod
+    def as_completed(futures: Iterable[JobFuture], timeout: Optional[float] = None) -> Iterator[JobFuture]:
+        """按完成顺序产出 Future，同模块级 as_completed"""
+        return as_completed(futures, timeout)
+
+    def _next_jobs(self, lane: _Lane, count: int, scalable: bool = False) -> list:
+        """
+        取出优先级最高的至多 count 个作业，队列为空时等待。
+        停止后返回空列表；scalable 为 True 时，多出 min_workers 的线程空闲超过 idle_timeout 也返回空列表。
+        """
+        with self._lock:
+            while not lane.pending:
+                if not self._running:
+                    return []
+                if not scalable or self.max_workers == self.min_workers:
+                    lane.not_empty.wait()
+                    continue
+                # 队列已空，之前的排队时延不再代表当前负载
+                self._wait_avg = 0.0
+                self._idle += 1
+                signaled = lane.not_empty.wait(self.idle_timeout)
+                self._idle -= 1
+                if not signaled and not lane.pending and self._thread_workers > self.min_workers:
+                    self._thread_workers -= 1
+                    return []
+            jobs = lane.pop(count)
+            self._queued -= len(jobs)
+            if self._batch_waiters:
+                self._not_full.notify_all()
+            elif self.max_size is not None:
+                self._not_full.notify(len(jobs))
+            if scalable:
+                # 排队时延的指数滑动平均，用于扩容判断
+                self._wait_avg += 0.1 * (time.monotonic() - jobs[0][4] - self._wait_avg)
+            return jobs
+
+    def _jobs_done(self, count: int):
+        with self._lock:
+            self._unfinished -= count
+            if not self._unfinished:
+                self._all_done.notify_all()
 
     def _worker(self):
         """
         工作线程方法，循环处理队列中的作业。
         """
-        while self._running:
-            try:
-                func, args, kwargs = self.job_queue.get(timeout=1)
+        lane = self.lanes["thread"]
+        while True:
+            jobs = self._next_jobs(lane, 1, scalable=True)
+            if not jobs:
+                return
+            future, func, args, kwargs, _ = jobs[0]
+            # 已取消的作业直接跳过
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            self._jobs_done(1)
+
+    def _dispatcher(self, worker: _WorkerProcess):
+        """
+        分发线程方法：每个线程独占一个工作进程，取出一批作业序列化后交给该进程执行，再回填结果。
+        """
+        lane = self.lanes["process"]
+        while True:
+            # 积压多时按批分发，积压少时一次一个，避免作业集中到少数进程
+            with self._lock:
+                count = worker.remaining(min(self.chunk_size, max(1, lane.pending // self.process_num)))
+            jobs = self._next_jobs(lane, count)
+            if not jobs:
+                return
+            futures, payloads = [], []
+            for future, func, args, kwargs, _ in jobs:
+                if not future.set_running_or_notify_cancel():
+                    continue
                 try:
-                    func(*args, **kwargs)
+                    payloads.append(pickle.dumps((func, args, kwargs)))
+                    futures.append(future)
                 except Exception as e:
-                    print(f"作业执行异常: {e}")
-                self.job_queue.task_done()
-            except queue.Empty:
-                continue
+                    future.set_exception(pickle.PicklingError(f"作业无法序列化: {e}"))
+            if payloads:
+                try:
+                    results = worker.run(payloads)
+                except BaseException as e:
+                    results = [pickle.dumps((False, e))] * len(payloads)
+                for future, result in zip(futures, results):
+                    ok, value = pickle.loads(result)
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+            self._jobs_done(len(jobs))
 
     def start(self):
         """
-        启动所有工作线程，开始处理作业队列。
+        启动所有工作线程（及工作进程），开始处理作业队列。
+        工作进程在各自的分发线程首次分发作业时才启动。
         """
         if not self._running:
             self._running = True
-            for _ in range(self.worker_num):
-                t = threading.Thread(target=self._worker, daemon=True)
-                t.start()
-                self.workers.append(t)
-            print(f"作业队列已启动，工作线程数: {self.worker_num}")
+            if "process" in self.lanes:
+                context = multiprocessing.get_context(self.start_method)
+                self.processes = [_WorkerProcess(context, self.max_jobs_per_process) for _ in range(self.process_num)]
+                for worker in self.processes:
+                    t = threading.Thread(target=self._dispatcher, args=(worker,), daemon=True)
+                    t.start()
+                    self.workers.append(t)
+            if "thread" in self.lanes:
+                with self._lock:
+                    for _ in range(self.worker_num):
+                        self._spawn_worker()
+            print(f"作业队列已启动，执行后端: {self.backend}，工作线程数: {self.worker_num if 'thread' in self.lanes else 0}，"
+                  f"工作进程数: {len(self.processes)}")
 
-    def stop(self):
+    def stop(self, cancel_pending: bool = False):
         """
-        停止所有工作线程，等待当前作业完成。
+        停止所有工作线程：已入队的作业执行完后线程退出，随后关闭工作进程。
+
+        :param cancel_pending: 为 True 时取消尚未开始的作业，只等待正在执行的作业
         """
-        self._running = False
+        cancelled = []
+        with self._lock:
+            self._running = False
+            for lane in self.lanes.values():
+                if cancel_pending:
+                    jobs = lane.pop(lane.pending)
+                    self._queued -= len(jobs)
+                    cancelled.extend(jobs)
+                lane.not_empty.notify_all()
+            self._not_full.notify_all()
+        for job in cancelled:
+            job[0].cancel()
+        if cancelled:
+            self._jobs_done(len(cancelled))
         for t in self.workers:
             t.join()
+        self.workers = []
+        self._thread_workers = 0
+        for worker in self.processes:
+            worker.close()
+        self.processes = []
         print("作业队列已停止")
 
-    def wait_all(self):
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
         """
         阻塞直到所有作业处理完成。
+
+        :param timeout: 超时时间（秒），默认一直等待
+        :return: 是否全部完成
         """
-        self.job_queue.join()
+        with self._lock:
+            return self._all_done.wait_for(lambda: not self._unfinished, timeout)
 
 # 示例用法
 if __name__ == "__main__":
-    import time
-
     def example_job(x):
         print(f"处理作业: {x}")
         time.sleep(1)
+        return x * x
 
     jq = JobQueue(worker_num=2)
     jq.start()
-    for i in range(5):
-        jq.add_job(example_job, i)
+    futures = [jq.add_job(example_job, i) for i in range(4)]
+    futures.append(jq.add_job(example_job, 100, priority=PRIORITY_HIGH))
+    for f in jq.as_completed(futures):
+        print("作业结果:", f.result())
+
+    squares = jq.submit_many(lambda x: x * x, range(100000), priority=PRIORITY_LOW)
     jq.wait_all()
+    print("批量作业结果之和:", sum(f.result() for f in squares))
     jq.stop()
+
+    # CPU 密集作业走进程池，I/O 作业仍在线程中执行；工作进程每执行 1000 个作业替换一次
+    hybrid = JobQueue(worker_num=4, backend="hybrid", process_num=2, max_jobs_per_process=1000)
+    hybrid.start()
+    cpu_jobs = hybrid.submit_many(sum, [(range(n),) for n in range(10000)], executor="process")
+    io_job = hybrid.add_job(time.sleep, 0.1)
+    hybrid.wait_all()
+    print("进程池作业结果之和:", sum(f.result() for f in cpu_jobs), "线程作业完成:", io_job.done())
+    hybrid.stop()
+
+    # 有界队列：生产者在队满时阻塞；工作线程按积压在 1 到 16 之间伸缩
+    bounded = JobQueue(worker_num=1, max_size=100, max_workers=16, idle_timeout=1.0)
+    bounded.start()
+    sleeps = bounded.submit_many(time.sleep, [0.01] * 1000)
+    print("伸缩中的队列状态:", bounded.stats())
+    bounded.wait_all()
+    time.sleep(1.5)
+    print("空闲收缩后的队列状态:", bounded.stats())
+    bounded.stop()
@@ -1,58 +1,400 @@
+import heapq
 import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from engine_layer.heartbeat_monitor import HeartbeatEvent, HeartbeatScheduler, STATE_DEGRADED, STATE_DOWN, STATE_UP
+
+class _Waiter:
+    """阻塞等待机器的调用方"""
+    __slots__ = ("groups", "holder", "lease", "ready", "machine")
+
+    def __init__(self, groups: frozenset, holder: Optional[Hashable], lease: Optional[float], lock: threading.Lock):
+        self.groups = groups
+        self.holder = holder
+        self.lease = lease
+        self.ready = threading.Condition(lock)
+        self.machine = None
 
 class MachinePool:
     """
     机器池，用于管理和分配可用的测试/构建机器资源。
     支持线程安全的资源分配与回收。
+
+    机器按能力标签（如 os、browser、device）分组，每组一个空闲链表；按标签匹配时通过“标签 -> 分组”的倒排索引
+    找到满足要求的分组（结果按要求缓存），分配为 O(匹配的分组数)，回收为 O(1)，均与机器总数、等待者数无关。
+    分组数是标签组合的种数，通常远小于机器数。
+    没有空闲机器时 acquire 阻塞等待（可设超时），等待者按分组建立索引，回收的机器按先来先到直接交给该分组的第一个等待者。
+    分配时可指定租约时长，持有者崩溃未回收的机器在租约到期后自动收回。
+
+    隔离的机器（心跳异常等）不参与分配，恢复后自动回到池中，隔离与恢复均为 O(1)。
+    每组空闲机器再按负载分档，每组用位掩码记录非空的档，O(1) 找到组内负载最低的非空档，分配时取各匹配分组中负载最低
+    一档的机器；负载由 PerfAgent 上报的 CPU 与心跳/请求延迟按指数滑动平均得出，负载变化只是把空闲机器移到另一档，为 O(1)。
     """
 
-    def __init__(self, machines: list):
+    def __init__(self, machines: list, labels: Optional[Dict[str, Dict[str, str]]] = None,
+                 default_lease: Optional[float] = None, load_levels: int = 10, latency_scale: float = 1.0,
+                 load_alpha: float = 0.3):
         """
         初始化机器池。
 
         :param machines: 机器列表，每个元素可为机器名、IP 或机器描述信息
+        :param labels: 机器的能力标签，如 {"machine1": {"os": "linux", "browser": "chrome"}}
+        :param default_lease: 默认租约时长（秒），默认不限
+        :param load_levels: 负载分档数
+        :param latency_scale: 视为满负载的延迟（秒），延迟按此折算为 0-100 的负载
+        :param load_alpha: 负载指数滑动平均的平滑系数
         """
-        self._machines = machines.copy()
+        self.default_lease = default_lease
+        self.load_levels = load_levels
+        self.latency_scale = latency_scale
+        self.load_alpha = load_alpha
         self._lock = threading.Lock()
-        self._in_use = set()
+        self._machines = {}        # 机器 -> 所属分组（标签集合）
+        self._groups = {}          # 分组 -> 各负载档的空闲机器（有序字典作空闲链表）
+        self._level = {}           # 机器 -> 负载档
+        self._load = {}            # 机器 -> [CPU 负载, 延迟负载]，均为 0-100 的滑动平均
+        self._quarantined = set()
+        self._nonempty = {}        # 分组 -> 非空负载档的位掩码，第 i 位对应第 i 档
+        self._label_index = {}     # (标签名, 标签值) -> 分组集合
+        self._match_cache = {}     # 标签要求 -> 匹配的分组集合
+        self._in_use = {}          # 机器 -> 持有者
+        self._leases = {}          # 机器 -> 租约到期时间
+        self._lease_heap = []      # (到期时间, 机器)，懒删除
+        self._waiters = OrderedDict()        # 全部等待者，按到达顺序
+        self._group_waiters = {}             # 分组 -> 可以接收该分组机器的等待者，按到达顺序
+        self._free_count = 0
+        labels = labels or {}
+        for machine in machines:
+            self._add(machine, labels.get(machine))
+
+    def _add(self, machine: Hashable, labels: Optional[Dict[str, str]]):
+        """登记一台机器并放入池中（调用方持有锁或处于初始化中）"""
+        if machine in self._machines:
+            raise ValueError(f"机器已存在: {machine}")
+        group = frozenset((labels or {}).items())
+        if group not in self._groups:
+            self._groups[group] = [OrderedDict() for _ in range(self.load_levels)]
+            self._nonempty[group] = 0
+            self._group_waiters[group] = OrderedDict()
+            for item in group:
+                self._label_index.setdefault(item, set()).add(group)
+            self._match_cache.clear()
+        self._machines[machine] = group
+        self._level[machine] = 0
+        self._put_back(machine)
+
+    def _match(self, labels: Optional[Dict[str, str]]) -> frozenset:
+        """满足标签要求的分组集合：对每个要求的标签取倒排索引的交集，结果按要求缓存"""
+        key = frozenset((labels or {}).items())
+        groups = self._match_cache.get(key)
+        if groups is None:
+            if not key:
+                groups = frozenset(self._groups)
+            else:
+                sets = sorted((self._label_index.get(item, set()) for item in key), key=len)
+                groups = frozenset(sets[0].intersection(*sets[1:]))
+            self._match_cache[key] = groups
+        return groups
+
+    def _take(self, groups: frozenset) -> Optional[Hashable]:
+        """从匹配的分组中取出负载最低一档的空闲机器，O(匹配的分组数)（调用方持有锁）"""
+        if not self._free_count:
+            return None
+        best, best_level = None, self.load_levels
+        for group in groups:
+            mask = self._nonempty[group]
+            if mask:
+                # 最低位的 1 即组内负载最低的非空档
+                level = (mask & -mask).bit_length() - 1
+                if level < best_level:
+                    best, best_level = group, level
+                    if not level:
+                        break
+        if best is None:
+            return None
+        free = self._groups[best][best_level]
+        machine, _ = free.popitem(last=False)
+        if not free:
+            self._nonempty[best] &= ~(1 << best_level)
+        self._free_count -= 1
+        return machine
 
-    def acquire(self) -> str:
+    def _link_free(self, machine: Hashable):
+        """把机器放入所属分组、所在负载档的空闲链表（调用方持有锁）"""
+        group, level = self._machines[machine], self._level[machine]
+        self._groups[group][level][machine] = None
+        self._nonempty[group] |= 1 << level
+        self._free_count += 1
+
+    def _assign(self, machine: Hashable, holder: Optional[Hashable], lease: Optional[float]):
+        """登记机器的持有者和租约（调用方持有锁）"""
+        self._in_use[machine] = holder
+        lease = self.default_lease if lease is None else lease
+        if lease is not None:
+            expires_at = time.monotonic() + lease
+            self._leases[machine] = expires_at
+            self._push_lease(machine, expires_at)
+
+    def _push_lease(self, machine: Hashable, expires_at: float):
+        """登记租约到期时间；成为最早到期的租约时唤醒队首等待者，由它按新的到期时间等待（调用方持有锁）"""
+        heapq.heappush(self._lease_heap, (expires_at, id(machine), machine))
+        if self._waiters and self._lease_heap[0][0] == expires_at:
+            next(iter(self._waiters)).ready.notify()
+
+    def _put_back(self, machine: Hashable):
+        """机器回到池中：先交给该分组的第一个等待者，没有则放回空闲链表；隔离中的机器不放回（调用方持有锁）"""
+        if machine in self._quarantined:
+            return
+        waiters = self._group_waiters[self._machines[machine]]
+        if waiters:
+            waiter = next(iter(waiters))
+            self._remove_waiter(waiter)
+            self._assign(machine, waiter.holder, waiter.lease)
+            waiter.machine = machine
+            waiter.ready.notify()
+            return
+        self._link_free(machine)
+
+    def _unlink_free(self, machine: Hashable) -> bool:
+        """把空闲机器从空闲链表中摘下，机器不在空闲链表中时返回 False（调用方持有锁）"""
+        group, level = self._machines[machine], self._level[machine]
+        free = self._groups[group][level]
+        if machine not in free:
+            return False
+        del free[machine]
+        if not free:
+            self._nonempty[group] &= ~(1 << level)
+        self._free_count -= 1
+        return True
+
+    def _add_waiter(self, waiter: _Waiter):
+        """加入等待队列，并登记到每个匹配分组的等待者索引（调用方持有锁）"""
+        self._waiters[waiter] = None
+        for group in waiter.groups:
+            self._group_waiters[group][waiter] = None
+
+    def _remove_waiter(self, waiter: _Waiter):
+        """移出等待队列；队首变化时唤醒新的队首，由它接管租约到期的检查（调用方持有锁）"""
+        head = next(iter(self._waiters)) is waiter
+        del self._waiters[waiter]
+        for group in waiter.groups:
+            del self._group_waiters[group][waiter]
+        if head and self._waiters:
+            next(iter(self._waiters)).ready.notify()
+
+    def _reclaim_expired(self) -> Optional[float]:
         """
-        分配一台空闲机器。
+        收回租约已到期的机器（调用方持有锁）。
 
+        :return: 下一个租约的到期时间，没有租约时为 None
+        """
+        now = time.monotonic()
+        heap = self._lease_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, machine = heapq.heappop(heap)
+            # 已回收或已续租的机器在堆中留有过期条目，跳过
+            if self._leases.get(machine) == expires_at:
+                del self._leases[machine]
+                del self._in_use[machine]
+                print(f"机器 {machine} 租约到期，已自动回收")
+                self._put_back(machine)
+        return heap[0][0] if heap else None
+
+    def acquire(self, labels: Optional[Dict[str, str]] = None, timeout: Optional[float] = 0,
+                holder: Optional[Hashable] = None, lease: Optional[float] = None) -> str:
+        """
+        分配一台空闲机器。默认没有空闲机器时立即报错，指定 timeout 时等待。
+
+        :param labels: 标签要求，如 {"os": "linux", "browser": "chrome"}，默认任意机器
+        :param timeout: 最长等待时间（秒），默认 0 表示不等待，None 表示一直等待
+        :param holder: 持有者标识，回收时可据此校验
+        :param lease: 租约时长（秒），默认使用 default_lease
         :return: 分配到的机器标识
-        :raises RuntimeError: 如果没有可用机器
+        :raises ValueError: 如果没有任何机器满足标签要求
+        :raises RuntimeError: 如果没有可用机器或等待超时
         """
+        deadline = None if timeout is None else time.monotonic() + timeout
         with self._lock:
-            available = [m for m in self._machines if m not in self._in_use]
-            if not available:
+            groups = self._match(labels)
+            if not groups:
+                raise ValueError(f"没有满足标签要求的机器: {labels}")
+            next_expiry = self._reclaim_expired()
+            machine = self._take(groups)
+            if machine is not None:
+                self._assign(machine, holder, lease)
+                print(f"分配机器: {machine}")
+                return machine
+            if timeout is not None and timeout <= 0:
                 raise RuntimeError("没有可用的机器资源")
-            machine = available[0]
-            self._in_use.add(machine)
-            print(f"分配机器: {machine}")
-            return machine
+            waiter = _Waiter(groups, holder, lease, self._lock)
+            self._add_waiter(waiter)
+            while waiter.machine is None:
+                # 等到被分配、超时或最近的租约到期（到期时由等待者自己收回机器）
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    self._remove_waiter(waiter)
+                    raise RuntimeError(f"等待可用机器超时（{timeout} 秒）")
+                waits = [t - now for t in (deadline, next_expiry) if t is not None]
+                waiter.ready.wait(max(0.0, min(waits)) if waits else None)
+                if waiter.machine is None:
+                    next_expiry = self._reclaim_expired()
+            print(f"分配机器: {waiter.machine}")
+            return waiter.machine
 
-    def release(self, machine: str):
+    def release(self, machine: str, holder: Optional[Hashable] = None):
         """
         回收一台已分配的机器。
 
         :param machine: 要回收的机器标识
+        :param holder: 持有者标识；指定时只有当前持有者才能回收（租约到期被转给他人的机器不会被误回收）
         """
         with self._lock:
-            if machine in self._in_use:
-                self._in_use.remove(machine)
-                print(f"回收机器: {machine}")
-            else:
+            if machine not in self._in_use or (holder is not None and self._in_use[machine] != holder):
                 print(f"机器 {machine} 未被分配，无需回收")
+                return
+            del self._in_use[machine]
+            self._leases.pop(machine, None)
+            self._put_back(machine)
+        print(f"回收机器: {machine}")
+
+    def renew(self, machine: str, lease: Optional[float] = None, holder: Optional[Hashable] = None) -> bool:
+        """
+        续租一台已分配的机器。
+
+        :param lease: 新的租约时长（秒），默认使用 default_lease
+        :param holder: 持有者标识，指定时校验
+        :return: 是否续租成功（机器已被收回时返回 False）
+        """
+        lease = self.default_lease if lease is None else lease
+        with self._lock:
+            if machine not in self._in_use or (holder is not None and self._in_use[machine] != holder):
+                return False
+            if lease is None:
+                self._leases.pop(machine, None)
+            else:
+                expires_at = time.monotonic() + lease
+                self._leases[machine] = expires_at
+                self._push_lease(machine, expires_at)
+            return True
+
+    def add_machine(self, machine: str, labels: Optional[Dict[str, str]] = None):
+        """
+        向池中加入一台机器。
 
-    def available_count(self) -> int:
+        :param labels: 机器的能力标签
+        """
+        with self._lock:
+            self._add(machine, labels)
+
+    def available_count(self, labels: Optional[Dict[str, str]] = None) -> int:
         """
         获取当前可用机器数量。
 
+        :param labels: 标签要求，默认统计全部机器
         :return: 可用机器数量
         """
         with self._lock:
-            return len([m for m in self._machines if m not in self._in_use])
+            self._reclaim_expired()
+            if not labels:
+                return self._free_count
+            return sum(len(free) for group in self._match(labels) for free in self._groups[group])
+
+    def quarantine(self, machine: str, reason: str = ""):
+        """
+        隔离一台机器，不再参与分配；已分配的机器回收后也不放回池中。
+
+        :param reason: 隔离原因，仅用于输出
+        """
+        with self._lock:
+            if machine not in self._machines or machine in self._quarantined:
+                return
+            self._unlink_free(machine)
+            self._quarantined.add(machine)
+        print(f"隔离机器: {machine} {reason}".rstrip())
+
+    def restore(self, machine: str):
+        """
+        解除隔离，空闲的机器立即回到池中（有等待者时直接交给等待者）。
+        """
+        with self._lock:
+            if machine not in self._quarantined:
+                return
+            self._quarantined.discard(machine)
+            if machine not in self._in_use:
+                self._put_back(machine)
+        print(f"恢复机器: {machine}")
+
+    def quarantined(self) -> List[str]:
+        """隔离中的机器列表"""
+        with self._lock:
+            return list(self._quarantined)
+
+    def report_load(self, machine: str, cpu_percent: Optional[float] = None, latency: Optional[float] = None):
+        """
+        上报机器负载，按指数滑动平均更新；空闲机器随之移到对应的负载档。
+
+        :param cpu_percent: CPU 使用率（0-100）
+        :param latency: 心跳或请求延迟（秒），按 latency_scale 折算为负载
+        """
+        with self._lock:
+            if machine not in self._machines:
+                return
+            load = self._load.setdefault(machine, [None, None])
+            for i, value in ((0, cpu_percent), (1, None if latency is None else 100.0 * latency / self.latency_scale)):
+                if value is not None:
+                    value = min(value, 100.0)
+                    # 首个样本直接作为初值
+                    load[i] = value if load[i] is None else load[i] + self.load_alpha * (value - load[i])
+            # 以两项中较高者为准：CPU 或延迟任一接近饱和的机器都不宜再分配作业
+            level = min(self.load_levels - 1, int(max(v or 0.0 for v in load) * self.load_levels / 100.0))
+            if level != self._level[machine]:
+                free = self._unlink_free(machine)
+                self._level[machine] = level
+                if free:
+                    self._link_free(machine)
+
+    def load(self, machine: str) -> float:
+        """机器当前负载（0-100）"""
+        with self._lock:
+            return max(v or 0.0 for v in self._load.get(machine, (None, None)))
+
+    def load_reporter(self, machine: str):
+        """
+        生成 PerfAgent 的采集回调，把该机器代理采集的数据上报为负载。
+
+        :return: 接收采集数据字典的函数，读取 cpu_percent 和可选的 latency 字段
+        """
+        return lambda info: self.report_load(machine, info.get("cpu_percent"), info.get("latency"))
+
+    def attach_heartbeat(self, scheduler: HeartbeatScheduler,
+                         quarantine_states: Iterable[str] = (STATE_DOWN, STATE_DEGRADED)):
+        """
+        订阅心跳调度器的状态变化：目标标识即机器标识，进入 quarantine_states 时隔离，恢复为 up 时解除隔离；
+        事件中的检查耗时同时作为延迟负载上报。
+
+        :param scheduler: 心跳调度器
+        :param quarantine_states: 需要隔离的状态
+        """
+        quarantine_states = frozenset(quarantine_states)
+
+        def on_change(event: HeartbeatEvent):
+            if event.target not in self._machines:
+                return
+            if event.latency is not None:
+                self.report_load(event.target, latency=event.latency)
+            if event.new_state in quarantine_states:
+                self.quarantine(event.target, f"（心跳状态: {event.new_state}）")
+            elif event.new_state == STATE_UP:
+                self.restore(event.target)
+
+        scheduler.add_listener(on_change)
+
+    def in_use(self) -> List[str]:
+        """已分配的机器列表"""
+        with self._lock:
+            return list(self._in_use)
 
 # 示例用法
 if __name__ == "__main__":
@@ -62,3 +404,35 @@ if __name__ == "__main__":
     print(f"剩余可用: {pool.available_count()}")
     pool.release(m1)
     print(f"剩余可用: {pool.available_count()}")
+
+    # 按标签分配：指定 timeout 时等待空闲的 Windows 机器，另一线程回收后立即拿到
+    labeled = MachinePool(["linux-1", "linux-2", "win-1"], labels={
+        "linux-1": {"os": "linux", "browser": "chrome"},
+        "linux-2": {"os": "linux", "browser": "firefox"},
+        "win-1": {"os": "windows", "browser": "edge"}})
+    win = labeled.acquire({"os": "windows"})
+    threading.Timer(0.5, labeled.release, args=(win,)).start()
+    print("等待后分配到:", labeled.acquire({"os": "windows"}, timeout=5))
+
+    # 租约：持有者崩溃未回收的机器到期后自动收回
+    labeled.acquire({"browser": "chrome"}, holder="job-1", lease=0.2)
+    print("租约到期后分配到:", labeled.acquire({"browser": "chrome"}, timeout=1, holder="job-2"))
+
+    # 心跳与负载：心跳异常的机器被隔离，恢复后回到池中；分配优先选负载低的机器
+    agents_alive = {"agent-1": True, "agent-2": True, "agent-3": True}
+    fleet = MachinePool(list(agents_alive))
+    scheduler = HeartbeatScheduler(max_workers=4, default_interval=0.1, failure_threshold=1)
+    for name in agents_alive:
+        scheduler.add_target(name, lambda name=name: agents_alive[name])
+    fleet.attach_heartbeat(scheduler)
+    scheduler.start()
+    fleet.report_load("agent-1", cpu_percent=95)
+    fleet.report_load("agent-2", cpu_percent=10)
+    fleet.report_load("agent-3", cpu_percent=40)
+    agents_alive["agent-2"] = False
+    time.sleep(0.5)
+    print("agent-2 宕机后分配到:", fleet.acquire())
+    agents_alive["agent-2"] = True
+    time.sleep(0.5)
+    print("agent-2 恢复后分配到:", fleet.acquire())
+    scheduler.stop()
@@ -1,19 +1,71 @@
+import json
 import sqlite3
-from typing import Any, List, Tuple, Dict, Optional
+import time
+from array import array
+from datetime import datetime
+from typing import Any, Iterable, List, Tuple, Dict, Optional
+
+import numpy as np
+
+from framework_layer.core.data_sink import _batch_columns, _is_ragged
+
+# NumPy dtype 类别到 SQLite 列类型的映射
+SQLITE_TYPES = {"i": "INTEGER", "u": "INTEGER", "b": "INTEGER", "f": "REAL", "U": "TEXT", "S": "TEXT", "M": "TEXT"}
+
+def _batch_arrays(batch: Any) -> Tuple[List[str], List[Any]]:
+    """
+    取出一个数据块的字段名和各列（同 data_sink 的 _batch_columns），
+    对象列表转置出的 Python 列表再转为 NumPy 数组，变长字段保持为列表的列表。
+    """
+    fields, columns = _batch_columns(batch)
+    return fields, [_as_column(column) for column in columns]
+
+def _as_column(values: Any) -> Any:
+    """Python 列表转为按类型推断的 NumPy 数组；ColumnBlock 的列原样返回"""
+    if not isinstance(values, list):
+        return values
+    if isinstance(values[0], (list, tuple, array)):
+        return [list(v) for v in values]
+    if isinstance(values[0], datetime):
+        return np.array(values, dtype="datetime64[us]")
+    return np.array(values)
+
+def _is_list_column(column: Any) -> bool:
+    """变长列：RaggedArray（扁平值数组 + 偏移数组）或列表的列表"""
+    return _is_ragged(column) or isinstance(column, list)
+
+def _sqlite_type(column: Any) -> str:
+    """推断列的 SQLite 类型，变长列以 JSON 文本存储"""
+    if _is_list_column(column):
+        return "TEXT"
+    return SQLITE_TYPES.get(column.dtype.kind, "TEXT")
+
+def _sqlite_values(column: Any) -> List[Any]:
+    """把一列转换为 sqlite3 可直接绑定的 Python 值列表"""
+    if _is_list_column(column):
+        lists = column.tolist() if _is_ragged(column) else column
+        return [json.dumps(v) for v in lists]
+    kind = column.dtype.kind
+    if kind == "M":
+        return np.datetime_as_string(column, unit="us").tolist()
+    if kind == "b":
+        return column.astype(np.int8).tolist()
+    return column.tolist()
 
 class DBHelper:
     """
     数据库辅助工具类，支持基本的增删改查操作（以 SQLite 为例）。
     """
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, check_same_thread: bool = True):
         """
         初始化数据库连接。
 
         :param db_path: 数据库文件路径
+        :param check_same_thread: 为 False 时允许多个线程共用连接（调用方需自行加锁）
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
         self.conn.row_factory = sqlite3.Row  # 查询结果可通过字段名访问
 
     def execute(self, sql: str, params: Tuple = ()) -> None:
@@ -26,6 +78,120 @@ class DBHelper:
         with self.conn:
             self.conn.execute(sql, params)
 
+    def executemany(self, sql: str, seq_of_params: Iterable[Tuple]) -> None:
+        """
+        在同一个事务中批量执行 SQL 语句。
+
+        :param sql: SQL 语句
+        :param seq_of_params: 参数元组序列
+        """
+        with self.conn:
+            self.conn.executemany(sql, seq_of_params)
+
+    def set_pragmas(self, **pragmas) -> Dict[str, Any]:
+        """
+        设置 PRAGMA（如 journal_mode="WAL", synchronous="OFF"），返回修改前的取值，便于恢复。
+
+        :param pragmas: PRAGMA 名称与取值
+        :return: 修改前的取值字典
+        """
+        previous = {}
+        for name, value in pragmas.items():
+            row = self.conn.execute(f"PRAGMA {name}").fetchone()
+            previous[name] = row[0] if row else None
+            self.conn.execute(f"PRAGMA {name} = {value}")
+        return previous
+
+    def create_table_for(self, table: str, batch: Any, primary_key: Optional[str] = None,
+                         column_map: Optional[Dict[str, str]] = None) -> None:
+        """
+        按数据块的字段和类型建表（表已存在时不做修改）。
+
+        :param table: 表名
+        :param batch: 样例数据块（ColumnBlock 或数据模型对象列表）
+        :param primary_key: 主键字段名
+        :param column_map: 字段名到表列名的映射
+        """
+        column_map = column_map or {}
+        fields, columns = _batch_arrays(batch)
+        definitions = []
+        for name, column in zip(fields, columns):
+            definition = f'"{column_map.get(name, name)}" {_sqlite_type(column)}'
+            if name == primary_key:
+                definition += " PRIMARY KEY"
+            definitions.append(definition)
+        self.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({", ".join(definitions)})')
+
+    def bulk_load(self, table: str, source: Any, count: Optional[int] = None, chunk_size: int = 10000,
+                  commit_every: int = 100000, create_table: bool = True, primary_key: Optional[str] = None,
+                  column_map: Optional[Dict[str, str]] = None, pragmas: Optional[Dict[str, Any]] = None,
+                  upsert_key: Optional[str] = None) -> Dict[str, float]:
+        """
+        将数据工厂的输出批量导入表中：executemany 逐块插入，每 commit_every 行提交一次事务。
+        指定 upsert_key 时按该字段 upsert，数据块可以只包含主键和部分字段（如增量变更流）。
+
+        :param table: 目标表名
+        :param source: 数据工厂（需指定 count，按列式 iter_batch 生成）或数据块迭代器
+        :param count: 从数据工厂生成的总行数
+        :param chunk_size: 从数据工厂生成时每块的行数
+        :param commit_every: 每个事务包含的行数
+        :param create_table: 表不存在时按数据字段自动建表
+        :param primary_key: 主键字段名，数据工厂默认使用其 id_field
+        :param column_map: 字段名到表列名的映射，用于导入已有的表
+        :param pragmas: 导入期间临时生效的 PRAGMA，默认 journal_mode=WAL, synchronous=OFF，导入后恢复
+        :param upsert_key: 冲突判定字段（需有唯一约束），冲突时只更新数据块中出现的其他字段
+        :return: 统计信息：rows、seconds、rows_per_sec
+        """
+        if hasattr(source, "iter_batch"):
+            if count is None:
+                raise ValueError("从数据工厂导入时必须指定 count")
+            primary_key = primary_key or getattr(source, "id_field", None)
+            batches = source.iter_batch(count, chunk_size=chunk_size, columnar=True)
+        else:
+            batches = source
+        column_map = column_map or {}
+        pragmas = {"journal_mode": "WAL", "synchronous": "OFF"} if pragmas is None else pragmas
+
+        previous = self.set_pragmas(**pragmas)
+        start = time.time()
+        rows = 0
+        pending = 0
+        statements = {}
+        try:
+            for batch in batches:
+                fields, columns = _batch_arrays(batch)
+                if not columns:
+                    continue
+                if not statements and create_table:
+                    self.create_table_for(table, batch, primary_key or upsert_key, column_map)
+                # 各数据块字段可能不同（如增量变更流），按字段组合缓存 SQL
+                sql = statements.get(tuple(fields))
+                if sql is None:
+                    names = [f'"{column_map.get(name, name)}"' for name in fields]
+                    sql = f'INSERT INTO "{table}" ({", ".join(names)}) VALUES ({", ".join("?" * len(fields))})'
+                    if upsert_key is not None:
+                        key = f'"{column_map.get(upsert_key, upsert_key)}"'
+                        updates = ", ".join(f"{name} = excluded.{name}" for name in names if name != key)
+                        sql += f" ON CONFLICT ({key}) " + (f"DO UPDATE SET {updates}" if updates else "DO NOTHING")
+                    statements[tuple(fields)] = sql
+                values = [_sqlite_values(column) for column in columns]
+                # 沿用 sqlite3 的隐式事务：首条插入自动开启，累计到 commit_every 行再提交
+                self.conn.executemany(sql, zip(*values))
+                batch_rows = len(values[0])
+                rows += batch_rows
+                pending += batch_rows
+                if pending >= commit_every:
+                    self.conn.commit()
+                    pending = 0
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.set_pragmas(**previous)
+        seconds = time.time() - start
+        return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds > 0 else 0.0}
+
     def query(self, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
         """
         执行查询语句，返回结果列表。
@@ -65,4 +231,18 @@ if __name__ == "__main__":
     db.execute("INSERT INTO users (name) VALUES (?)", ("Alice",))
     users = db.query("SELECT * FROM users")
     print("用户列表:", users)
+
+    # 批量导入：任意产出数据块的迭代器（如数据工厂的 iter_batch）均可
+    class Metric:
+        __slots__ = ("metric_id", "name", "value")
+
+        def __init__(self, metric_id, name, value):
+            self.metric_id = metric_id
+            self.name = name
+            self.value = value
+
+    batches = ([Metric(i, f"metric_{i}", i * 0.1) for i in range(start, start + 10000)] for start in range(0, 100000, 10000))
+    stats = db.bulk_load("metrics", batches, primary_key="metric_id", commit_every=50000)
+    print(f"批量导入 metrics: {stats['rows']} 行，耗时 {stats['seconds']:.2f} 秒，{stats['rows_per_sec']:.0f} 行/秒")
+    print("导入行数:", db.query_one("SELECT COUNT(*) AS n FROM metrics")["n"])
     db.close() 
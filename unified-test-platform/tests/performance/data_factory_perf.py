@@ -0,0 +1,235 @@
+import gc
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+FACTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..",
+                            "Untitled-1", "from abc import ABC, abstractmethod.py")
+
+def load_factory_module(path: str = FACTORY_PATH):
+    """
+    按文件路径加载测试数据工厂模块。
+
+    :param path: 工厂模块文件路径
+    :return: 模块对象
+    """
+    spec = importlib.util.spec_from_file_location("test_data_factory", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["test_data_factory"] = module
+    spec.loader.exec_module(module)
+    return module
+
+def build_cases(tdf) -> Dict[str, Tuple[Callable, Callable]]:
+    """
+    构建基准用例：名称 -> (setup(rows) -> state, run(state, rows))，只对 run 计时。
+
+    :param tdf: 工厂模块
+    :return: 用例字典
+    """
+    from framework_layer.core.db_helper import DBHelper
+
+    cases = {}
+    selector = tdf.TestDataFactorySelector()
+    for data_type in selector.builders:
+        def fresh(rows, data_type=data_type):
+            return tdf.TestDataFactorySelector().get_factory(data_type)
+
+        def objects(rows, data_type=data_type):
+            return fresh(rows).create_batch(rows)
+
+        def loader(rows, data_type=data_type):
+            return DBHelper(":memory:"), fresh(rows)
+
+        def bulk_load(state, rows, data_type=data_type):
+            db, factory = state
+            try:
+                db.bulk_load(data_type, factory.iter_batch(rows, chunk_size=50000, columnar=True, seed=0))
+            finally:
+                db.close()
+
+        cases[f"{data_type}.create"] = (fresh, lambda factory, rows: [factory.create() for _ in range(rows)])
+        cases[f"{data_type}.create_batch"] = (fresh, lambda factory, rows: factory.create_batch(rows))
+        cases[f"{data_type}.create_columns"] = (fresh, lambda factory, rows: factory.create_columns(rows, seed=0))
+        cases[f"{data_type}.to_dict"] = (objects, lambda records, rows: [r.to_dict() for r in records])
+        cases[f"{data_type}.db_bulk_load"] = (loader, bulk_load)
+
+    def related(rows):
+        # 订单关联已生成的用户、商品（实体池），与真实导数场景一致
+        factory = tdf.TestDataFactorySelector().get_factory("order")
+        factory.attach_pools(factory.user_factory.create_columns(max(rows // 10, 1), seed=1),
+                             factory.product_factory.create_columns(max(rows // 100, 1), seed=2), skew=1.0)
+        return factory
+
+    cases["order.related_batch"] = (related, lambda factory, rows: factory.create_batch(rows))
+    cases["order.related_columns"] = (related, lambda factory, rows: factory.create_columns(rows, seed=0))
+    return cases
+
+def _peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 计，macOS 以字节计
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+def _run_case(tdf, name: str, rows: int, repeat: int, alloc_rows: int, seed: int) -> Dict:
+    """在当前进程执行单个用例：先计时，再用 tracemalloc 统计分配"""
+    setup, run = build_cases(tdf)[name]
+    best = None
+    for _ in range(repeat):
+        random.seed(seed)
+        state = setup(rows)
+        gc.collect()
+        start = time.perf_counter()
+        result = run(state, rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del state, result
+    peak_rss = _peak_rss_mb()
+    alloc_bytes = alloc_blocks = None
+    if alloc_rows:
+        # 分配统计只在不超过 alloc_rows 的规模上做，再折算到每行
+        measured = min(rows, alloc_rows)
+        random.seed(seed)
+        state = setup(measured)
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        outputs = [run(state, measured)]
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # 生成结果仍由 outputs 持有，新增的内存块即结果常驻的对象数
+        alloc_blocks = round((sys.getallocatedblocks() - blocks) / measured, 2)
+        alloc_bytes = round(traced_peak / measured, 1)
+        outputs.clear()
+        del state
+    return {
+        "case": name,
+        "rows": rows,
+        "seconds": round(best, 4),
+        "rows_per_sec": round(rows / best, 1) if best else None,
+        "peak_rss_mb": peak_rss,
+        "alloc_bytes_per_row": alloc_bytes,
+        "live_blocks_per_row": alloc_blocks
+    }
+
+def _child(connection, factory_path, name, rows, repeat, alloc_rows, seed):
+    try:
+        connection.send(_run_case(load_factory_module(factory_path), name, rows, repeat, alloc_rows, seed))
+    except Exception as e:
+        connection.send({"case": name, "rows": rows, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        connection.close()
+
+def run_benchmarks(sizes: List[int] = (1000, 100000, 1000000), cases: Optional[List[str]] = None,
+                   repeat: int = 3, alloc_rows: int = 100000, seed: int = 0,
+                   factory_path: str = FACTORY_PATH) -> Dict:
+    """
+    执行基准测试。每个用例、每种规模在独立子进程中运行，峰值内存互不影响。
+
+    :param sizes: 数据规模列表
+    :param cases: 用例名或名称片段列表，默认全部
+    :param repeat: 每个用例重复次数，取最快一次
+    :param alloc_rows: 统计内存分配时的最大行数，0 表示不统计
+    :param seed: 随机种子
+    :param factory_path: 工厂模块文件路径
+    :return: 包含环境信息与各用例结果的字典
+    """
+    names = list(build_cases(load_factory_module(factory_path)))
+    if cases:
+        names = [n for n in names if any(c in n for c in cases)]
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for rows in sizes:
+        for name in names:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_child, args=(sender, factory_path, name, rows, repeat, alloc_rows, seed))
+            process.start()
+            sender.close()
+            result = receiver.recv()
+            process.join()
+            results.append(result)
+            if "error" in result:
+                print(f"{name} x {rows}: 失败 {result['error']}")
+            else:
+                print(f"{name} x {rows}: {result['rows_per_sec']:.0f} 行/秒, 峰值内存 {result['peak_rss_mb']} MB, "
+                      f"分配 {result['alloc_bytes_per_row']} 字节/行")
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "seed": seed
+        },
+        "results": results
+    }
+
+def save_results(report: Dict, path: str):
+    """保存基准结果为 JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def compare_with_baseline(report: Dict, baseline_path: str, tolerance: float = 0.1) -> List[Dict]:
+    """
+    与基线结果比较吞吐量。
+
+    :param report: 本次基准结果
+    :param baseline_path: 基线 JSON 文件路径
+    :param tolerance: 允许的吞吐量下降比例
+    :return: 比较结果列表，regression 为 True 表示吞吐量下降超过 tolerance
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["rows"]): r for r in json.load(f)["results"] if "error" not in r}
+    comparisons = []
+    for result in report["results"]:
+        previous = baseline.get((result["case"], result["rows"]))
+        if previous is None or "error" in result:
+            continue
+        ratio = result["rows_per_sec"] / previous["rows_per_sec"]
+        comparisons.append({
+            "case": result["case"],
+            "rows": result["rows"],
+            "baseline_rows_per_sec": previous["rows_per_sec"],
+            "rows_per_sec": result["rows_per_sec"],
+            "ratio": round(ratio, 3),
+            "regression": ratio < 1 - tolerance
+        })
+        flag = "退化" if ratio < 1 - tolerance else "正常"
+        print(f"{result['case']} x {result['rows']}: {ratio:.2f} 倍基线 [{flag}]")
+    return comparisons
+
+# 示例用法：python tests/performance/data_factory_perf.py --sizes 1000,100000 --output bench.json --baseline baseline.json
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    parser = argparse.ArgumentParser(description="测试数据工厂基准测试")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="数据规模，逗号分隔")
+    parser.add_argument("--cases", default="", help="用例名片段，逗号分隔，默认全部")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--alloc-rows", type=int, default=100000)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    report = run_benchmarks([int(s) for s in args.sizes.split(",")], [c for c in args.cases.split(",") if c],
+                            repeat=args.repeat, alloc_rows=args.alloc_rows)
+    save_results(report, args.output)
+    print("基准结果已保存：", args.output)
+    if args.baseline:
+        comparisons = compare_with_baseline(report, args.baseline, args.tolerance)
+        if report["results"] and any(c["regression"] for c in comparisons):
+            sys.exit(1)
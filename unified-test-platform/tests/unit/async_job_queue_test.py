@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from engine_layer.async_job_queue import AsyncJobQueue
+
+class TestAsyncJobQueue(unittest.TestCase):
+    """
+    异步作业队列测试。
+    """
+
+    def test_coroutine_jobs_respect_concurrency(self):
+        """协程作业并发执行，同时执行的数量不超过上限"""
+        active, peak = [0], [0]
+
+        async def job(x):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.05)
+            active[0] -= 1
+            return x * 2
+
+        queue = AsyncJobQueue(concurrency=50)
+        queue.start()
+        futures = queue.submit_many(job, range(200))
+        self.assertTrue(queue.wait_all(timeout=10))
+        queue.stop()
+        self.assertEqual([f.result() for f in futures], [x * 2 for x in range(200)])
+        self.assertEqual(peak[0], 50)
+
+    def test_sync_jobs_run_in_bounded_executor(self):
+        """同步作业在线程池中执行，不阻塞事件循环上的协程作业"""
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def blocking(x):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return x
+
+        async def quick():
+            return "ok"
+
+        queue = AsyncJobQueue(executor_workers=4)
+        queue.start()
+        slow = queue.submit_many(blocking, range(20))
+        fast = queue.add_job(quick)
+        self.assertEqual(fast.result(timeout=1), "ok")
+        self.assertFalse(all(f.done() for f in slow))
+        queue.stop()
+        self.assertEqual([f.result() for f in slow], list(range(20)))
+        self.assertLessEqual(peak[0], 4)
+
+    def test_exceptions_and_cancel_pending(self):
+        """作业异常在 Future 中重新抛出；停止时可取消未开始的作业"""
+        async def fail():
+            raise ValueError("boom")
+
+        queue = AsyncJobQueue(concurrency=1)
+        queue.start()
+        failed = queue.add_job(fail)
+        with self.assertRaises(ValueError):
+            failed.result(timeout=1)
+        first = queue.add_job(asyncio.sleep, 0.1)
+        pending = queue.submit_many(asyncio.sleep, [0.1] * 10)
+        queue.stop(cancel_pending=True)
+        self.assertTrue(first.done())
+        self.assertTrue(all(f.cancelled() for f in pending[1:]))
+
+if __name__ == "__main__":
+    unittest.main()
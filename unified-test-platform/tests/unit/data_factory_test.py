@@ -0,0 +1,522 @@
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+import unittest
+from array import array
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from tests.performance.data_factory_perf import load_factory_module
+
+# 多个测试文件共用同一份模块，保证类与注册表一致
+tdf = sys.modules.get("test_data_factory") or load_factory_module()
+
+def rows_per_second(run, rows: int, repeat: int = 3) -> float:
+    """多次运行取最快一次的吞吐（行/秒）"""
+    best = min(_elapsed(run) for _ in range(repeat))
+    return rows / best
+
+def _elapsed(run) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+class TestIdAllocators(unittest.TestCase):
+    """
+    ID 分配器测试：置换的双射性、分片互不重叠与分配进度。
+    """
+
+    def test_permutation_is_bijection(self):
+        """非 2 的幂的区间内（需要 cycle walking）分配出的 ID 恰好覆盖整个区间，逐个与批量分配一致"""
+        for low, high in ((500, 1500), (0, 1), (7, 8200), (10 ** 9, 10 ** 9 + 65536)):
+            with self.subTest(low=low, high=high):
+                allocator = tdf.PermutationIdAllocator(low, high, seed=3)
+                ids = allocator.reserve(high - low)
+                self.assertEqual(sorted(ids.tolist()), list(range(low, high)))
+                index = np.arange(0, high - low, max(1, (high - low) // 97))
+                single = tdf.PermutationIdAllocator(low, high, seed=3)
+                self.assertEqual([single._feistel_one(int(i)) for i in index],
+                                 single._feistel(index.astype(np.uint64)).tolist())
+                self.assertRaises(RuntimeError, allocator.allocate)
+
+    def test_permutation_cycle_walking(self):
+        """Feistel 输出超出容量时继续加密，逐个分配与向量化结果相同且都在区间内"""
+        allocator = tdf.PermutationIdAllocator(0, 1000, seed=5)
+        raw = allocator._feistel(np.arange(1000, dtype=np.uint64))
+        self.assertTrue((raw >= 1000).any())
+        vectorized = allocator.id_at(np.arange(1000))
+        self.assertEqual([allocator.allocate() for _ in range(1000)], vectorized.tolist())
+        self.assertNotEqual(vectorized.tolist(), list(range(1000)))
+        self.assertNotEqual(tdf.PermutationIdAllocator(0, 1000, seed=6).reserve(1000).tolist(), vectorized.tolist())
+
+    def test_shards_are_disjoint(self):
+        """各分片互不重叠，合起来恰好是底层分配器的全部 ID，分片容量按下标分摊"""
+        for base in (tdf.SequentialIdAllocator(start=100, capacity=1001), tdf.PermutationIdAllocator(100, 1101, seed=1)):
+            with self.subTest(base=type(base).__name__):
+                shards = [base.shard(i, 4) for i in range(4)]
+                self.assertEqual([shard.capacity for shard in shards], [251, 250, 250, 250])
+                values = [shard.reserve(shard.capacity) for shard in shards]
+                merged = np.concatenate(values).tolist()
+                self.assertEqual(len(set(merged)), 1001)
+                self.assertEqual(sorted(merged), sorted(base.id_at(np.arange(1001)).tolist()))
+                self.assertRaises(RuntimeError, shards[0].allocate)
+        with self.assertRaises(ValueError):
+            tdf.SequentialIdAllocator().shard(4, 4)
+
+    def test_claim_advance_and_pickle(self):
+        """批量预留与逐个分配共用进度，advance_to 不回退，序列化后进度保留"""
+        allocator = tdf.SequentialIdAllocator(start=10)
+        self.assertEqual(allocator.reserve(3).tolist(), [10, 11, 12])
+        self.assertEqual(allocator.allocate(), 13)
+        allocator.advance_to(100)
+        allocator.advance_to(50)
+        copy = pickle.loads(pickle.dumps(allocator))
+        self.assertEqual((copy.allocated, copy.allocate()), (100, 110))
+
+class TestDistributions(unittest.TestCase):
+    """
+    别名表与字段取值分布测试。
+    """
+
+    def assert_frequencies(self, samples, weights, tolerance=0.01):
+        weights = np.asarray(weights, dtype=np.float64)
+        counts = np.bincount(samples, minlength=len(weights))
+        np.testing.assert_allclose(counts / len(samples), weights / weights.sum(), atol=tolerance)
+
+    def test_alias_table_matches_weights(self):
+        """向量化与逐个抽样的频率都与权重成比例，权重为 0 的下标不会被抽到"""
+        weights = [5, 0, 1, 3, 0.5, 10]
+        table = tdf.AliasTable(weights)
+        samples = table.sample_indices(np.random.default_rng(0), 200000)
+        self.assert_frequencies(samples, weights)
+        self.assertNotIn(1, samples)
+        random.seed(0)
+        self.assert_frequencies([table.sample_one() for _ in range(100000)], weights)
+
+    def test_alias_table_rejects_invalid_weights(self):
+        """权重为空、为负或总和为 0 时报错"""
+        for weights in ([], [1, -1], [0, 0]):
+            with self.subTest(weights=weights):
+                self.assertRaises(ValueError, tdf.AliasTable, weights)
+        self.assertRaises(ValueError, tdf.WeightedChoice, ["a", "b"], [1])
+
+    def test_weighted_and_zipf_choice(self):
+        """按权重抽取取值；Zipf 分布第 r 个取值的概率与 1 / r^s 成比例"""
+        choice = tdf.WeightedChoice(["a", "b", "c"], [1, 0, 3])
+        values = choice.sample_batch(np.random.default_rng(1), 40000)
+        self.assertEqual(set(values.tolist()), {"a", "c"})
+        self.assertAlmostEqual(np.mean(values == "c"), 0.75, delta=0.01)
+        self.assertIn(choice.sample(), ("a", "c"))
+        zipf = tdf.ZipfDistribution(5, s=1.5)
+        self.assert_frequencies(zipf.sample_batch(np.random.default_rng(2), 200000), np.arange(1, 6) ** -1.5)
+
+    def test_normal_clip_and_precision(self):
+        """截断到给定区间，precision=0 时为整数"""
+        distribution = tdf.NormalDistribution(50, 30, low=0, high=100, precision=0)
+        values = distribution.sample_batch(np.random.default_rng(3), 10000)
+        self.assertEqual(values.dtype, np.int64)
+        self.assertTrue(((values >= 0) & (values <= 100)).all())
+        self.assertAlmostEqual(values.mean(), 50, delta=2)
+        self.assertIsInstance(distribution.sample(), int)
+        rounded = tdf.NormalDistribution(1, 1, precision=2).sample_batch(np.random.default_rng(0), 100)
+        self.assertEqual(rounded.tolist(), [round(v, 2) for v in np.random.default_rng(0).normal(1, 1, 100).tolist()])
+
+    def test_time_of_day(self):
+        """时间戳只落在有权重的小时内，不晚于参考时刻，日期在 days_back 天内"""
+        now = datetime(2024, 6, 1, 12, 30)
+        weights = [0] * 24
+        weights[9] = weights[20] = 1
+        distribution = tdf.TimeOfDayDistribution(weights, days_back=30, now=now)
+        values = distribution.sample_batch(np.random.default_rng(4), 5000).tolist()
+        values.append(distribution.sample())
+        # 晚于参考时刻的结果截断为参考时刻本身
+        self.assertTrue(all((v.hour in (9, 20) or v == now) and now - timedelta(days=31) < v <= now for v in values))
+        self.assertRaises(ValueError, tdf.TimeOfDayDistribution, [1] * 23)
+
+    def test_factory_uses_distributions(self):
+        """工厂字段分布覆盖默认随机规则，逐行与列式生成都生效"""
+        factory = tdf.ProductDataFactory(distributions={"category": tdf.WeightedChoice(["Books"], [1]),
+                                                        "price": tdf.NormalDistribution(10, 0)})
+        block = factory.create_columns(100, seed=0)
+        self.assertEqual(set(block.columns["category"].tolist()), {"Books"})
+        self.assertEqual(set(block.columns["price"].tolist()), {10.0})
+        self.assertEqual((factory.create().category, factory.create().price), ("Books", 10.0))
+
+class TestEntityPool(unittest.TestCase):
+    """
+    关联实体池抽样测试。
+    """
+
+    def test_samples_only_pool_ids(self):
+        """订单只引用池中的用户和商品，总额等于所引用商品的价格之和"""
+        users = tdf.UserDataFactory().create_columns(50, seed=0)
+        products = tdf.ProductDataFactory().create_columns(20, seed=0)
+        factory = tdf.OrderDataFactory(tdf.UserDataFactory(), tdf.ProductDataFactory())
+        factory.attach_pools(users, products.to_objects())
+        block = factory.create_columns(1000, seed=1)
+        self.assertTrue(np.isin(block.columns["user_id"], users.columns["user_id"]).all())
+        price = dict(zip(products.columns["product_id"].tolist(), products.columns["price"].tolist()))
+        for order in block.to_objects()[:100] + factory.create_batch(100):
+            self.assertAlmostEqual(order.total, sum(price[p] for p in order.products), places=6)
+
+    def test_skew_and_distribution(self):
+        """skew 越大越集中于池中靠前的实体，指定分布时按分布抽样"""
+        rng = np.random.default_rng(0)
+        uniform = tdf.EntityPool(np.arange(100)).sample_indices(rng, 50000)
+        skewed = tdf.EntityPool(np.arange(100), skew=3.0).sample_indices(rng, 50000)
+        self.assertAlmostEqual(np.mean(uniform < 10), 0.1, delta=0.01)
+        self.assertGreater(np.mean(skewed < 10), 0.5)
+        random.seed(0)
+        self.assertTrue(all(0 <= tdf.EntityPool(np.arange(100), skew=3.0).sample_one() < 100 for _ in range(1000)))
+        pool = tdf.EntityPool(np.arange(10), distribution=tdf.ZipfDistribution(10, s=2.0))
+        self.assertGreater(np.mean(pool.sample_indices(rng, 20000) == 0), 0.6)
+        self.assertRaises(ValueError, tdf.EntityPool, np.array([]))
+
+class TestColumnarModels(unittest.TestCase):
+    """
+    列式数据块、行视图与 __slots__ 数据模型测试。
+    """
+
+    FIXED = {
+        "user": {"is_active": True, "created_at": datetime(2024, 1, 1, 8)},
+        "product": {"price": 9.99, "category": "Books", "in_stock": False},
+        "order": {"user": tdf.UserData(7, "u", "u@example.com", True, datetime(2024, 1, 1)),
+                  "products": [tdf.ProductData(1, "p1", 1.5, "Books", True), tdf.ProductData(2, "p2", 2.25, "Home", True)],
+                  "status": "Pending"}
+    }
+
+    def test_columns_equal_batch(self):
+        """随机字段固定时，全新工厂的列式生成与逐行 create_batch 结果完全一致"""
+        for data_type, kwargs in self.FIXED.items():
+            with self.subTest(data_type=data_type):
+                rows = tdf.TestDataFactorySelector().get_factory(data_type).create_batch(50, **kwargs)
+                block = tdf.TestDataFactorySelector().get_factory(data_type).create_columns(50, seed=0, **kwargs)
+                self.assertEqual([r.to_dict() for r in block.to_objects()], [r.to_dict() for r in rows])
+                self.assertEqual([block[i].to_dict() for i in (0, -1)], [rows[0].to_dict(), rows[-1].to_dict()])
+
+    def test_random_columns_match_row_types(self):
+        """随机字段的 Python 类型与取值范围与逐行生成一致，同一种子可复现"""
+        for data_type in ("user", "product", "order"):
+            with self.subTest(data_type=data_type):
+                row = tdf.TestDataFactorySelector().get_factory(data_type).create().to_dict()
+                factory = tdf.TestDataFactorySelector().get_factory(data_type)
+                block = factory.create_columns(200, seed=9, now=datetime(2024, 1, 1)) if data_type == "user" \
+                    else factory.create_columns(200, seed=9)
+                objects = block.to_objects()
+                self.assertEqual({k: type(v) for k, v in objects[0].to_dict().items()}, {k: type(v) for k, v in row.items()})
+                again = tdf.TestDataFactorySelector().get_factory(data_type)
+                again = again.create_columns(200, seed=9, now=datetime(2024, 1, 1)) if data_type == "user" \
+                    else again.create_columns(200, seed=9)
+                self.assertEqual([o.to_dict() for o in again.to_objects()], [o.to_dict() for o in objects])
+        products = tdf.ProductDataFactory().create_columns(1000, seed=0)
+        self.assertTrue(((products.columns["price"] >= 5) & (products.columns["price"] <= 500)).all())
+        self.assertEqual(set(products.columns["category"].tolist()), set(tdf.ProductDataFactory.CATEGORIES))
+        created = tdf.UserDataFactory().create_columns(1000, seed=0, now=datetime(2024, 1, 1)).columns["created_at"]
+        self.assertTrue(((created <= np.datetime64("2024-01-01")) & (created >= np.datetime64("2022-12-31"))).all())
+
+    def test_slotted_models(self):
+        """数据模型没有 __dict__，不能添加未声明的属性，订单商品以 64 位整数数组存储"""
+        for model in (tdf.UserDataFactory().create(), tdf.ProductDataFactory().create(),
+                      tdf.TestDataFactorySelector().get_factory("order").create()):
+            with self.subTest(model=type(model).__name__):
+                self.assertFalse(hasattr(model, "__dict__"))
+                with self.assertRaises(AttributeError):
+                    model.extra = 1
+        order = tdf.OrderData(1, 2, [3, 4], 5.0, "Pending")
+        self.assertEqual((order.products.typecode, order.to_dict()["products"]), ("q", [3, 4]))
+        self.assertIsInstance(order.products, array)
+
+    def test_row_view_and_slice(self):
+        """行视图按需从列取值，与物化结果一致；切片不复制数值列，变长列偏移从 0 开始"""
+        block = tdf.TestDataFactorySelector().get_factory("order").create_columns(20, seed=0)
+        view = block.view(-1)
+        self.assertEqual(view.to_dict(), block[19].to_dict())
+        self.assertEqual((view.order_id, view.products), (block[19].order_id, block[19].products.tolist()))
+        with self.assertRaises(AttributeError):
+            view.missing
+        self.assertRaises(IndexError, block.view, 20)
+        self.assertEqual([v.order_id for v in block.views()], block.columns["order_id"].tolist())
+        part = block.slice(5, 10)
+        self.assertTrue(np.shares_memory(part.columns["order_id"], block.columns["order_id"]))
+        self.assertEqual(part.columns["products"].offsets[0], 0)
+        self.assertEqual([o.to_dict() for o in part], [o.to_dict() for o in block.to_objects()[5:10]])
+        rebuilt = tdf.ColumnBlock.from_objects(tdf.OrderData, block.to_objects())
+        self.assertEqual(rebuilt.columns["products"].tolist(), block.columns["products"].tolist())
+        self.assertEqual(block.nbytes, sum(c.nbytes for n, c in block.columns.items() if n != "products")
+                         + block.columns["products"].values.nbytes + block.columns["products"].offsets.nbytes)
+
+class TestStreaming(unittest.TestCase):
+    """
+    流式生成与多进程分片生成测试。
+    """
+
+    def test_iter_batch_chunks(self):
+        """按 chunk_size 分块产出，ID 跨块连续；列式模式同一种子可复现"""
+        factory = tdf.UserDataFactory()
+        chunks = list(factory.iter_batch(2500, chunk_size=1000))
+        self.assertEqual([len(c) for c in chunks], [1000, 1000, 500])
+        self.assertEqual([u.user_id for c in chunks for u in c], list(range(1000, 3500)))
+        now = datetime(2024, 1, 1)
+        first = [b.to_objects() for b in tdf.UserDataFactory().iter_batch(250, 100, columnar=True, seed=1, now=now)]
+        second = list(tdf.TestDataFactorySelector().iter_batch("user", 250, 100, columnar=True, seed=1, now=now))
+        self.assertEqual([len(b) for b in second], [100, 100, 50])
+        self.assertEqual([u.to_dict() for b in first for u in b], [u.to_dict() for b in second for u in b])
+        with self.assertRaises(ValueError):
+            next(factory.iter_batch(10, chunk_size=0))
+
+    def test_parallel_output_independent_of_workers(self):
+        """输出只取决于种子和分片大小，与工作进程数无关；主键在各分片间不重复"""
+        now = datetime(2024, 1, 1)
+        results = []
+        for workers in (1, 2):
+            generator = tdf.ParallelDataGenerator(tdf.TestDataFactorySelector(), workers=workers, shard_size=700)
+            results.append(list(generator.generate("user", 2000, seed=4, now=now)))
+        self.assertEqual([len(b) for b in results[1]], [700, 700, 600])
+        for field in ("user_id", "username", "is_active", "created_at"):
+            merged = [np.concatenate([b.columns[field] for b in blocks]) for blocks in results]
+            np.testing.assert_array_equal(merged[0], merged[1])
+        user_id = np.concatenate([b.columns["user_id"] for b in results[0]])
+        self.assertEqual(len(np.unique(user_id)), 2000)
+        self.assertNotEqual(results[0][0].columns["is_active"].tolist(), results[0][1].columns["is_active"][:700].tolist())
+
+class TestUniqueStrings(unittest.TestCase):
+    """
+    不重复字符串生成测试。
+    """
+
+    def test_value_at_matches_format_one(self):
+        """批量还原与逐个格式化的结果一致，后缀不影响唯一性"""
+        generator = tdf.UniqueStringGenerator([["a", "bb", "ccc"], ["x", "yy"]], digits=4, separator="-")
+        index = np.arange(0, generator.capacity, 997)
+        values = generator.value_at(index, suffix="@t")
+        self.assertEqual(values.tolist(), [generator.format_one(int(i), "@t") for i in index])
+        self.assertEqual(len(np.unique(generator.batch(5000))), 5000)
+
+    def test_email_derived_from_username(self):
+        """列式生成的邮箱由用户名派生"""
+        block = tdf.UserDataFactory().create_columns(1000, seed=0)
+        usernames = block.columns["username"].tolist()
+        self.assertEqual(block.columns["email"].tolist(), [u + "@example.com" for u in usernames])
+        self.assertEqual(len(set(usernames)), 1000)
+
+    def test_columnar_throughput(self):
+        """列式生成用户、商品、订单的吞吐至少是逐行 create_batch 的 20 倍"""
+        for data_type in ("user", "product", "order"):
+            factory = tdf.TestDataFactorySelector().get_factory(data_type)
+            columnar = rows_per_second(lambda: factory.create_columns(200000, seed=0), 200000)
+            rows = rows_per_second(lambda: factory.create_batch(10000), 10000, repeat=1)
+            self.assertGreater(columnar / rows, 20, data_type)
+
+class TestCompiledFactory(unittest.TestCase):
+    """
+    声明式实体编译测试。
+    """
+
+    def setUp(self):
+        self.selector = tdf.TestDataFactorySelector()
+        tdf.SchemaCompiler(self.selector).register({"entity": "coupon", "fields": {
+            "coupon_id": {"type": "id"},
+            "code": {"type": "string", "prefix": "C", "digits": 8, "unique": True},
+            "serial": {"type": "int", "min": 0, "max": 10 ** 9, "unique": True},
+            "email": {"type": "format", "template": "{code}@example.com"}
+        }})
+        self.factory = self.selector.get_factory("coupon")
+
+    def test_unique_fields_disjoint_across_shards(self):
+        """多进程分片生成时唯一字段由父进程按分片预留，各分片取值不重复"""
+        generator = tdf.ParallelDataGenerator(self.selector, workers=3, shard_size=1000)
+        blocks = list(generator.generate("coupon", 3000, seed=1))
+        for field in ("coupon_id", "code", "serial"):
+            values = np.concatenate([block.columns[field] for block in blocks])
+            self.assertEqual(len(np.unique(values)), 3000, field)
+        self.assertEqual(blocks[2][0].email, blocks[2][0].code + "@example.com")
+
+    def test_pickle_round_trip(self):
+        """序列化后重新编译，分配进度保留，生成结果一致"""
+        self.factory.create_columns(10, seed=0)
+        copy = pickle.loads(pickle.dumps(self.factory))
+        self.assertEqual(sorted(copy.unique_generators), ["code"])
+        self.assertEqual(copy.id_allocator.allocated, 10)
+        self.assertEqual(copy.create_columns(5, seed=3).columns["code"].tolist(),
+                         self.factory.create_columns(5, seed=3).columns["code"].tolist())
+
+    def test_model_not_exported_to_module(self):
+        """编译出的模型不挂到模块上、不覆盖同名类，数据块与对象序列化后取回同一个类"""
+        factory = tdf.SchemaCompiler(self.selector).compile({"entity": "user", "fields": {"user_id": {"type": "id"}}})
+        self.assertIsNot(factory.model, tdf.UserData)
+        self.assertEqual(tdf.UserData.__slots__, ("user_id", "username", "email", "is_active", "created_at"))
+        self.assertFalse(hasattr(tdf, "CouponData"))
+        block = factory.create_columns(3, seed=0)
+        self.assertIs(pickle.loads(pickle.dumps(block)).model, factory.model)
+        row = pickle.loads(pickle.dumps(block[1]))
+        self.assertIs(type(row), factory.model)
+        self.assertEqual(row.user_id, block[1].user_id)
+
+class TestFixtureCache(unittest.TestCase):
+    """
+    夹具缓存寻址与分配器推进测试。
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def cache(self) -> "tdf.FixtureCache":
+        return tdf.FixtureCache(self.tmp.name, tdf.TestDataFactorySelector())
+
+    def test_same_key_same_content(self):
+        """相同参数在不同进程（新的选择器）中得到相同数据，随机时间也一致"""
+        first = self.cache().get_or_create("user", 100, seed=1)
+        second = self.cache().get_or_create("user", 100, seed=1)
+        for field in ("user_id", "username", "created_at"):
+            self.assertEqual(first.columns[field].tolist(), second.columns[field].tolist())
+
+    def test_key_depends_on_allocator_position(self):
+        """分配器位置不同时不共用缓存，命中后分配器越过缓存数据占用的 ID"""
+        cache = self.cache()
+        block = cache.get_or_create("product", 50)
+        factory = cache.selector.get_factory("product")
+        self.assertEqual(factory.create().product_id, 10050)
+        other = self.cache()
+        other.selector.get_factory("product").create_batch(3)
+        self.assertEqual(int(other.get_or_create("product", 50).columns["product_id"][0]), 10003)
+        hit = self.cache()
+        self.assertEqual(hit.get_or_create("product", 50).columns["name"].tolist(), block.columns["name"].tolist())
+        product = hit.selector.get_factory("product").create()
+        self.assertEqual(product.product_id, 10050)
+        self.assertNotIn(product.name, block.columns["name"].tolist())
+
+    def test_array_kwargs_hashed_by_content(self):
+        """数组参数按全部内容计入缓存键，只有被 repr 省略的元素不同时也不会命中错误的数据；无法表示的参数报错"""
+        cache = self.cache()
+        flags = np.zeros(5000, dtype=bool)
+        changed = flags.copy()
+        changed[2500] = True
+        self.assertEqual(repr(flags), repr(changed))
+        self.assertNotEqual(cache.key("user", 5000, 0, is_active=flags), cache.key("user", 5000, 0, is_active=changed))
+        self.assertEqual(cache.key("user", 5000, 0, is_active=flags), cache.key("user", 5000, 0, is_active=flags.copy()))
+        block = cache.get_or_create("user", 5000, 0, is_active=changed)
+        self.assertTrue(block.columns["is_active"][2500])
+        with self.assertRaises(TypeError):
+            cache.key("user", 10, 0, is_active=object())
+
+    def test_order_key_includes_related_allocators(self):
+        """订单的缓存键取决于用户、商品分配器的位置，命中后同样推进关联分配器"""
+        cache = self.cache()
+        block = cache.get_or_create("order", 100)
+        other = self.cache()
+        other.selector.get_factory("user").create_batch(1)
+        self.assertNotEqual(other.key("order", 100, 0), self.cache().key("order", 100, 0))
+        hit = self.cache()
+        self.assertEqual(hit.get_or_create("order", 100).columns["user_id"].tolist(), block.columns["user_id"].tolist())
+        self.assertEqual(hit.selector.get_factory("user").create().user_id, 1100)
+        self.assertGreater(hit.selector.get_factory("product").create().product_id,
+                           int(block.columns["products"].values.max()))
+
+class TestOrderColumns(unittest.TestCase):
+    """
+    订单列式生成的关联数据测试。
+    """
+
+    def test_related_entities_without_pools(self):
+        """没有实体池时只从用户、商品工厂的分配器取 ID，不生成关联实体；每个订单占用固定数量的商品 ID"""
+        selector = tdf.TestDataFactorySelector()
+        users, products = selector.get_factory("user"), selector.get_factory("product")
+        block = selector.get_factory("order").create_columns(100, seed=0)
+        self.assertEqual(block.columns["user_id"].tolist(), list(range(1000, 1100)))
+        self.assertEqual(users.id_allocator.allocated, 100)
+        self.assertEqual(users.username_generator.allocator.allocated, 0)
+        self.assertEqual(products.id_allocator.allocated, 100 * tdf.OrderDataFactory.MAX_ITEMS)
+        self.assertEqual(products.name_generator.allocator.allocated, 0)
+        for i, items in enumerate(block.columns["products"].tolist()):
+            start = 10000 + i * tdf.OrderDataFactory.MAX_ITEMS
+            self.assertEqual(items, list(range(start, start + len(items))))
+        self.assertTrue(np.all((block.columns["total"] >= 5) & (block.columns["total"] <= 2500)))
+
+    def test_parallel_orders_independent_of_workers(self):
+        """多进程生成订单时关联 ID 也在父进程按分片预留，结果与工作进程数无关且各分片不重复"""
+        results = []
+        for workers in (1, 4):
+            generator = tdf.ParallelDataGenerator(tdf.TestDataFactorySelector(), workers=workers, shard_size=1000)
+            results.append(list(generator.generate("order", 4000, seed=1)))
+        for field in ("order_id", "user_id", "total", "status"):
+            merged = [np.concatenate([b.columns[field] for b in blocks]) for blocks in results]
+            np.testing.assert_array_equal(merged[0], merged[1], field)
+        items = [np.concatenate([b.columns["products"].values for b in blocks]) for blocks in results]
+        np.testing.assert_array_equal(items[0], items[1])
+        self.assertEqual(len(np.unique(items[0])), len(items[0]))
+        self.assertEqual(len(np.unique(np.concatenate([b.columns["user_id"] for b in results[0]]))), 4000)
+
+class TestDeltaGenerator(unittest.TestCase):
+    """
+    数据集清单与增量变更流测试。
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "dataset.json")
+        self.generator = tdf.DeltaGenerator(tdf.DatasetManifest(self.path))
+        blocks = list(self.generator.generate_base("order", 3000, seed=1, chunk_size=1000))
+        self.base = {field: np.concatenate([b.columns[field] for b in blocks]) for field in ("order_id", "status")}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def reopen(self) -> "tdf.DeltaGenerator":
+        """模拟新进程：重新读取清单，使用新的选择器"""
+        return tdf.DeltaGenerator(tdf.DatasetManifest(self.path))
+
+    def state(self, version: int) -> np.ndarray:
+        return np.fromfile(self.generator.manifest.state_path("order", "status", version), dtype=np.uint8)
+
+    def test_base_manifest_and_ids(self):
+        """基础数据集写入清单，按清单还原的主键与生成的一致"""
+        generator = self.reopen()
+        entity = generator.manifest.entities["order"]
+        self.assertEqual((entity["rows"], entity["version"]), (3000, 0))
+        self.assertEqual(generator.ids("order").tolist(), self.base["order_id"].tolist())
+        domain = np.array(entity["state"]["status"]["domain"])
+        self.assertEqual(domain[self.state(0)].tolist(), self.base["status"].tolist())
+
+    def test_delta_commits_after_full_consumption(self):
+        """完整消费后提交新版本：状态迁移只选非终态行，新增行的主键续接已有区间"""
+        changes = list(self.generator.generate_delta("order", append=200, mutate={"status": 500}))
+        self.assertEqual([(c.op, len(c)) for c in changes], [("update", 500), ("insert", 200)])
+        terminal = {"Delivered", "Cancelled"}
+        previous = dict(zip(self.base["order_id"].tolist(), self.base["status"].tolist()))
+        update = changes[0].columns
+        for key, status in zip(update["order_id"].tolist(), update["status"].tolist()):
+            self.assertNotIn(previous[key], terminal)
+            self.assertIn(status, tdf.OrderDataFactory.TRANSITIONS["status"][previous[key]])
+        inserted = changes[1].columns["order_id"]
+        self.assertFalse(np.isin(inserted, self.base["order_id"]).any())
+        generator = self.reopen()
+        entity = generator.manifest.entities["order"]
+        self.assertEqual((entity["rows"], entity["version"]), (3200, 1))
+        self.assertEqual(len(generator.ids("order")), 3200)
+        self.assertFalse(os.path.exists(self.generator.manifest.state_path("order", "status", 0)))
+        self.assertEqual(len(self.state(1)), 3200)
+
+    def test_partial_consumption_keeps_previous_version(self):
+        """只消费部分变更流就停止时，清单与状态文件不变，重新生成得到相同的变更"""
+        before = self.state(0)
+        stream = self.generator.generate_delta("order", append=200, mutate={"status": 500}, chunk_size=100)
+        first = next(stream)
+        next(stream)
+        stream.close()
+        self.assertEqual(self.generator.manifest.entities["order"]["version"], 0)
+        self.assertEqual(self.reopen().manifest.entities["order"]["rows"], 3000)
+        self.assertEqual(self.state(0).tolist(), before.tolist())
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["dataset.json", "dataset.order.status.v0.state"])
+        retried = list(self.reopen().generate_delta("order", append=200, mutate={"status": 500}, chunk_size=100))
+        self.assertEqual(retried[0].columns["order_id"].tolist(), first.columns["order_id"].tolist())
+        self.assertEqual(retried[0].columns["status"].tolist(), first.columns["status"].tolist())
+
+if __name__ == "__main__":
+    unittest.main()
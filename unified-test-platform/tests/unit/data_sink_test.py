@@ -0,0 +1,225 @@
+import csv
+import gc
+import io
+import json
+import os
+import tempfile
+import unittest
+import warnings
+from datetime import datetime
+
+import numpy as np
+
+from framework_layer.core.data_sink import open_input, open_sink, read_columnar
+
+COMPRESSIONS = [None, "gzip", "bz2", "xz"]
+
+class Ragged:
+    """测试用变长列：扁平值数组 + 偏移数组"""
+
+    def __init__(self, values, offsets):
+        self.values = np.asarray(values)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    def tolist(self):
+        values = self.values.tolist()
+        return [values[start:stop] for start, stop in zip(self.offsets[:-1], self.offsets[1:])]
+
+class Block:
+    """测试用列式数据块"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+class Record:
+    """测试用数据模型"""
+    __slots__ = ("record_id", "name", "score", "created_at")
+
+    def __init__(self, record_id, name, score, created_at):
+        self.record_id = record_id
+        self.name = name
+        self.score = score
+        self.created_at = created_at
+
+def _block():
+    return Block({
+        "record_id": np.arange(4, dtype=np.int64),
+        "name": np.array(["a", "b\"", "中文", ""]),
+        "score": np.array([0.5, np.nan, np.inf, -1.0]),
+        "active": np.array([True, False, True, False]),
+        "created_at": np.array(["2024-01-01T00:00:00", "2024-01-01T00:00:01", "2024-01-01T00:00:01",
+                                "2024-01-02T12:30:00"], dtype="datetime64[us]"),
+        "tags": Ragged([1, 2, 3, 4], [0, 2, 2, 3, 4])
+    })
+
+def _edge_block(rows=3000):
+    """覆盖各类边界值的数据块：极值整数、各种量级的浮点数、需转义的字符串、整秒与带微秒的时间、空的变长行"""
+    rng = np.random.default_rng(0)
+    floats = np.concatenate([rng.uniform(0, 2000, rows // 3).round(2),
+                             rng.standard_normal(rows // 3) * 10.0 ** rng.integers(-30, 30, rows // 3),
+                             rng.integers(-10 ** 6, 10 ** 6, rows - rows // 3 * 2) / 8.0])
+    floats[:9] = [0.0, -0.0, np.nan, np.inf, -np.inf, 1e16, 9999999999999998.0, 1e-4, 5e-324]
+    ints = rng.integers(-2 ** 63, 2 ** 63 - 1, rows, dtype=np.int64, endpoint=True)
+    ints[:3] = [-2 ** 63, 0, 2 ** 63 - 1]
+    alphabet = list('ab, ;"\\\n\r\t\x01é中😀') + ["xyz"] * 8
+    created = np.datetime64("2024-01-01T00:00:00", "us") + rng.integers(0, 10 ** 12, rows).astype("timedelta64[us]")
+    created[::3] = created[::3].astype("datetime64[s]")
+    offsets = np.concatenate([[0], np.cumsum(rng.integers(0, 6, rows))])
+    prices = rng.integers(-10 ** 5, 10 ** 5, offsets[-1]) / 100
+    prices[::7] = np.nan
+    return Block({
+        "record_id": ints,
+        "count": rng.integers(0, 2 ** 64 - 1, rows, dtype=np.uint64, endpoint=True),
+        "score": floats,
+        "name": np.array(["".join(rng.choice(alphabet, rng.integers(0, 6))) for _ in range(rows)]),
+        "active": rng.random(rows) < 0.5,
+        "created_at": created,
+        "tags": Ragged(rng.integers(-10 ** 9, 10 ** 9, offsets[-1]), offsets),
+        "prices": Ragged(prices, offsets)
+    })
+
+def _edge_rows(block):
+    """按行取出数据块的 Python 值（NaN、无穷为 None，时间为 isoformat 文本）"""
+    def finite(v):
+        return None if isinstance(v, float) and not np.isfinite(v) else v
+    columns = block.columns
+    return [dict(zip(columns, row)) for row in zip(
+        columns["record_id"].tolist(), columns["count"].tolist(), map(finite, columns["score"].tolist()),
+        columns["name"].tolist(), columns["active"].tolist(), [v.isoformat() for v in columns["created_at"].tolist()],
+        columns["tags"].tolist(), [[finite(v) for v in row] for row in columns["prices"].tolist()])]
+
+class TestDataSink(unittest.TestCase):
+    """
+    JSONL、CSV、二进制列式写入器的读回测试（含各种压缩方式）。
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def read_text(self, path, compression):
+        with open_input(path, compression) as stream:
+            return stream.read().decode("utf-8")
+
+    def test_jsonl_round_trip(self):
+        """每行都是合法 JSON（NaN、无穷写为 null），读回与写入一致"""
+        for compression in COMPRESSIONS:
+            with self.subTest(compression=compression):
+                path = self.path(f"data.jsonl.{compression}")
+                with open_sink(path, "jsonl", compression=compression) as sink:
+                    sink.write(_block())
+                    sink.write([])
+                lines = self.read_text(path, compression).splitlines()
+                rows = [json.loads(line, parse_constant=self.fail) for line in lines]
+                self.assertEqual(sink.rows_written, 4)
+                self.assertEqual([r["score"] for r in rows], [0.5, None, None, -1.0])
+                self.assertEqual(rows[1], {"record_id": 1, "name": "b\"", "score": None, "active": False,
+                                           "created_at": "2024-01-01T00:00:01", "tags": []})
+                self.assertEqual([r["tags"] for r in rows], [[1, 2], [], [3], [4]])
+                self.assertEqual(rows[2]["name"], "中文")
+
+    def test_jsonl_objects_with_nan(self):
+        """对象列表中的 NaN 同样写为 null"""
+        path = self.path("records.jsonl")
+        with open_sink(path, "jsonl") as sink:
+            sink.write([Record(1, "a", float("nan"), datetime(2024, 1, 1)), Record(2, "b", 2.5, datetime(2024, 1, 2))])
+        rows = [json.loads(line, parse_constant=self.fail) for line in self.read_text(path, None).splitlines()]
+        self.assertEqual(rows, [{"record_id": 1, "name": "a", "score": None, "created_at": "2024-01-01T00:00:00"},
+                                {"record_id": 2, "name": "b", "score": 2.5, "created_at": "2024-01-02T00:00:00"}])
+
+    def test_jsonl_matches_json_dumps(self):
+        """整列格式化的结果与逐行 json.dumps 逐字节一致（浮点数与 repr 相同，时间与 isoformat 相同）"""
+        block = _edge_block()
+        path = self.path("edge.jsonl")
+        with open_sink(path, "jsonl") as sink:
+            sink.write(block)
+        expected = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in _edge_rows(block))
+        self.assertEqual(self.read_text(path, None), expected)
+
+    def test_csv_matches_csv_module(self):
+        """整列格式化的结果与 csv 模块逐行写出的文本逐字节一致（含引号规则）"""
+        block = _edge_block()
+        for delimiter in [",", ";", "\t"]:
+            with self.subTest(delimiter=delimiter):
+                path = self.path("edge.csv")
+                with open_sink(path, "csv", delimiter=delimiter) as sink:
+                    sink.write(block)
+                expected = io.StringIO()
+                writer = csv.writer(expected, delimiter=delimiter, lineterminator="\n")
+                writer.writerow(list(block.columns))
+                for row, score in zip(_edge_rows(block), block.columns["score"].tolist()):
+                    writer.writerow([row["record_id"], row["count"], repr(score), row["name"],
+                                     "true" if row["active"] else "false", row["created_at"],
+                                     json.dumps(row["tags"]), json.dumps(row["prices"])])
+                self.assertEqual(self.read_text(path, None), expected.getvalue())
+
+    def test_csv_single_column_and_nul(self):
+        """单列 CSV 的空值写为 ""，读回不丢行；含 NUL 字符的字段报错"""
+        path = self.path("single.csv")
+        with open_sink(path, "csv") as sink:
+            sink.write(Block({"name": np.array(["", "a", ""])}))
+        self.assertEqual(self.read_text(path, None), 'name\n""\na\n""\n')
+        with open_sink(path, "csv") as sink:
+            with self.assertRaises(ValueError):
+                sink.write(Block({"name": np.array(["a\x00b"])}))
+        with self.assertRaises(ValueError):
+            open_sink(self.path("bad.csv"), "csv", delimiter="；")
+
+    def test_csv_round_trip(self):
+        """首行为表头，布尔值为 true/false，变长列为 JSON 数组"""
+        for compression in COMPRESSIONS:
+            with self.subTest(compression=compression):
+                path = self.path(f"data.csv.{compression}")
+                with open_sink(path, "csv", compression=compression) as sink:
+                    sink.write(_block())
+                    sink.write(_block())
+                rows = list(csv.reader(io.StringIO(self.read_text(path, compression))))
+                self.assertEqual(rows[0], ["record_id", "name", "score", "active", "created_at", "tags"])
+                self.assertEqual(len(rows), 9)
+                self.assertEqual(rows[2], ["1", "b\"", "nan", "false", "2024-01-01T00:00:01", "[]"])
+                self.assertEqual(rows[1][5], "[1, 2]")
+
+    def test_columnar_round_trip(self):
+        """列式文件按块读回，数组与写入时完全一致"""
+        for compression in COMPRESSIONS:
+            with self.subTest(compression=compression):
+                path = self.path(f"data.col.{compression}")
+                block = _block()
+                with open_sink(path, "columnar", compression=compression) as sink:
+                    sink.write(block)
+                    sink.write(block)
+                blocks = list(read_columnar(path, compression))
+                self.assertEqual(len(blocks), 2)
+                for name, column in block.columns.items():
+                    if isinstance(column, Ragged):
+                        values, offsets = blocks[1][name]
+                        np.testing.assert_array_equal(values, column.values)
+                        np.testing.assert_array_equal(offsets, column.offsets)
+                    else:
+                        np.testing.assert_array_equal(blocks[1][name], column)
+
+    def test_close_releases_file(self):
+        """关闭写入器和读取流时一并关闭底层文件，不依赖垃圾回收（不产生 ResourceWarning）"""
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ResourceWarning)
+            for compression in COMPRESSIONS:
+                path = self.path(f"leak.{compression}")
+                with open_sink(path, "jsonl", compression=compression) as sink:
+                    sink.write(_block())
+                self.read_text(path, compression)
+                gc.collect()
+        self.assertEqual([w for w in caught if issubclass(w.category, ResourceWarning)], [])
+
+    def test_unknown_compression(self):
+        """不支持的压缩方式报错，且不创建文件"""
+        with self.assertRaises(ValueError):
+            open_sink(self.path("bad.jsonl"), "jsonl", compression="zip")
+        self.assertFalse(os.path.exists(self.path("bad.jsonl")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from framework_layer.core.db_helper import DBHelper
+
+class Record:
+    """测试用数据模型"""
+    __slots__ = ("record_id", "name", "tags")
+
+    def __init__(self, record_id, name, tags):
+        self.record_id = record_id
+        self.name = name
+        self.tags = tags
+
+class TestBulkLoad(unittest.TestCase):
+    """
+    DBHelper 批量导入测试。
+    """
+
+    def setUp(self):
+        self.db = DBHelper(":memory:")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_bulk_load_creates_table_and_commits(self):
+        """按数据字段建表，分多个事务导入全部数据"""
+        batches = ([Record(i, f"r{i}", [i, i + 1]) for i in range(start, start + 10)] for start in range(0, 35, 10))
+        stats = self.db.bulk_load("records", batches, primary_key="record_id", commit_every=15)
+        self.assertEqual(stats["rows"], 40)
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) AS n FROM records")["n"], 40)
+        self.assertEqual(self.db.query_one("SELECT * FROM records WHERE record_id = 3"),
+                         {"record_id": 3, "name": "r3", "tags": "[3, 4]"})
+
+    def test_bulk_load_columnar_block_silently(self):
+        """列式数据块（含变长列、时间列）直接导入；统计信息只通过返回值提供，不打印"""
+
+        class Ragged:
+            values = np.array([1, 2, 3])
+            offsets = np.array([0, 2, 2, 3])
+
+            def tolist(self):
+                return [[1, 2], [], [3]]
+
+        class Block:
+            columns = {"record_id": np.arange(3), "tags": Ragged(),
+                       "created_at": np.array(["2024-01-01", "2024-01-02", "2024-01-03"], dtype="datetime64[us]")}
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            stats = self.db.bulk_load("blocks", [Block()], primary_key="record_id")
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(stats["rows"], 3)
+        self.assertEqual(self.db.query_one("SELECT * FROM blocks WHERE record_id = 0"),
+                         {"record_id": 0, "tags": "[1, 2]", "created_at": "2024-01-01T00:00:00.000000"})
+
+    def test_bulk_load_with_column_map(self):
+        """字段映射到已有表的列"""
+        self.db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, title TEXT, tags TEXT)")
+        self.db.bulk_load("items", [[Record(1, "a", [])]], create_table=False,
+                          column_map={"record_id": "id", "name": "title"})
+        self.assertEqual(self.db.query("SELECT id, title FROM items"), [{"id": 1, "title": "a"}])
+
+    def test_bulk_load_rolls_back_on_error(self):
+        """主键冲突时回滚未提交的数据"""
+        with self.assertRaises(Exception):
+            self.db.bulk_load("records", [[Record(1, "a", []), Record(1, "b", [])]], primary_key="record_id")
+        self.assertEqual(self.db.query_one("SELECT COUNT(*) AS n FROM records")["n"], 0)
+
+    def test_bulk_load_upsert_partial_columns(self):
+        """按主键 upsert：只含部分字段的数据块只更新这些字段"""
+        self.db.bulk_load("records", [[Record(1, "a", [1]), Record(2, "b", [2])]], primary_key="record_id")
+
+        class Change:
+            __slots__ = ("record_id", "name")
+
+            def __init__(self, record_id, name):
+                self.record_id = record_id
+                self.name = name
+
+        self.db.bulk_load("records", [[Change(2, "b2"), Change(3, "c")]], upsert_key="record_id")
+        self.assertEqual(self.db.query("SELECT * FROM records ORDER BY record_id"), [
+            {"record_id": 1, "name": "a", "tags": "[1]"},
+            {"record_id": 2, "name": "b2", "tags": "[2]"},
+            {"record_id": 3, "name": "c", "tags": None}])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+from engine_layer.durable_job_queue import DurableJobQueue, SqliteJobStore
+
+def fail(message):
+    raise ValueError(message)
+
+class TestSqliteJobStore(unittest.TestCase):
+    """
+    持久化作业存储的租约与重投测试。
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "jobs.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lease_expires_and_redelivers(self):
+        """租约到期未确认的作业重新投递，超过最大投递次数后标记失败"""
+        store = SqliteJobStore(self.db_path, visibility_timeout=0.05, max_attempts=2)
+        job_id = store.enqueue([(pickle.dumps((pow, (2, 3), {})), 1)])[0]
+        self.assertEqual([row[0] for row in store.lease(10)], [job_id])
+        self.assertEqual(store.lease(10), [])
+        time.sleep(0.1)
+        self.assertEqual([row[0] for row in store.lease(10)], [job_id])
+        time.sleep(0.1)
+        self.assertEqual(store.lease(10), [])
+        self.assertEqual(store.result(job_id)[0], "failed")
+        store.close()
+
+    def test_ack_ignores_lost_lease(self):
+        """租约已被其他消费者接管时，旧消费者的确认无效"""
+        first = SqliteJobStore(self.db_path, visibility_timeout=0.05)
+        second = SqliteJobStore(self.db_path, visibility_timeout=60)
+        job_id = first.enqueue([(b"x", 1)])[0]
+        first.lease(1)
+        time.sleep(0.1)
+        second.lease(1)
+        first.ack([(job_id, True, pickle.dumps("stale"))])
+        self.assertEqual(first.result(job_id), ("leased", None))
+        second.ack([(job_id, True, pickle.dumps("fresh"))])
+        self.assertEqual(first.result(job_id), ("done", "fresh"))
+        first.close()
+        second.close()
+
+class TestDurableJobQueue(unittest.TestCase):
+    """
+    持久化作业队列测试。
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "jobs.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_results_are_persisted(self):
+        """作业结果与异常写入数据库，队列关闭后仍可查询"""
+        queue = DurableJobQueue(self.db_path, worker_num=2, batch_size=10)
+        ids = queue.submit_many(pow, [(i, 2) for i in range(50)])
+        bad = queue.add_job(fail, "boom")
+        queue.start()
+        self.assertTrue(queue.wait_all(timeout=10))
+        queue.stop()
+        store = SqliteJobStore(self.db_path)
+        self.assertEqual([store.result(job_id)[1] for job_id in ids], [i * i for i in range(50)])
+        self.assertEqual(store.result(bad), ("failed", "ValueError: boom"))
+        store.close()
+
+    def test_recovers_jobs_of_crashed_consumer(self):
+        """消费者取出作业后崩溃，重启的队列重投这些作业"""
+        crashed = SqliteJobStore(self.db_path)
+        ids = crashed.enqueue([(pickle.dumps((pow, (i, 2), {})), 1) for i in range(5)])
+        crashed.lease(3)
+        self.assertEqual(crashed.requeue_leased(crashed.owner), 3)
+        crashed.close()
+        queue = DurableJobQueue(self.db_path, worker_num=2)
+        queue.start()
+        self.assertTrue(queue.wait_all(timeout=10))
+        self.assertEqual([queue.result(job_id) for job_id in ids], [("done", i * i) for i in range(5)])
+        queue.stop()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from auxiliary_layer.dynamic_scanner import ClassIndex
+
+class TestClassIndex(unittest.TestCase):
+    """
+    ClassIndex 索引与延迟加载测试。
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.write("plugin_base.py", "class Base(Factory):\n    data_type = 'base'\n")
+        self.write("plugin_child.py", "class Child(Base):\n    depends_on = ('base',)\n\nclass Other:\n    pass\n")
+
+    def tearDown(self):
+        index = ClassIndex(self.directory)
+        for module in ("plugin_base", "plugin_child", "json"):
+            sys.modules.pop(index.module_key(module), None)
+        self.tmp.cleanup()
+
+    def write(self, filename, source):
+        with open(os.path.join(self.directory, filename), "w", encoding="utf-8") as f:
+            f.write(source)
+
+    def test_find_indirect_subclasses_with_attributes(self):
+        """按基类名查找（含间接继承），并读取字面量类属性"""
+        entries = ClassIndex(self.directory).find(["Factory"])
+        self.assertEqual([(e["module"], e["name"]) for e in entries], [("plugin_base", "Base"), ("plugin_child", "Child")])
+        self.assertEqual(entries[0]["attributes"], {"data_type": "base"})
+        self.assertEqual(entries[1]["attributes"], {"depends_on": ["base"]})
+        self.assertNotIn("plugin_child", sys.modules)
+
+    def test_attributes_are_json_values(self):
+        """集合转为排序后的列表，无法写入 JSON 或无法求值的属性被忽略，缓存正常写出"""
+        self.write("plugin_child.py", "class Child(Base):\n    depends_on = {'user', 'product'}\n"
+                                      "    raw = b'x'\n    big = 1e999\n    mixed = {1, 'a'}\n    nested = ((1, 2), {'k': (3,)})\n")
+        index = ClassIndex(self.directory)
+        expected = {"depends_on": ["product", "user"], "nested": [[1, 2], {"k": [3]}]}
+        self.assertEqual(index.find(["Factory"])[1]["attributes"], expected)
+        self.assertEqual(ClassIndex(self.directory).find(["Factory"])[1]["attributes"], expected)
+
+    def test_cache_reparses_only_changed_files(self):
+        """未变化的文件直接使用缓存，变化的文件重新解析"""
+        ClassIndex(self.directory)
+        index = ClassIndex(self.directory)
+        self.assertEqual(index.refresh(), 0)
+        time.sleep(0.01)
+        self.write("plugin_child.py", "class Renamed(Base):\n    pass\n")
+        self.assertEqual(index.refresh(), 1)
+        self.assertEqual([e["name"] for e in index.find(["Factory"])], ["Base", "Renamed"])
+
+    def test_load_imports_on_demand(self):
+        """load 时才导入模块"""
+        self.write("plugin_base.py", "class Base:\n    data_type = 'base'\n")
+        index = ClassIndex(self.directory)
+        cls = index.load("plugin_base", "Base")
+        self.assertEqual(cls.data_type, "base")
+        self.assertIs(index.load("plugin_base", "Base"), cls)
+        self.assertIn(index.module_key("plugin_base"), sys.modules)
+        self.assertNotIn("plugin_base", sys.modules)
+
+    def test_load_does_not_shadow_installed_modules(self):
+        """与标准库同名的插件不会覆盖 sys.modules 中的原模块"""
+        import json
+        self.write("json.py", "class Plugin:\n    pass\n")
+        ClassIndex(self.directory).load("json", "Plugin")
+        self.assertIs(sys.modules["json"], json)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+
+from engine_layer.heartbeat_monitor import HeartbeatScheduler, STATE_DEGRADED, STATE_DOWN, STATE_UP
+
+class TestHeartbeatScheduler(unittest.TestCase):
+    """
+    多目标心跳调度测试。
+    """
+
+    def setUp(self):
+        self.scheduler = HeartbeatScheduler(max_workers=4, default_interval=0.02, jitter=0, failure_threshold=2,
+                                            max_backoff=0.2)
+        self.events = []
+        self.scheduler.add_listener(self.events.append)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_state_change_events(self):
+        """只在状态变化时通知：存活、失败降级、连续失败判定为 down、恢复"""
+        alive = threading.Event()
+        alive.set()
+        self.scheduler.add_target("agent", alive.is_set)
+        self.scheduler.start()
+        time.sleep(0.1)
+        alive.clear()
+        time.sleep(0.15)
+        alive.set()
+        time.sleep(0.5)
+        self.assertEqual([(e.old_state, e.new_state) for e in self.events],
+                         [("unknown", STATE_UP), (STATE_UP, STATE_DEGRADED), (STATE_DEGRADED, STATE_DOWN),
+                          (STATE_DOWN, STATE_UP)])
+
+    def test_slow_check_times_out_without_delaying_others(self):
+        """慢检查按超时判定失败，其他目标照常检查"""
+        release = threading.Event()
+        calls = []
+        self.scheduler.check_timeout = 0.05
+        self.scheduler.add_target("slow", release.wait)
+        self.scheduler.add_target("fast", lambda: calls.append(1) or True)
+        self.scheduler.start()
+        time.sleep(0.3)
+        self.assertEqual(self.scheduler.state("slow"), STATE_DOWN)
+        self.assertEqual(self.scheduler.state("fast"), STATE_UP)
+        self.assertGreater(len(calls), 5)
+        release.set()
+
+    def test_hung_check_not_resubmitted(self):
+        """挂起的检查超时后计为失败，返回前不再提交，只占用一个检查线程"""
+        release = threading.Event()
+        calls = []
+        self.scheduler.check_timeout = 0.05
+        self.scheduler.add_target("hung", lambda: calls.append(1) or release.wait())
+        self.scheduler.start()
+        time.sleep(0.3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.scheduler.state("hung"), STATE_DOWN)
+        self.assertGreater(self.scheduler.targets["hung"].failures, 2)
+        release.set()
+        time.sleep(0.3)
+        self.assertGreater(len(calls), 1)
+
+    def test_stop_does_not_wait_for_hung_check(self):
+        """停止时不等待挂起的检查，重新启动后照常检查"""
+        release = threading.Event()
+        self.scheduler.check_timeout = 0.05
+        self.scheduler.add_target("hung", release.wait)
+        self.scheduler.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        self.scheduler.stop()
+        self.assertLess(time.monotonic() - start, 0.5)
+        release.set()
+        self.scheduler.start()
+        time.sleep(0.2)
+        self.assertEqual(self.scheduler.state("hung"), STATE_UP)
+
+    def test_dead_target_backs_off(self):
+        """down 状态的目标检查间隔指数退避"""
+        calls = []
+        self.scheduler.add_target("dead", lambda: calls.append(time.monotonic()) and False)
+        self.scheduler.start()
+        time.sleep(0.6)
+        gaps = [b - a for a, b in zip(calls, calls[1:])]
+        self.assertLess(gaps[0], 0.05)
+        self.assertGreater(gaps[-1], 0.15)
+
+if __name__ == "__main__":
+    unittest.main()
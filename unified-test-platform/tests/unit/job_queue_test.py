@@ -0,0 +1,186 @@
+import concurrent.futures
+import os
+import pickle
+import threading
+import time
+import unittest
+from collections import Counter
+from queue import Full
+
+from engine_layer.job_queue import JobQueue, CancelledError, PartialSubmitError, PRIORITY_HIGH, PRIORITY_LOW
+
+class TestJobQueue(unittest.TestCase):
+    """
+    JobQueue 优先级、Future 与批量接口测试。
+    """
+
+    def setUp(self):
+        self.jq = JobQueue(worker_num=1)
+
+    def tearDown(self):
+        self.jq.stop()
+
+    def test_priority_order(self):
+        """启动前入队的作业按优先级执行，同优先级先进先出"""
+        order = []
+        self.jq.add_job(order.append, "low", priority=PRIORITY_LOW)
+        self.jq.add_job(order.append, "normal-1")
+        self.jq.add_job(order.append, "high", priority=PRIORITY_HIGH)
+        self.jq.add_job(order.append, "normal-2")
+        self.jq.start()
+        self.assertTrue(self.jq.wait_all(timeout=5))
+        self.assertEqual(order, ["high", "normal-1", "normal-2", "low"])
+
+    def test_future_result_and_exception(self):
+        """Future 返回结果，作业异常在 result() 时重新抛出"""
+        self.jq.start()
+        ok = self.jq.add_job(pow, 2, 10)
+        failed = self.jq.add_job(int, "x")
+        self.assertEqual(ok.result(timeout=5), 1024)
+        self.assertIsInstance(failed.exception(timeout=5), ValueError)
+        with self.assertRaises(ValueError):
+            failed.result()
+
+    def test_submit_many_and_as_completed(self):
+        """批量提交，按完成顺序收集全部结果"""
+        self.jq.start()
+        futures = self.jq.submit_many(abs, [-1, -2, (-3,)])
+        self.assertEqual(sorted(f.result() for f in self.jq.as_completed(futures, timeout=5)), [1, 2, 3])
+
+    def test_cancel_pending_job(self):
+        """未开始的作业可以取消，不会执行"""
+        started, release = threading.Event(), threading.Event()
+        self.jq.start()
+        blocker = self.jq.add_job(lambda: (started.set(), release.wait(5)))
+        started.wait(5)
+        pending = self.jq.add_job(self.fail, "不应执行")
+        self.assertTrue(pending.cancel())
+        self.assertFalse(blocker.cancel())
+        release.set()
+        self.assertTrue(self.jq.wait_all(timeout=5))
+        with self.assertRaises(CancelledError):
+            pending.result()
+
+    def test_invalid_priority_rejected(self):
+        """负数、越界或非整数的优先级报 ValueError，不入队"""
+        for priority in (-1, 3, 1.0, None):
+            with self.subTest(priority=priority):
+                with self.assertRaises(ValueError):
+                    self.jq.add_job(abs, 1, priority=priority)
+                with self.assertRaises(ValueError):
+                    self.jq.submit_many(abs, [1], priority=priority)
+        self.assertEqual(self.jq.stats()["queued"], 0)
+
+    def test_cancelled_error_is_standard(self):
+        """取消异常即 concurrent.futures.CancelledError，可与标准库 Future 统一捕获"""
+        self.assertIs(CancelledError, concurrent.futures.CancelledError)
+
+class TestBoundedQueue(unittest.TestCase):
+    """
+    JobQueue 有界队列、自动伸缩与停止测试。
+    """
+
+    def test_reject_and_timeout_when_full(self):
+        """队满时 reject 立即拒绝，block 超时后拒绝"""
+        rejecting = JobQueue(max_size=2, full_policy="reject")
+        rejecting.add_job(abs, 1)
+        rejecting.add_job(abs, 2)
+        with self.assertRaises(Full):
+            rejecting.add_job(abs, 3)
+        with self.assertRaises(Full):
+            rejecting.submit_many(abs, [1, 2, 3])
+        blocking = JobQueue(max_size=1, put_timeout=0.05)
+        blocking.add_job(abs, 1)
+        with self.assertRaises(Full):
+            blocking.add_job(abs, 2)
+
+    def test_blocking_producer_makes_progress(self):
+        """批量作业多于上限时分段入队，全部完成"""
+        jq = JobQueue(worker_num=2, max_size=10)
+        jq.start()
+        futures = jq.submit_many(abs, range(-500, 0))
+        self.assertTrue(jq.wait_all(timeout=10))
+        self.assertEqual(sum(f.result() for f in futures), sum(range(1, 501)))
+        self.assertEqual(jq.stats()["queued"], 0)
+        jq.stop()
+
+    def test_batch_enqueued_all_or_nothing(self):
+        """空间不足以容纳整批作业时等待超时，没有作业入队"""
+        jq = JobQueue(max_size=4, put_timeout=0.05)
+        jq.submit_many(abs, [1, 2])
+        with self.assertRaises(Full) as raised:
+            jq.submit_many(abs, [3, 4, 5])
+        self.assertNotIsInstance(raised.exception, PartialSubmitError)
+        self.assertEqual(jq.stats()["queued"], 2)
+        self.assertEqual(len(jq.submit_many(abs, [3, 4])), 2)
+
+    def test_partial_submit_returns_enqueued_futures(self):
+        """多于上限的批量作业中途超时，异常带有已入队作业的 Future，这些作业照常完成"""
+        jq = JobQueue(worker_num=1, max_size=3, put_timeout=0.05)
+        with self.assertRaises(PartialSubmitError) as raised:
+            jq.submit_many(abs, [-1, -2, -3, -4, -5])
+        futures = raised.exception.futures
+        self.assertEqual(len(futures), 3)
+        self.assertEqual(jq.stats()["queued"], 3)
+        jq.start()
+        self.assertEqual([f.result(timeout=5) for f in futures], [1, 2, 3])
+        jq.stop()
+
+    def test_autoscale_grows_and_shrinks(self):
+        """积压时扩容到 max_workers，空闲后收缩回 min_workers"""
+        jq = JobQueue(worker_num=1, max_workers=4, idle_timeout=0.2)
+        jq.start()
+        jq.submit_many(time.sleep, [0.05] * 40)
+        self.assertEqual(jq.stats()["workers"], 4)
+        self.assertTrue(jq.wait_all(timeout=10))
+        time.sleep(0.6)
+        self.assertEqual(jq.stats()["workers"], 1)
+        jq.stop()
+
+    def test_stop_cancels_pending(self):
+        """stop(cancel_pending=True) 取消未开始的作业"""
+        jq = JobQueue()
+        futures = jq.submit_many(abs, range(5))
+        jq.start()
+        jq.stop(cancel_pending=True)
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertTrue(jq.wait_all(timeout=1))
+
+class TestProcessBackend(unittest.TestCase):
+    """
+    JobQueue 进程池后端测试。
+    """
+
+    def setUp(self):
+        self.jq = JobQueue(backend="hybrid", process_num=2, max_jobs_per_process=50, chunk_size=10)
+        self.jq.start()
+
+    def tearDown(self):
+        self.jq.stop()
+
+    def test_process_jobs_recycle_workers(self):
+        """作业在子进程中执行，执行一定数量后替换工作进程"""
+        futures = self.jq.submit_many(os.getpid, [()] * 300, executor="process")
+        self.assertTrue(self.jq.wait_all(timeout=30))
+        pids = Counter(f.result() for f in futures)
+        self.assertNotIn(os.getpid(), pids)
+        self.assertGreater(len(pids), 2)
+        # 按作业数替换：每个进程恰好执行不超过 max_jobs_per_process 个作业
+        self.assertLessEqual(max(pids.values()), 50)
+
+    def test_worker_reused_for_sequential_jobs(self):
+        """逐个提交的作业不会每个都触发替换，未达到配额前复用同一个进程"""
+        pids = {self.jq.add_job(os.getpid, executor="process").result(timeout=30) for _ in range(20)}
+        self.assertLessEqual(len(pids), 2)
+
+    def test_unpicklable_job_and_remote_exception(self):
+        """无法序列化的作业与子进程中的异常都反映在各自的 Future 上"""
+        unpicklable = self.jq.add_job(lambda: 1, executor="process")
+        failed = self.jq.add_job(int, "x", executor="process")
+        local = self.jq.add_job(lambda: "thread")
+        self.assertIsInstance(unpicklable.exception(timeout=30), pickle.PicklingError)
+        self.assertIsInstance(failed.exception(timeout=30), ValueError)
+        self.assertEqual(local.result(timeout=30), "thread")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import threading
+import time
+import unittest
+
+from engine_layer.heartbeat_monitor import HeartbeatEvent
+from engine_layer.machine_pool import MachinePool
+
+LABELS = {
+    "linux-chrome": {"os": "linux", "browser": "chrome"},
+    "linux-firefox": {"os": "linux", "browser": "firefox"},
+    "win-chrome": {"os": "windows", "browser": "chrome"}
+}
+
+class TestMachinePool(unittest.TestCase):
+    """
+    机器池分配、等待与租约测试。
+    """
+
+    def test_acquire_by_labels(self):
+        """按标签分配满足全部要求的机器，没有匹配机器时报错"""
+        pool = MachinePool(list(LABELS), labels=LABELS)
+        self.assertEqual(pool.acquire({"os": "windows"}), "win-chrome")
+        self.assertEqual(pool.acquire({"os": "linux", "browser": "firefox"}), "linux-firefox")
+        self.assertEqual(pool.available_count({"browser": "chrome"}), 1)
+        with self.assertRaises(RuntimeError):
+            pool.acquire({"os": "windows"})
+        with self.assertRaises(ValueError):
+            pool.acquire({"os": "mac"})
+
+    def test_blocking_acquire_is_fifo(self):
+        """指定 timeout=None 时一直等待，回收的机器按等待先后交给匹配的等待者"""
+        pool = MachinePool(["m1"])
+        pool.acquire()
+        order = []
+        threads = []
+        for name in ("first", "second"):
+            t = threading.Thread(target=lambda name=name: order.append((name, pool.acquire(timeout=None, holder=name))))
+            t.start()
+            threads.append(t)
+            time.sleep(0.05)
+        pool.release("m1")
+        time.sleep(0.05)
+        pool.release("m1", holder="first")
+        for t in threads:
+            t.join(timeout=1)
+        self.assertEqual(order, [("first", "m1"), ("second", "m1")])
+        with self.assertRaises(RuntimeError):
+            pool.acquire(timeout=0.05)
+
+    def test_expired_lease_is_reclaimed(self):
+        """租约到期的机器被收回并交给等待者，原持有者的回收不影响新持有者"""
+        pool = MachinePool(["m1"], default_lease=0.1)
+        pool.acquire(holder="crashed")
+        self.assertEqual(pool.acquire(timeout=1, holder="next", lease=10), "m1")
+        pool.release("m1", holder="crashed")
+        self.assertEqual(pool.in_use(), ["m1"])
+        self.assertFalse(pool.renew("m1", holder="crashed"))
+        self.assertTrue(pool.renew("m1", holder="next"))
+
+    def test_heartbeat_quarantine_and_restore(self):
+        """心跳异常的机器被隔离且回收后不放回，恢复后回到池中"""
+        listeners = []
+
+        class FakeScheduler:
+            def add_listener(self, listener):
+                listeners.append(listener)
+
+        pool = MachinePool(["m1", "m2"])
+        pool.attach_heartbeat(FakeScheduler())
+        self.assertEqual(pool.acquire(), "m1")
+        for machine in ("m1", "m2"):
+            listeners[0](HeartbeatEvent(machine, "up", "down", 0.0, None, None))
+        self.assertEqual(sorted(pool.quarantined()), ["m1", "m2"])
+        pool.release("m1")
+        self.assertEqual(pool.available_count(), 0)
+        listeners[0](HeartbeatEvent("m1", "down", "up", 0.0, 0.01, None))
+        self.assertEqual(pool.acquire(timeout=0), "m1")
+
+    def test_prefers_lowest_load(self):
+        """分配优先选择负载最低的机器，CPU 与延迟取较高者"""
+        pool = MachinePool(["busy", "slow", "idle"], latency_scale=0.5)
+        pool.load_reporter("busy")({"cpu_percent": 90.0})
+        pool.report_load("slow", cpu_percent=5.0, latency=0.3)
+        pool.report_load("idle", cpu_percent=20.0)
+        self.assertEqual([pool.acquire(timeout=0) for _ in range(3)], ["idle", "slow", "busy"])
+
+    def test_release_skips_waiters_of_other_groups(self):
+        """回收的机器直接交给本分组最早的等待者，不匹配的等待者和超时离开的等待者不受影响"""
+        pool = MachinePool(list(LABELS), labels=LABELS)
+        for labels in ({"os": "windows"}, {"os": "linux"}, {"os": "linux"}):
+            pool.acquire(labels)
+        with self.assertRaises(RuntimeError):
+            pool.acquire({"browser": "chrome"}, timeout=0.05)
+        got = {}
+        threads = []
+        for name, labels in (("win", {"os": "windows"}), ("linux", {"os": "linux"}), ("chrome", {"browser": "chrome"})):
+            t = threading.Thread(target=lambda name=name, labels=labels: got.update({name: pool.acquire(labels, timeout=None)}))
+            t.start()
+            threads.append(t)
+            time.sleep(0.05)
+        pool.release("linux-chrome")
+        pool.release("win-chrome")
+        threads[0].join(timeout=1)
+        threads[1].join(timeout=1)
+        self.assertEqual(got, {"linux": "linux-chrome", "win": "win-chrome"})
+        pool.release("linux-chrome")
+        threads[2].join(timeout=1)
+        self.assertEqual(got["chrome"], "linux-chrome")
+        self.assertEqual(pool.available_count(), 0)
+
+    def test_lowest_load_across_groups(self):
+        """多个分组匹配时取各组中负载最低的机器，空档随分配与负载变化更新"""
+        pool = MachinePool(list(LABELS), labels=LABELS)
+        pool.report_load("linux-chrome", cpu_percent=80.0)
+        pool.report_load("win-chrome", cpu_percent=30.0)
+        pool.report_load("linux-firefox", cpu_percent=50.0)
+        self.assertEqual(pool.acquire({"browser": "chrome"}, timeout=0), "win-chrome")
+        self.assertEqual(pool.acquire(timeout=0), "linux-firefox")
+        pool.report_load("linux-chrome", cpu_percent=0.0, latency=0.0)
+        pool.release("win-chrome")
+        self.assertEqual(pool.acquire(timeout=0), "win-chrome")
+        self.assertEqual(pool.acquire(timeout=0), "linux-chrome")
+
+if __name__ == "__main__":
+    unittest.main()
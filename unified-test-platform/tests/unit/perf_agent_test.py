@@ -0,0 +1,133 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+import numpy as np
+import psutil
+
+from engine_layer.perf_agent import PerfAgent, ProcessSampler, RingBuffer
+
+class TestRingBuffer(unittest.TestCase):
+    """
+    列式环形缓冲区测试。
+    """
+
+    def test_wraps_and_views_in_order(self):
+        """写满后覆盖最旧的数据，视图按时间排序且不拷贝"""
+        buffer = RingBuffer(4, [("t", np.float64), ("n", np.int32)])
+        for i in range(10):
+            buffer.append([i * 0.5, i])
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.view("n").tolist(), [6, 7, 8, 9])
+        self.assertEqual(buffer.view("t", last=2).tolist(), [4.0, 4.5])
+        self.assertTrue(np.shares_memory(buffer.view("n"), buffer.view("n")))
+        self.assertFalse(buffer.view("n").flags.writeable)
+
+class TestPerfAgent(unittest.TestCase):
+    """
+    性能采集代理的存储与降采样测试。
+    """
+
+    def test_rollups_cascade(self):
+        """原始样本降采样为 1 秒与 1 分钟两级，记录均值与最大值"""
+        agent = PerfAgent(capacity=100, rollups=[(1, 1000), (60, 10)])
+        for i in range(1200):
+            # 10 Hz，CPU 每秒内从 0 递增到 9
+            agent.record([i * 0.1, float(i % 10), 50.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+        self.assertEqual(len(agent.samples), 100)
+        # 当前时间桶（第 119 秒）尚未写出
+        self.assertEqual(agent.series("timestamp", resolution=1, last=2).tolist(), [117.0, 118.0])
+        self.assertTrue(np.allclose(agent.series("cpu_percent_mean", resolution=1), 4.5))
+        self.assertEqual(agent.series("cpu_percent_max", resolution=1)[0], 9.0)
+        self.assertEqual(agent.series("count", resolution=60).tolist(), [600])
+        self.assertAlmostEqual(float(agent.series("cpu_percent_mean", resolution=60)[0]), 4.5)
+
+    def test_get_data_returns_dicts(self):
+        """get_data 返回缓冲区中保留的样本字典"""
+        agent = PerfAgent(capacity=2)
+        for i in range(3):
+            agent.record([float(i), 10.0 * i, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+        self.assertEqual([(d["timestamp"], d["cpu_percent"]) for d in agent.get_data()], [(1.0, 10.0), (2.0, 20.0)])
+        self.assertEqual(agent.data, agent.get_data())
+
+class TestProcessSampler(unittest.TestCase):
+    """
+    按进程与进程树采样测试。
+    """
+
+    def setUp(self):
+        self.sampler = ProcessSampler(capacity=10, tree_refresh=0, detail_interval=0)
+        self.children = []
+
+    def tearDown(self):
+        self.sampler.close()
+        for child in self.children:
+            # 连同孙进程一起结束
+            if child.poll() is None:
+                for grandchild in psutil.Process(child.pid).children(recursive=True):
+                    grandchild.kill()
+            child.kill()
+            child.wait()
+
+    def spawn(self, code: str = "import time; time.sleep(30)") -> subprocess.Popen:
+        child = subprocess.Popen([sys.executable, "-c", code])
+        self.children.append(child)
+        return child
+
+    def test_process_tree_is_aggregated(self):
+        """进程树汇总父进程及全部子进程，单进程只统计自身"""
+        parent = self.spawn("import subprocess, sys, time; "
+                            "[subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']) for _ in range(2)]; "
+                            "time.sleep(30)")
+        single = self.spawn("while True: pass")
+        time.sleep(1.0)
+        self.sampler.watch(parent.pid, name="tree")
+        self.sampler.watch(single.pid, name="busy", include_children=False)
+        self.sampler.sample()
+        time.sleep(0.3)
+        self.sampler.sample()
+        latest = self.sampler.latest()
+        self.assertEqual(latest["tree"]["num_procs"], 3)
+        self.assertEqual(latest["busy"]["num_procs"], 1)
+        self.assertGreater(latest["tree"]["rss_bytes"], latest["busy"]["rss_bytes"])
+        self.assertGreater(latest["busy"]["cpu_percent"], 20)
+        self.assertGreater(latest["busy"]["num_fds"], 0)
+        self.assertEqual(len(self.sampler.series("tree", "cpu_percent")), 2)
+
+    def test_exited_process_is_pruned(self):
+        """进程退出后从采样中移除，新加入的对象只包含加入之后的样本"""
+        child = self.spawn()
+        self.sampler.watch(os.getpid(), name="self", include_children=False)
+        self.sampler.sample()
+        self.sampler.watch(child.pid, name="child")
+        self.sampler.sample()
+        child.kill()
+        child.wait()
+        self.sampler.sample()
+        self.sampler.sample()
+        self.assertEqual(self.sampler.series("child", "num_procs").tolist(), [1, 0, 0])
+        self.assertEqual(len(self.sampler.series("self", "timestamp")), 4)
+        self.assertEqual(len(self.sampler._handles), 1)
+
+    def test_sampling_overhead_within_budget(self):
+        """200 个进程、10 Hz 采集时，每次采集都做进程采样，CPU 开销不超过单核的 2%"""
+        children = [self.spawn() for _ in range(200)]
+        time.sleep(1.0)
+        agent = PerfAgent(interval=0.1, process_capacity=100)
+        for child in children:
+            agent.watch_process(child.pid, include_children=False)
+        started = time.monotonic()
+        agent.start()
+        time.sleep(3.0)
+        agent.stop()
+        elapsed = time.monotonic() - started
+        self.assertLess(agent.processes.cpu_seconds / elapsed, 0.02)
+        # 不因预算降频：进程采样次数与系统指标的采集次数一致
+        self.assertGreaterEqual(agent.processes.buffer.total, agent.samples.total - 1)
+        self.assertGreaterEqual(agent.samples.total, 25)
+        self.assertEqual(agent.processes.latest()[f"pid-{children[0].pid}"]["num_procs"], 1)
+
+if __name__ == "__main__":
+    unittest.main()